@@ -62,12 +62,21 @@ class _DashboardPageState extends State<DashboardPage> {
   final Set<String> _notifiedLeadIds =
       {}; // Track which leads already triggered push
 
+  // relative_score is computed by the scraper (scoring.whale_factors) and
+  // indexed, so ordering + limiting happens in Postgres. The stream can
+  // only send `desc` (nulls first, no nullsFirst option): migrations/014
+  // keeps the column non-null and migrations/013 indexes that order
+  static const int _leadsLimit = 1000;
   late Stream<List<Map<String, dynamic>>> _leadsStream;
 
   @override
   void initState() {
     super.initState();
-    _leadsStream = _client.from('leads').stream(primaryKey: ['id']);
+    _leadsStream = _client
+        .from('leads')
+        .stream(primaryKey: ['id'])
+        .order('relative_score', ascending: false)
+        .limit(_leadsLimit);
     _setupFollowupListener();
   }
 
@@ -160,75 +169,8 @@ class _DashboardPageState extends State<DashboardPage> {
                     matchPipeline;
               }).toList();
 
-              // 3. APPLY "THE EQUATION" (Luxury Rate) - OPTIMIZED
-              int N = allLeads.length;
-              if (N > 0) {
-                // Pre-calculate ranks for all prices for ALL leads to fix Stats
-                List<double> allPrices = allLeads
-                    .map((l) => (l['preco_noite'] as num?)?.toDouble() ?? 0.0)
-                    .toList();
-                allPrices.sort((a, b) => b.compareTo(a));
-
-                final Map<double, int> priceToRank = {};
-                for (int i = 0; i < allPrices.length; i++) {
-                  if (!priceToRank.containsKey(allPrices[i])) {
-                    priceToRank[allPrices[i]] = i + 1;
-                  }
-                }
-
-                // Apply to ALL leads first (for Stats)
-                for (var l in allLeads) {
-                  final price = (l['preco_noite'] as num?)?.toDouble() ?? 0.0;
-                  int rank = priceToRank[price] ?? N;
-
-                  // 1. Price Rank Score (45%)
-                  double rankScore = ((N - rank + 1) / N) * 100.0;
-
-                  // 2. Portfolio Score (25%) - Reward Scale
-                  final portfolioSize =
-                      (l['host_portfolio_size'] as num?)?.toDouble() ?? 1.0;
-                  double portfolioScore = (portfolioSize * 10.0).clamp(
-                    0.0,
-                    100.0,
-                  );
-
-                  // 3. Maintenance Score (20%) - Reward Need
-                  final maintenanceCount =
-                      (l['maintenance_items'] as List?)?.length ?? 0;
-                  double maintenanceScore = (maintenanceCount * 20.0).clamp(
-                    0.0,
-                    100.0,
-                  );
-
-                  // 4. Host Type Score (10%) - Professionalism
-                  final badges = l['badges'] as List?;
-                  bool isPro =
-                      badges?.any(
-                        (b) =>
-                            b.toString().contains('Company') ||
-                            b.toString().contains('Empresa'),
-                      ) ??
-                      false;
-                  double hostTypeScore = isPro ? 100.0 : 50.0;
-
-                  // FINAL WEIGHTED SCORE
-                  l['relative_score'] =
-                      (rankScore * 0.45) +
-                      (portfolioScore * 0.25) +
-                      (maintenanceScore * 0.20) +
-                      (hostTypeScore * 0.10);
-                }
-              }
-
-              // Apply Sorting (using normalized score)
+              // Apply Sorting ('score' already arrives ordered by the server)
               switch (_sortBy) {
-                case 'score':
-                  filteredLeads.sort(
-                    (a, b) => (b['relative_score'] as double).compareTo(
-                      a['relative_score'] as double,
-                    ),
-                  );
-                  break;
                 case 'price_asc':
                   filteredLeads.sort(
                     (a, b) => (a['preco_noite'] ?? 0).compareTo(
@@ -258,8 +200,13 @@ class _DashboardPageState extends State<DashboardPage> {
                 final Map<String, List<Map<String, dynamic>>> hostGroups = {};
                 final List<Map<String, dynamic>> ungrouped = [];
                 for (var l in filteredLeads) {
+                  // host_id (hosts table) when the scraper linked one,
+                  // else the display name as before
+                  final hostId = l['host_id']?.toString();
                   final host = l['anfitriao'] as String?;
-                  if (host != null &&
+                  if (hostId != null && hostId.isNotEmpty) {
+                    hostGroups.putIfAbsent('id:$hostId', () => []).add(l);
+                  } else if (host != null &&
                       host.isNotEmpty &&
                       host != 'Consultar Perfil') {
                     hostGroups.putIfAbsent(host, () => []).add(l);
@@ -1096,48 +1043,40 @@ class _DashboardPageState extends State<DashboardPage> {
       backgroundColor: Colors.transparent,
       builder: (context) => _buildReactiveDetailSheet(
         initialLead['id'],
-        initialScore: initialLead['relative_score'],
+        initialScore: (initialLead['relative_score'] as num?)?.toDouble(),
         groupedListings: initialLead['_grouped_listings'],
       ),
     );
   }
 
-  Map<String, dynamic> _parseAIIntel(Map<String, dynamic> lead) {
+  // Legacy rows (before migrations/005 + `scraper.py unpack`) still carry
+  // their JSON as a "--- <NAME>_JSON ---" block inside descricao
+  Map<String, dynamic> _legacyBlock(Map<String, dynamic> lead, String name) {
     try {
-      String? raw = lead['ai_report'];
-      // Fallback: Check in description
-      if (raw == null && lead['descricao'] != null) {
-        final desc = lead['descricao'] as String;
-        if (desc.contains('--- AI_INTEL_JSON ---')) {
-          raw = desc
-              .split('--- AI_INTEL_JSON ---')
-              .last
-              .split('---')
-              .first
-              .trim();
-        }
+      final desc = lead['descricao'] as String?;
+      final marker = '--- ${name}_JSON ---';
+      if (desc != null && desc.contains(marker)) {
+        final raw = desc.split(marker).last.split('---').first.trim();
+        return jsonDecode(raw);
       }
-      if (raw != null) return jsonDecode(raw);
     } catch (_) {}
     return {};
   }
 
-  Map<String, dynamic> _parseContactExtras(Map<String, dynamic> lead) {
+  Map<String, dynamic> _parseAIIntel(Map<String, dynamic> lead) {
+    final intel = lead['ai_intel'];
+    if (intel is Map) return Map<String, dynamic>.from(intel);
     try {
-      if (lead['descricao'] != null) {
-        final desc = lead['descricao'] as String;
-        if (desc.contains('--- CONTACT_INFO_JSON ---')) {
-          final raw = desc
-              .split('--- CONTACT_INFO_JSON ---')
-              .last
-              .split('---')
-              .first
-              .trim();
-          return jsonDecode(raw);
-        }
-      }
+      final raw = lead['ai_report'];
+      if (raw != null) return jsonDecode(raw);
     } catch (_) {}
-    return {};
+    return _legacyBlock(lead, 'AI_INTEL');
+  }
+
+  Map<String, dynamic> _parseContactExtras(Map<String, dynamic> lead) {
+    final extras = lead['contact_extras'];
+    if (extras is Map) return Map<String, dynamic>.from(extras);
+    return _legacyBlock(lead, 'CONTACT_INFO');
   }
 
   Widget _buildReactiveDetailSheet(
@@ -1507,7 +1446,8 @@ class _DashboardPageState extends State<DashboardPage> {
                       color: Colors.green,
                       size: 20,
                     )
-                  else if (lead['intelligence_status'] == 'pending')
+                  else if (lead['intelligence_status'] == 'pending' ||
+                      lead['intelligence_status'] == 'in_progress')
                     const SizedBox(
                       width: 16,
                       height: 16,
@@ -1559,11 +1499,14 @@ class _DashboardPageState extends State<DashboardPage> {
               ] else
                 _buildActionButton(
                   Icons.analytics_outlined,
-                  lead['intelligence_status'] == 'pending'
+                  lead['intelligence_status'] == 'in_progress'
+                      ? 'Analisando...'
+                      : lead['intelligence_status'] == 'pending'
                       ? 'Análise em Fila...'
                       : 'Iniciar Scrape',
                   Colors.amber,
-                  lead['intelligence_status'] == 'pending'
+                  lead['intelligence_status'] == 'pending' ||
+                          lead['intelligence_status'] == 'in_progress'
                       ? () {}
                       : () => _requestIntelligence(lead['id']),
                 ),
@@ -2060,7 +2003,11 @@ class _DashboardPageState extends State<DashboardPage> {
     try {
       await _client
           .from('leads')
-          .update({'intelligence_status': 'pending'})
+          // requested_at puts app requests at the front of the queue
+          .update({
+            'intelligence_status': 'pending',
+            'requested_at': DateTime.now().toUtc().toIso8601String(),
+          })
           .eq('id', id);
       if (!mounted) return;
       ScaffoldMessenger.of(context).showSnackBar(
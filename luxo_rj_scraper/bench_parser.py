@@ -0,0 +1,150 @@
+"""
+Offline parser benchmark — no browser, no Airbnb, no Supabase.
+
+Runs extract.py over the fixture corpus, checks every case against
+fixtures/expected.json and reports parse time per page and per stage.
+
+    python bench_parser.py                 # corpus, 50 rounds
+    python bench_parser.py --repeat 200
+    python bench_parser.py --pages DIR     # also time pages saved with
+                                           # SAVE_PAGES_DIR (no checks)
+
+Exits 1 when any field differs from expected.json.
+"""
+import os
+import sys
+import json
+import time
+import extract
+import http_fetcher
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _read(name):
+    if not name:
+        return None
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def _get(facts, dotted):
+    cur = facts
+    for part in dotted.split("."):
+        if cur is None:
+            return None
+        cur = cur.get(part)
+    return cur
+
+
+def _normalize(key, value):
+    # The scraper dedupes gaps through a set, so order/duplicates don't count
+    if key == "review_gaps":
+        return sorted(set(value or []))
+    if key == "profile.other_listings":
+        return len(value or [])
+    return value
+
+
+def check(name, facts, expect):
+    bad = []
+    for key, want in expect.items():
+        got = _normalize(key, _get(facts, key))
+        if got != want:
+            bad.append(f"{name}: {key} = {got!r}, expected {want!r}")
+    return bad
+
+
+def _timed(fn, repeat, timings):
+    t0 = time.perf_counter()
+    out = None
+    for _ in range(repeat):
+        out = fn(timings)
+    return out, (time.perf_counter() - t0) / repeat
+
+
+def run_corpus(repeat):
+    with open(os.path.join(FIXTURES, "expected.json"), encoding="utf-8") as f:
+        spec = json.load(f)
+    failures, rows, stages = [], [], {}
+
+    for case in spec["listings"]:
+        pages = [_read(case.get(k)) for k in ("listing", "reviews", "profile")]
+        size = sum(len(p) for p in pages if p)
+        facts, per = _timed(
+            lambda t: extract.parse_listing_pages(*pages, timings=t),
+            repeat, stages)
+        rows.append((case["name"], "listing", size, per))
+        failures += check(case["name"], facts, case["expect"])
+
+    for case in spec.get("search", []):
+        html = _read(case["page"])
+        cards, per = _timed(
+            lambda t: extract.extract_search_cards(
+                extract.Document(html), case.get("num_nights", 3)),
+            repeat, stages)
+        rows.append((case["name"], "search", len(html), per))
+        failures += check(case["name"], {"cards": cards}, case["expect"])
+
+    for case in spec.get("embedded", []):
+        html = _read(case["page"])
+        data, per = _timed(
+            lambda t: http_fetcher.parse_embedded_listing(html), repeat, stages)
+        rows.append((case["name"], "embedded", len(html), per))
+        failures += check(case["name"], data or {}, case["expect"])
+
+    for k in stages:
+        stages[k] /= repeat
+    return rows, stages, failures
+
+
+def run_saved(directory, repeat):
+    """Times pages saved by the scraper (SAVE_PAGES_DIR); no expectations."""
+    rows, stages = [], {}
+    for fname in sorted(os.listdir(directory)):
+        if not fname.endswith(".html"):
+            continue
+        with open(os.path.join(directory, fname), encoding="utf-8") as f:
+            html = f.read()
+        if fname.startswith("search_"):
+            fn = lambda t: extract.extract_search_cards(extract.Document(html))
+        elif fname.startswith("profile_"):
+            fn = lambda t: extract.parse_profile_page(html, "", timings=t)
+        else:
+            fn = lambda t: extract.parse_listing_pages(html, timings=t)
+        _, per = _timed(fn, repeat, stages)
+        rows.append((fname, fname.split("_")[0], len(html), per))
+    for k in stages:
+        stages[k] /= repeat
+    return rows, stages
+
+
+def report(title, rows, stages):
+    print(f"┌── {title}")
+    for name, kind, size, per in rows:
+        print(f"│ {name:<34} {kind:<9} {size / 1024:7.0f} KB  {per * 1000:8.2f} ms")
+    total = sum(r[3] for r in rows)
+    print(f"│ {'TOTAL':<34} {'':<9} {'':>10}  {total * 1000:8.2f} ms")
+    if stages:
+        print("├── Per stage (summed over pages, per round)")
+        for k, v in sorted(stages.items(), key=lambda kv: -kv[1]):
+            print(f"│ {k:<20} {v * 1000:8.2f} ms")
+    print("└──")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeat = int(args[args.index("--repeat") + 1]) if "--repeat" in args else 50
+    pages_dir = args[args.index("--pages") + 1] if "--pages" in args else None
+
+    rows, stages, failures = run_corpus(repeat)
+    report(f"Fixture corpus ({repeat} rounds)", rows, stages)
+    if pages_dir:
+        report(f"Saved pages in {pages_dir}", *run_saved(pages_dir, repeat))
+
+    if failures:
+        print(f"❌ {len(failures)} mismatch(es):")
+        for f in failures:
+            print(f"   {f}")
+        sys.exit(1)
+    print("✅ All fixtures match expected.json")
@@ -0,0 +1,222 @@
+import os
+import time
+import threading
+
+try:
+    import psutil
+except ImportError:  # optional — /proc is used on Linux otherwise
+    psutil = None
+
+# ──────────────────────────────────────────────
+# CHROMEDRIVER PATH CACHE — no network lookup on every start
+# ──────────────────────────────────────────────
+DRIVER_PATH_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 ".chromedriver_path")
+
+
+def resolve_chromedriver(install):
+    """Returns a chromedriver path: $CHROMEDRIVER_PATH, else the cached
+    path from a previous run, else install() (webdriver-manager, which
+    hits the network) and cache the result."""
+    env_path = os.getenv("CHROMEDRIVER_PATH")
+    if env_path and os.path.exists(env_path):
+        return env_path
+    try:
+        with open(DRIVER_PATH_CACHE, encoding="utf-8") as f:
+            cached = f.read().strip()
+        if cached and os.path.exists(cached):
+            return cached
+    except OSError:
+        pass
+    path = install()
+    try:
+        with open(DRIVER_PATH_CACHE, "w", encoding="utf-8") as f:
+            f.write(path)
+    except OSError:
+        pass
+    return path
+
+
+# ──────────────────────────────────────────────
+# MEMORY — RSS of chromedriver + every Chrome process under it
+# ──────────────────────────────────────────────
+def _children_proc(pid):
+    """Child pids from /proc (Linux only)."""
+    kids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            if int(fields[1]) == pid:
+                kids.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return kids
+
+
+def _rss_proc(pid):
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def process_tree_rss_mb(pid):
+    """Total RSS in MB for pid and all its descendants, or None."""
+    if not pid:
+        return None
+    if psutil:
+        try:
+            root = psutil.Process(pid)
+            procs = [root] + root.children(recursive=True)
+            return sum(p.memory_info().rss for p in procs) / 2**20
+        except psutil.Error:
+            return None
+    if not os.path.isdir("/proc"):
+        return None
+    total, stack = 0, [pid]
+    while stack:
+        cur = stack.pop()
+        total += _rss_proc(cur)
+        stack.extend(_children_proc(cur))
+    return total / 2**20
+
+
+def driver_rss_mb(driver):
+    try:
+        return process_tree_rss_mb(driver.service.process.pid)
+    except AttributeError:
+        return None
+
+
+# ──────────────────────────────────────────────
+# BROWSER POOL
+# ──────────────────────────────────────────────
+class PooledBrowser:
+    """A live driver plus the bookkeeping used to decide when to recycle it."""
+
+    def __init__(self, driver, cold_start):
+        self.driver = driver
+        self.cold_start = cold_start
+        self.pages = 0
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+
+class BrowserPool:
+    """Keeps Chrome drivers alive across batches.
+
+    acquire() hands out an idle driver after a health check (or starts a
+    new one); release() puts it back, recycling it once it has served
+    max_pages page loads or grown past max_rss_mb."""
+
+    def __init__(self, factory, max_pages=200, max_rss_mb=1500):
+        self.factory = factory
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self._idle = []
+        self._busy = set()
+        self._lock = threading.Lock()
+        self.cold_starts = []
+        self.recycled = 0
+
+    def _start(self):
+        t0 = time.monotonic()
+        driver = self.factory()
+        cold = time.monotonic() - t0
+        with self._lock:
+            self.cold_starts.append(cold)
+        rss = driver_rss_mb(driver)
+        rss_txt = f", {rss:.0f} MB RSS" if rss is not None else ""
+        print(f"    🌐 Browser started in {cold:.1f}s{rss_txt}")
+        return PooledBrowser(driver, cold)
+
+    @staticmethod
+    def _healthy(browser):
+        try:
+            browser.driver.execute_script("return 1")
+            return bool(browser.driver.window_handles)
+        except Exception:
+            return False
+
+    def _worn_out(self, browser):
+        if browser.pages >= self.max_pages:
+            return f"{browser.pages} pages"
+        rss = driver_rss_mb(browser.driver)
+        if rss is not None and rss > self.max_rss_mb:
+            return f"{rss:.0f} MB RSS"
+        return None
+
+    def _discard(self, browser, reason):
+        print(f"    ♻ Recycling browser ({reason})")
+        with self._lock:
+            self.recycled += 1
+        try: browser.driver.quit()
+        except: pass
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                browser = self._idle.pop() if self._idle else None
+            if browser is None:
+                browser = self._start()
+                break
+            if self._healthy(browser):
+                break
+            self._discard(browser, "failed health check")
+        with self._lock:
+            self._busy.add(browser)
+        return browser
+
+    def release(self, browser):
+        with self._lock:
+            self._busy.discard(browser)
+        reason = self._worn_out(browser)
+        if reason:
+            self._discard(browser, reason)
+            return
+        browser.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(browser)
+
+    def close_idle(self, max_idle):
+        """Quits idle drivers unused for more than max_idle seconds."""
+        now = time.monotonic()
+        with self._lock:
+            stale = [b for b in self._idle if now - b.last_used > max_idle]
+            self._idle = [b for b in self._idle if b not in stale]
+        for b in stale:
+            print("    💤 Closing idle browser")
+            try: b.driver.quit()
+            except: pass
+
+    def close_all(self):
+        with self._lock:
+            browsers = self._idle + list(self._busy)
+            self._idle, self._busy = [], set()
+        for b in browsers:
+            try: b.driver.quit()
+            except: pass
+
+    def report(self):
+        with self._lock:
+            colds = list(self.cold_starts)
+            live = self._idle + list(self._busy)
+        if not colds and not live:
+            return
+        print("    ┌── Browser pool")
+        if colds:
+            print(f"    │ Cold starts: {len(colds)} "
+                  f"(avg {sum(colds) / len(colds):.1f}s, max {max(colds):.1f}s), "
+                  f"recycled: {self.recycled}")
+        for i, b in enumerate(live, 1):
+            rss = driver_rss_mb(b.driver)
+            rss_txt = f"{rss:.0f} MB" if rss is not None else "n/a"
+            print(f"    │ Browser {i}: {b.pages} page(s), RSS {rss_txt}")
+        print(f"    └── Live browsers: {len(live)}")
@@ -0,0 +1,127 @@
+"""
+Claim/lease harness — run against a LOCAL Supabase stack, never production.
+
+Usage:
+1. `supabase start` (local Postgres + PostgREST), then run
+   migrations/001..014 in the local SQL editor.
+2. SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=<local service key> \
+   python check_claims.py [workers] [leads]
+
+Inserts throwaway leads, lets several simulated watchers claim them
+concurrently, and checks that no lead is handed out twice and that every
+seeded lead was claimed. Then checks that the reaper returns leads left
+behind by a "crashed" worker. The seeded leads are queued ahead of
+everything else; a real lead claimed by mistake is handed straight back
+(claim attempt included) and never counted.
+"""
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from supabase import create_client
+from dotenv import load_dotenv
+import claims
+
+load_dotenv()
+
+url = os.getenv("SUPABASE_URL")
+key = os.getenv("SUPABASE_KEY")
+
+if not url or not key:
+    print("Error: SUPABASE_URL or SUPABASE_KEY not found in .env")
+    exit(1)
+if not any(h in url for h in ("127.0.0.1", "localhost")) and "--force" not in sys.argv:
+    print(f"Refusing to run against {url} — point SUPABASE_URL at a local stack "
+          "(or pass --force).")
+    exit(1)
+
+args = [a for a in sys.argv[1:] if not a.startswith("--")]
+num_workers = int(args[0]) if len(args) > 0 else 4
+num_leads = int(args[1]) if len(args) > 1 else 60
+PREFIX = "claim-test://"
+
+supabase = create_client(url, key)
+
+
+def cleanup():
+    supabase.table("leads").delete().like("link_imovel", f"{PREFIX}%").execute()
+
+
+def seed():
+    """Inserts the test leads at the front of the queue; returns their ids."""
+    now = datetime.now(timezone.utc).isoformat()
+    rows = [{"titulo": f"Claim test {i}", "link_imovel": f"{PREFIX}{i}",
+             "bairro": "Test", "intelligence_status": "pending",
+             "priority": 1e9, "requested_at": now}
+            for i in range(num_leads)]
+    res = supabase.table("leads").insert(rows).execute()
+    return {r['id'] for r in res.data}
+
+
+def own_rows(client, wid, rows, seeded):
+    """The claimed rows this harness seeded. Anything else was a real lead:
+    it goes back to pending as it was."""
+    for r in rows:
+        if r['id'] not in seeded:
+            client.table("leads").update({
+                "intelligence_status": "pending", "claimed_by": None,
+                "lease_expires_at": None,
+                "claim_attempts": max(0, (r.get('claim_attempts') or 1) - 1),
+            }).eq("id", r['id']).eq("claimed_by", wid).execute()
+    return [r for r in rows if r['id'] in seeded]
+
+
+cleanup()
+seeded = seed()
+print(f"Seeded {len(seeded)} pending leads. {num_workers} workers claiming...")
+
+# ─── 1. Concurrent claims never overlap ───
+claimed = []
+claimed_lock = threading.Lock()
+
+
+def worker(n):
+    client = create_client(url, key)
+    wid = f"test-worker-{n}"
+    while True:
+        # Seeded leads rank first, so a claim without any means none is left
+        rows = own_rows(client, wid, claims.claim_batch(client, wid, 5, 60),
+                        seeded)
+        if not rows:
+            break
+        with claimed_lock:
+            claimed.extend(r['id'] for r in rows)
+        client.table("leads").update({
+            "intelligence_status": "ready", "claimed_by": None,
+            "lease_expires_at": None,
+        }).in_("id", [r['id'] for r in rows]).execute()
+
+
+threads = [threading.Thread(target=worker, args=(i,)) for i in range(num_workers)]
+for t in threads: t.start()
+for t in threads: t.join()
+
+dupes = [i for i, c in Counter(claimed).items() if c > 1]
+print(f"Claimed {len(claimed)} / {len(seeded)}, duplicates: {len(dupes)}")
+ok = (len(seeded) == num_leads and not dupes and len(claimed) == num_leads
+      and set(claimed) == seeded)
+
+# ─── 2. Reaper recovers a crashed worker's leases ───
+cleanup()
+seeded = seed()
+held = own_rows(supabase, "crashed-worker",
+                claims.claim_batch(supabase, "crashed-worker", num_leads, 1),
+                seeded)
+time.sleep(2)
+claims.reap_expired(supabase)
+back = supabase.table("leads").select("id", count="exact").like(
+    "link_imovel", f"{PREFIX}%").eq("intelligence_status", "pending").execute()
+print(f"Crashed worker held {len(held)} / {num_leads}, "
+      f"reaped back to pending: {back.count}")
+ok = ok and len(held) == num_leads and back.count == num_leads
+
+cleanup()
+print("SUCCESS" if ok else "FAILED")
+exit(0 if ok else 1)
@@ -0,0 +1,31 @@
+"""
+HostLimiter slot check — offline, no browser, no Supabase.
+
+Usage:
+    python check_limiter.py
+
+A listing URL as discovery stores it (airbnb.com.br) and a host profile
+URL (www.airbnb.com.br) must share one politeness slot: the second load
+waits out the gap instead of going straight through.
+"""
+import time
+from worker_pool import HostLimiter
+
+GAP = 0.5
+LISTING = "https://airbnb.com.br/rooms/123456"
+PROFILE = ("https://www.airbnb.com.br/users/profile/987"
+           "?previous_page_name=PdpHomeMarketplace")
+
+limiter = HostLimiter(min_interval=GAP, jitter=0.0)
+same_key = limiter.host_key(LISTING) == limiter.host_key(PROFILE)
+print(f"Slot keys: {limiter.host_key(LISTING)!r} / {limiter.host_key(PROFILE)!r}")
+
+limiter.wait(LISTING)
+t0 = time.monotonic()
+limiter.wait(PROFILE)
+waited = time.monotonic() - t0
+print(f"Profile load after a listing load waited {waited:.2f}s (gap {GAP}s)")
+
+ok = same_key and waited >= GAP * 0.9 and len(limiter._next_slot) == 1
+print("SUCCESS" if ok else "FAILED")
+exit(0 if ok else 1)
@@ -0,0 +1,107 @@
+import os
+import socket
+import threading
+
+# ──────────────────────────────────────────────
+# JOB CLAIMS — lets several watchers share one queue safely
+# ──────────────────────────────────────────────
+# The SQL side lives in migrations/003_lead_claims.sql. A lead goes
+# pending → in_progress (claimed_by + lease) → ready/error, so a row is
+# only ever scraped by the worker that claimed it.
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def claim_batch(client, worker_id, limit, lease_seconds, trips=None,
+                aging=1.0, request_boost=1000.0):
+    """Atomically claims up to `limit` pending leads, most valuable first
+    (priority + request boost + `aging` points per hour waited; see
+    migrations/010_priority_queue.sql). Returns full rows in that order."""
+    params = {
+        "p_worker": worker_id,
+        "p_limit": limit,
+        "p_lease_seconds": int(lease_seconds),
+    }
+    try:
+        res = client.rpc("claim_pending_leads", {
+            **params, "p_aging": aging, "p_request_boost": request_boost,
+        }).execute()
+    except Exception as e:
+        # PGRST202: 010 not applied yet — the 003/007 signature
+        if "PGRST202" not in str(e):
+            raise
+        if trips: trips.add("claim")
+        res = client.rpc("claim_pending_leads", params).execute()
+    if trips: trips.add("claim")
+    # UPDATE … RETURNING has no order; workers take jobs front to back
+    return sorted(res.data or [], key=lambda r: (
+        r.get('requested_at') is None, -(r.get('priority') or 0)))
+
+
+def claim_one(client, worker_id, lead_id, lease_seconds):
+    """Claims one given lead (migrations/012). Returns its row, or None
+    when another worker holds a live lease on it."""
+    res = client.rpc("claim_lead", {
+        "p_worker": worker_id,
+        "p_id": lead_id,
+        "p_lease_seconds": int(lease_seconds),
+    }).execute()
+    return res.data[0] if res.data else None
+
+
+def renew(client, worker_id, ids, lease_seconds):
+    if not ids:
+        return 0
+    return client.rpc("renew_leases", {
+        "p_worker": worker_id, "p_ids": list(ids),
+        "p_lease_seconds": int(lease_seconds),
+    }).execute().data
+
+
+def release(client, worker_id, ids, max_attempts=3):
+    """Puts leads this worker still holds back to pending."""
+    if not ids:
+        return 0
+    return client.rpc("release_leases", {
+        "p_worker": worker_id, "p_ids": list(ids),
+        "p_max_attempts": max_attempts,
+    }).execute().data
+
+
+def reap_expired(client, max_attempts=3):
+    """Returns leads with expired leases (crashed workers) to the queue."""
+    n = client.rpc("reap_expired_leases",
+                   {"p_max_attempts": max_attempts}).execute().data
+    if n:
+        print(f"    ♻ Reaped {n} lead(s) from expired leases")
+    return n
+
+
+class LeaseKeeper:
+    """Renews the lease on a claimed batch every lease/3 seconds until
+    stopped, so long batches are not reaped while still being worked on."""
+
+    def __init__(self, client, worker_id, ids, lease_seconds):
+        self.client = client
+        self.worker_id = worker_id
+        self.ids = list(ids)
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-keeper",
+                                        daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.wait(self.lease_seconds / 3.0):
+            try:
+                renew(self.client, self.worker_id, self.ids, self.lease_seconds)
+            except Exception as e:
+                print(f"    ⚠ Lease renewal failed: {e}")
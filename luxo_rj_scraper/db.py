@@ -0,0 +1,151 @@
+import threading
+
+# ──────────────────────────────────────────────
+# BATCHED SUPABASE HELPERS
+# ──────────────────────────────────────────────
+# PostgREST puts `in_` filters in the query string, so long link lists
+# are split to stay well under URL length limits.
+IN_CHUNK = 100
+
+
+class RoundTrips:
+    """Counts Supabase HTTP calls per label so each run can log them."""
+
+    def __init__(self):
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, label, n=1):
+        with self._lock:
+            self.counts[label] = self.counts.get(label, 0) + n
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def report(self, title="DB round trips"):
+        parts = ", ".join(f"{k}={v}" for k, v in sorted(self.counts.items()))
+        print(f"    📊 {title}: {self.total} ({parts or 'none'})")
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def existing_links(client, links, trips=None):
+    """Returns the subset of links already in leads.link_imovel."""
+    links = list(dict.fromkeys(l for l in links if l))
+    found = set()
+    for chunk in _chunks(links, IN_CHUNK):
+        res = client.table("leads").select("link_imovel").in_(
+            "link_imovel", chunk).execute()
+        if trips: trips.add("select")
+        found.update(r['link_imovel'] for r in res.data or [])
+    return found
+
+
+def leads_by_ids(client, ids, fields, trips=None):
+    """{id: row} for the given lead ids, IN_CHUNK ids per query."""
+    rows = {}
+    for chunk in _chunks(list(dict.fromkeys(ids)), IN_CHUNK):
+        res = client.table("leads").select(fields).in_("id", chunk).execute()
+        if trips: trips.add("select")
+        rows.update((str(r['id']), r) for r in res.data or [])
+    return rows
+
+
+def iter_leads(client, fields, page_size=1000, trips=None):
+    """Yields the whole leads table in pages, keyset-paginated on id
+    (stable while rows are being updated, unlike offset paging)."""
+    last_id = None
+    while True:
+        q = client.table("leads").select(fields).order("id").limit(page_size)
+        if last_id is not None:
+            q = q.gt("id", last_id)
+        rows = q.execute().data or []
+        if trips: trips.add("select")
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]['id']
+
+
+def bulk_insert_leads(client, rows, trips=None):
+    """Inserts new lead rows in one call. With the unique index from
+    migrations/001_leads_unique_link.sql in place, rows that raced in
+    from another run are skipped instead of failing the whole batch."""
+    if not rows:
+        return []
+    try:
+        res = client.table("leads").upsert(
+            rows, on_conflict="link_imovel", ignore_duplicates=True).execute()
+    except Exception as e:
+        # 42P10: no unique constraint on link_imovel yet — plain insert
+        if "42P10" not in str(e):
+            raise
+        if trips: trips.add("upsert")
+        res = client.table("leads").insert(rows).execute()
+    if trips: trips.add("insert")
+    return res.data or []
+
+
+def bulk_update_leads(client, rows, trips=None, worker_id=None):
+    """Writes per-lead updates ({"id": ..., <fields>}) back in bulk.
+
+    Rows are grouped by key set and each group is one call to the
+    bulk_update_leads RPC (migrations/011), a plain UPDATE: a lead deleted
+    mid-scrape stays deleted instead of coming back as a ghost row. With
+    worker_id, only leads that worker still holds are written (012)."""
+    groups = {}
+    for row in rows:
+        groups.setdefault(frozenset(row), []).append(row)
+    for keys, group in groups.items():
+        params = {"p_rows": group, "p_columns": sorted(keys - {"id"})}
+        if worker_id:
+            params["p_worker"] = worker_id
+        try:
+            client.rpc("bulk_update_leads", params).execute()
+        except Exception as e:
+            # PGRST202: 011/012 not applied yet — one UPDATE per row
+            if "PGRST202" not in str(e):
+                raise
+            for row in group:
+                fields = {k: v for k, v in row.items() if k != "id"}
+                q = client.table("leads").update(fields).eq("id", row["id"])
+                if worker_id:
+                    q = q.eq("claimed_by", worker_id)
+                q.execute()
+                if trips: trips.add("update")
+            continue
+        if trips: trips.add("update")
+    return len(groups)
+
+
+class UpdateBuffer:
+    """Collects lead updates from all workers and flushes them in bulk
+    every `flush_size` rows (and once more at the end of the batch)."""
+
+    def __init__(self, client, flush_size=50, trips=None, worker_id=None):
+        self.client = client
+        self.flush_size = flush_size
+        self.trips = trips
+        self.worker_id = worker_id
+        self._rows = []
+        self._lock = threading.Lock()
+
+    def add(self, lead_id, updates):
+        with self._lock:
+            self._rows.append({"id": lead_id, **updates})
+            ready = len(self._rows) >= self.flush_size
+        if ready:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if rows:
+            bulk_update_leads(self.client, rows, self.trips, self.worker_id)
+            print(f"    💾 Saved {len(rows)} lead update(s) in bulk")
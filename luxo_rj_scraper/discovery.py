@@ -0,0 +1,117 @@
+import os
+import json
+import time
+from datetime import datetime, timezone
+
+# ──────────────────────────────────────────────
+# DISCOVERY — search targets, result pages and checkpoints
+# ──────────────────────────────────────────────
+# Targets live in targets.json (or DISCOVERY_TARGETS). Each target is
+# paged through with items_offset until Airbnb runs out of results; the
+# offset is checkpointed per page in discovery_checkpoints
+# (migrations/008), so a crashed run resumes where it stopped.
+
+TARGETS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "targets.json")
+SEARCH_FILTERS = "price_min=1000&room_types%5B%5D=Entire+home%2Fapt"
+
+
+def load_targets(path=None):
+    """[{bairro, query}] from the targets file, skipping "enabled": false."""
+    with open(path or TARGETS_FILE, encoding="utf-8") as f:
+        targets = json.load(f)
+    return [t for t in targets if t.get("enabled", True)]
+
+
+def default_run_id():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def search_url(query, checkin=None, checkout=None, offset=0):
+    url = f"https://www.airbnb.com.br/s/{query}/homes?{SEARCH_FILTERS}"
+    if checkin and checkout:
+        url += f"&checkin={checkin}&checkout={checkout}"
+    if offset:
+        url += f"&items_offset={offset}"
+    return url
+
+
+class Checkpoints:
+    """Per-target progress of one discovery run. Without the table
+    (migration not applied) it keeps progress in memory only."""
+
+    def __init__(self, client, run_id):
+        self.client = client
+        self.run_id = run_id
+        self.enabled = True
+        self._rows = {}
+
+    def load(self):
+        try:
+            res = (self.client.table("discovery_checkpoints").select("*")
+                   .eq("run_id", self.run_id).execute())
+            self._rows = {r['query']: r for r in res.data or []}
+        except Exception as e:
+            self.enabled = False
+            print(f"    ⚠ Discovery checkpoints unavailable ({e}) — "
+                  f"run migrations/008; progress is not saved")
+        return self
+
+    def get(self, query):
+        return self._rows.get(query) or {
+            "next_offset": 0, "pages": 0, "cards": 0, "new_leads": 0,
+            "done": False}
+
+    def save(self, target, **progress):
+        row = {**self.get(target['query']), **progress,
+               "run_id": self.run_id, "query": target['query'],
+               "bairro": target['bairro'],
+               "updated_at": datetime.now(timezone.utc).isoformat()}
+        self._rows[target['query']] = row
+        if self.enabled:
+            try:
+                self.client.table("discovery_checkpoints").upsert(
+                    row, on_conflict="run_id,query").execute()
+            except Exception as e:
+                print(f"    ║ ⚠ Could not save checkpoint: {e}")
+        return row
+
+
+class TargetResult:
+    """What one target produced in this run: pages read, distinct cards,
+    new leads vs duplicates already in the table, and time spent."""
+
+    def __init__(self, target, status="running"):
+        self.target = target
+        self.status = status
+        self.pages = 0
+        self.cards = 0
+        self.new = 0
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    @property
+    def duplicates(self):
+        return self.cards - self.new
+
+    def add_page(self, cards, new):
+        self.pages += 1
+        self.cards += cards
+        self.new += new
+
+    def finish(self, status):
+        self.status = status
+        self.elapsed = time.monotonic() - self.started
+        return self
+
+
+def report(results, run_id, wall):
+    print(f"    ┌── Discovery summary (run {run_id})")
+    for r in sorted(results, key=lambda r: -r.new):
+        print(f"    │ {r.target['bairro']:<26} {r.status:<8} {r.pages:3d} page(s) "
+              f"{r.cards:5d} cards {r.new:5d} new {r.duplicates:5d} dup "
+              f"{r.elapsed:6.1f}s")
+    busy = sum(r.elapsed for r in results)
+    print(f"    └── Total: {sum(r.new for r in results)} new / "
+          f"{sum(r.cards for r in results)} cards from {len(results)} target(s) "
+          f"in {wall:.0f}s wall ({busy:.0f}s of target time)")
@@ -0,0 +1,501 @@
+"""
+Pure extraction functions — HTML in, fields out. No driver, no DB.
+
+deep_analyze_listing (Selenium), http_analyze_listing (HTTP) and the
+offline benchmark (bench_parser.py) all run the same code here, so a
+parser change can be checked against fixtures/ without touching Airbnb.
+
+Each page is parsed once (lxml) into a Document; every stage runs over
+that tree and shares its cached text projections.
+"""
+import re
+import time
+import lxml.html
+from lxml import etree
+from keywords import REGISTRY, MAINTENANCE_CATEGORIES, maintenance_labels
+
+NAME_BLACKLIST = ['consultar perfil', 'ver perfil', 'profile']
+EMAIL_BLACKLIST = ['airbnb', 'noreply', 'example', 'test', 'luxuryrj', 'host_']
+HANDLE_BLACKLIST = ['airbnb', 'gmail', 'hotmail', 'yahoo', 'outlook', 'icloud']
+SITE_BLACKLIST = ['airbnb', 'google', 'facebook', 'instagram', 'apple',
+                  'play.google']
+
+HOST_NAME_PATTERNS = [re.compile(p) for p in (
+    r'Anfitri[ãa]\(?o?\)?[:\s]+([A-ZÀ-Ú][\w\s\-&\.]+)',
+    r'Hosted by\s+(.+?)(?:\s*$|\s*Superhost)',
+    r'Hospede-se com\s+(.+?)(?:\s*$|\s*Superhost)',
+)]
+PORTFOLIO_PATTERNS = [(re.compile(p), label) for p, label in (
+    (r'(\d+)\s*an[uú]ncios?', 'anúncios'),
+    (r'[Vv]er\s+(?:os\s+)?(\d+)', 'Ver os N'),
+    (r'[Ss]ee\s+all\s+(\d+)', 'See all N'),
+    (r'(\d+)\s+acomoda[çc]', 'acomodações'),
+    (r'(\d+)\s+places?\b', 'places'),
+    (r'(\d+)\s+listings?\b', 'listings'),
+    (r'[Ss]howing\s+(\d+)', 'Showing N'),
+)]
+_LISTING_COUNT_RE = re.compile(r'(\d+)\s*an[uú]ncios?')
+_RATING_RE = re.compile(r'(\d)')
+_HOST_LINK_RE = re.compile(
+    r'/users/(?:show|profile)/(\d+)\?[^"\']*PdpHomeMarketplace')
+_HOST_JSON_RE = re.compile(r'"hostId"\s*:\s*"?(\d+)"?')
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}')
+_PHONE_RE = re.compile(r'(?:\+?55\s?)?(?:\(?\d{2}\)?\s?)?\d{4,5}[\-\s]?\d{4}')
+_INSTAGRAM_LINK_RE = re.compile(r'instagram\.com/([a-zA-Z0-9_.]+)')
+_HANDLE_RE = re.compile(r'@([a-zA-Z0-9_.]{3,30})')
+_NIGHTS_RE = re.compile(r'por (\d+) noit')
+_ROOM_ID_RE = re.compile(r'/rooms/(?:plus/|luxury/)?(\d+)')
+_SUPERHOST_SUFFIX_RE = re.compile(r'Superhost.*$', re.IGNORECASE)
+_YEARS_HOSTING_RE = re.compile(r'\d+\s*anos?\s*hospedando.*$', re.IGNORECASE)
+_NAME_PREFIX_RE = re.compile(r'(Hosted by|Hospede-se com|Anfitriã?o:?\s*)',
+                             re.IGNORECASE)
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Compiled once — the CSS selectors the BeautifulSoup version used, as XPath
+X_DESCRIPTION = etree.XPath(
+    '//div[@data-section-id="DESCRIPTION_DEFAULT"'
+    ' or @data-testid="pdp-description-content"]')
+X_REVIEW_CARDS = etree.XPath(
+    '//div[@data-review-id or @data-testid="pdp-review-card-content"]')
+X_REVIEW_RATING = etree.XPath(
+    './/span[contains(@aria-label, "estrela") or contains(@aria-label, "star")]')
+X_REVIEW_TEXT = etree.XPath(
+    f'.//*[(self::span and {_has_class("_163atp1")})'
+    ' or (self::div and @data-testid="pdp-review-description")]')
+HOST_SELECTORS = [(etree.XPath(x), css) for x, css in (
+    ('//div[@data-section-id="HOST_PROFILE_DEFAULT"]',
+     'div[data-section-id="HOST_PROFILE_DEFAULT"]'),
+    ('//div[@data-testid="pdp-host-profile-section"]',
+     'div[data-testid="pdp-host-profile-section"]'),
+    ('//div[@data-section-id="HOST_OVERVIEW_DEFAULT"]',
+     'div[data-section-id="HOST_OVERVIEW_DEFAULT"]'),
+    ('//section[@data-section-id="HOST_PROFILE_DEFAULT"]',
+     'section[data-section-id="HOST_PROFILE_DEFAULT"]'),
+)]
+X_SECTIONS = etree.XPath('//section | //div[@data-section-id]')
+X_HEADING = etree.XPath('.//*[self::h1 or self::h2 or self::h3]')
+X_PRICE = etree.XPath(
+    f'//*[(self::span and {_has_class("_1y74zjx")})'
+    ' or @data-testid="price-summary-total-price"]')
+X_ROOM_LINKS = etree.XPath('//a[contains(@href, "/rooms/")]')
+X_LINKS = etree.XPath('//a[@href]')
+X_CARDS = etree.XPath('//div[@data-testid="card-container"]')
+X_CARD_TITLE = etree.XPath('.//div[@data-testid="listing-card-title"]')
+X_CARD_PRICE = etree.XPath('.//div[@data-testid="price-availability-row"]//div')
+X_CARD_LINK = etree.XPath('.//a[@href]')
+X_TESTIDS = etree.XPath('//*[@data-testid]/@data-testid')
+X_SECTION_IDS = etree.XPath('//*[@data-section-id]/@data-section-id')
+
+# Never part of visible text (BeautifulSoup.get_text skipped them too)
+_NON_TEXT_TAGS = ('script', 'style', 'template')
+
+
+class Document:
+    """One parsed page. `html` is kept for raw-source regexes (host id);
+    `text`/`lower`, keyword presence per category and per-element text
+    are computed once and cached."""
+
+    def __init__(self, html):
+        self.html = html or ""
+        try:
+            self.root = lxml.html.document_fromstring(self.html or "<html/>")
+        except ValueError:  # str with an XML encoding declaration
+            self.root = lxml.html.document_fromstring(self.html.encode("utf-8"))
+        except etree.ParserError:
+            self.root = lxml.html.document_fromstring("<html/>")
+        etree.strip_elements(self.root, *_NON_TEXT_TAGS, with_tail=False)
+        self._text = None
+        self._lower = None
+        self._has = {}
+        self._el_text = {}
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = self.text_of(self.root)
+        return self._text
+
+    @property
+    def lower(self):
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    def has(self, category):
+        """True when a keyword of `category` occurs anywhere on the page."""
+        found = self._has.get(category)
+        if found is None:
+            found = REGISTRY.any(self.lower, category, lowered=True)
+            self._has[category] = found
+        return found
+
+    def text_of(self, el):
+        """Element text (like Tag.get_text()), memoized per element."""
+        txt = self._el_text.get(el)
+        if txt is None:
+            txt = "".join(el.itertext())
+            self._el_text[el] = txt
+        return txt
+
+    def xpath(self, compiled, el=None):
+        return compiled(self.root if el is None else el)
+
+    def first(self, compiled, el=None):
+        found = compiled(self.root if el is None else el)
+        return found[0] if found else None
+
+
+def strip_text(el):
+    """Like Tag.get_text(strip=True)."""
+    return "".join(s.strip() for s in el.itertext())
+
+
+def as_document(page):
+    return page if isinstance(page, Document) else Document(page)
+
+
+# ──────────────────────────────────────────────
+# LISTING PAGE
+# ──────────────────────────────────────────────
+def extract_description(doc):
+    desc_el = doc.first(X_DESCRIPTION)
+    return strip_text(desc_el) if desc_el is not None else ""
+
+
+def extract_maintenance(page):
+    """Maintenance labels whose keywords appear on the page (a Document,
+    or plain page text)."""
+    if isinstance(page, Document):
+        hits = {cat for cat in MAINTENANCE_CATEGORIES if page.has(cat)}
+    else:
+        hits = REGISTRY.present(page, MAINTENANCE_CATEGORIES)
+    return maintenance_labels(hits)
+
+
+def review_gap(rating, text):
+    """One cleanliness-gap mention for a ≤4★ review, or None."""
+    txt = text.lower()
+    if rating <= 4 and REGISTRY.any(txt, "cleanliness"):
+        return f"({rating}★): {txt[:80].strip()}..."
+    return None
+
+
+def extract_review_gaps(doc):
+    gaps = []
+    for card in doc.xpath(X_REVIEW_CARDS):
+        try:
+            rating = 5
+            r_el = doc.first(X_REVIEW_RATING, card)
+            if r_el is not None:
+                m = _RATING_RE.search(r_el.get('aria-label', ''))
+                if m: rating = int(m.group(1))
+            if rating <= 4:
+                t_el = doc.first(X_REVIEW_TEXT, card)
+                if t_el is not None:
+                    gap = review_gap(rating, doc.text_of(t_el))
+                    if gap:
+                        gaps.append(gap)
+        except Exception:
+            continue
+    return gaps
+
+
+def find_host_section(doc):
+    """Returns (section, how_it_was_found) or (None, None)."""
+    for compiled, css in HOST_SELECTORS:
+        section = doc.first(compiled)
+        if section is not None:
+            return section, css
+    # Fallback: find by text content (anfitrião/anfitriã/superhost).
+    # No keyword anywhere on the page → no section can match.
+    if not doc.has("host_section"):
+        return None, None
+    for section in doc.xpath(X_SECTIONS):
+        if REGISTRY.any(doc.text_of(section), "host_section"):
+            sid = section.get('data-section-id', '?')
+            return section, f"TEXT MATCH (tag={section.tag}, section-id={sid})"
+    return None, None
+
+
+def is_superhost(host_text):
+    return REGISTRY.any(host_text, "superhost")
+
+
+def clean_host_name(name):
+    """Strips 'Superhost', 'X anos hospedando' and trailing dots from a name."""
+    if not name:
+        return None
+    name = _SUPERHOST_SUFFIX_RE.sub('', name).strip()
+    name = _YEARS_HOSTING_RE.sub('', name).strip()
+    name = name.rstrip(' ·.·')
+    return name or None
+
+
+def extract_host_name(doc, host_section):
+    """Host name from the section TEXT, not from h2/h3 (those often pick
+    up the 'Consultar Perfil' button label)."""
+    h_text = doc.text_of(host_section)
+    host_name = None
+    for pat in HOST_NAME_PATTERNS:
+        m = pat.search(h_text)
+        if m:
+            candidate = m.group(1).strip()
+            if candidate and candidate.lower() not in NAME_BLACKLIST:
+                host_name = candidate
+                break
+
+    # Fallback: try h2/h3 but filter garbage
+    if not host_name:
+        host_name_el = doc.first(X_HEADING, host_section)
+        if host_name_el is not None:
+            raw = strip_text(host_name_el)
+            raw = _NAME_PREFIX_RE.sub('', raw).strip()
+            if raw and raw.lower() not in NAME_BLACKLIST:
+                host_name = raw
+
+    return clean_host_name(host_name)
+
+
+def extract_host_id(raw_html):
+    """Returns (host_id, via). Only the HOST's link carries
+    PdpHomeMarketplace — reviewers never do."""
+    m = _HOST_LINK_RE.search(raw_html)
+    if m:
+        return m.group(1), "PdpMarker"
+    m = _HOST_JSON_RE.search(raw_html)
+    if m:
+        return m.group(1), "JSON"
+    return None, None
+
+
+def extract_listing_count(page_text):
+    """'N anúncios' on the listing page itself (profile unreachable)."""
+    m = _LISTING_COUNT_RE.search(page_text)
+    return int(m.group(1)) if m else None
+
+
+def extract_price(doc):
+    """Nightly price from the booking total (3-night stay), or None."""
+    price_el = doc.first(X_PRICE)
+    if price_el is not None:
+        digits = ''.join(filter(str.isdigit,
+            doc.text_of(price_el).split(',')[0].replace('.', '')))
+        if digits:
+            return int(int(digits) / 3)
+    return None
+
+
+def page_structure(doc):
+    """(data-testids, data-section-ids) — debug dump when no host section."""
+    return doc.xpath(X_TESTIDS)[:20], doc.xpath(X_SECTION_IDS)[:20]
+
+
+# ──────────────────────────────────────────────
+# HOST PROFILE PAGE
+# ──────────────────────────────────────────────
+def extract_portfolio_size(doc):
+    """Returns (portfolio_size, via)."""
+    for pat, label in PORTFOLIO_PATTERNS:
+        m = pat.search(doc.text)
+        if m:
+            val = int(m.group(1))
+            if val > 1:  # Ignore "1 anúncio" (not useful)
+                return val, label
+    # Last resort: count all /rooms/ links on profile
+    room_links = {a.get('href').split('?')[0] for a in doc.xpath(X_ROOM_LINKS)}
+    if len(room_links) > 1:
+        return len(room_links), "room links"
+    return 1, None
+
+
+def room_link(url):
+    """Room URL in the form discovery stores in leads.link_imovel
+    (https://airbnb.com.br/rooms/<id>), or None if it is not a listing."""
+    m = _ROOM_ID_RE.search(url or "")
+    return f"https://airbnb.com.br/rooms/{m.group(1)}" if m else None
+
+
+def extract_other_listings(doc):
+    other_listings = []
+    seen = set()
+    for a_tag in doc.xpath(X_ROOM_LINKS):
+        room_href = a_tag.get('href').split('?')[0]
+        room_url = ("https://www.airbnb.com.br" + room_href
+                    if room_href.startswith('/') else room_href)
+        title_text = strip_text(a_tag)[:60] or "Listing"
+        if room_url not in seen:
+            other_listings.append({"title": title_text, "url": room_url})
+            seen.add(room_url)
+    return other_listings
+
+
+def extract_contacts(doc, description):
+    """Returns (email, phone, extras) from profile text + listing
+    description + profile links. extras may hold instagram/website."""
+    all_text = doc.text + "\n" + (description or "")
+
+    email = None
+    for e in _EMAIL_RE.findall(all_text):
+        if not any(x in e.lower() for x in EMAIL_BLACKLIST):
+            email = e
+            break
+
+    # Phone (Brazilian formats)
+    phone = None
+    m = _PHONE_RE.search(all_text)
+    if m:
+        clean_phone = re.sub(r'[^\d+]', '', m.group(0))
+        if len(clean_phone) >= 10:
+            phone = clean_phone
+
+    extras = {}
+    for a_tag in doc.xpath(X_LINKS):
+        href = a_tag.get('href', '')
+        ig_match = _INSTAGRAM_LINK_RE.search(href)
+        if ig_match:
+            ig_handle = ig_match.group(1)
+            if ig_handle.lower() not in ['airbnb', 'p', 'reel']:
+                extras['instagram'] = f"@{ig_handle}"
+        if 'http' in href and not any(x in href for x in SITE_BLACKLIST):
+            extras['website'] = href
+
+    # Also check text for Instagram handles
+    if 'instagram' not in extras:
+        for handle in _HANDLE_RE.findall(all_text):
+            if handle.lower() not in HANDLE_BLACKLIST:
+                extras['instagram'] = f"@{handle}"
+                break
+
+    return email, phone, extras
+
+
+# ──────────────────────────────────────────────
+# SEARCH PAGE
+# ──────────────────────────────────────────────
+def search_cards(doc):
+    return doc.xpath(X_CARDS)
+
+
+def extract_search_cards(doc, num_nights=3, limit=20):
+    """Returns [{titulo, link_imovel, preco_noite}] for the result cards."""
+    cards = []
+    for item in search_cards(doc)[:limit]:
+        try:
+            title_el = doc.first(X_CARD_TITLE, item)
+            title = (strip_text(title_el) if title_el is not None
+                     else "Luxury Property")
+
+            price_el = doc.first(X_CARD_PRICE, item)
+            price = 1000
+            if price_el is not None:
+                ptxt = doc.text_of(price_el)
+                nm = _NIGHTS_RE.search(ptxt)
+                denom = int(nm.group(1)) if nm else 1
+                digits = ''.join(filter(
+                    str.isdigit, ptxt.split(',')[0].replace('.', '')))
+                if digits:
+                    val = int(digits)
+                    price = (int(val / (denom if denom > 1 else num_nights))
+                             if denom > 1 or val > 5000 else val)
+
+            link_el = doc.first(X_CARD_LINK, item)
+            link = ("https://airbnb.com.br" + link_el.get('href').split('?')[0]
+                    if link_el is not None else "")
+            if link:
+                cards.append({"titulo": title, "link_imovel": link,
+                              "preco_noite": price})
+        except Exception:
+            continue
+    return cards
+
+
+# ──────────────────────────────────────────────
+# FULL PIPELINE
+# ──────────────────────────────────────────────
+def _stage(timings, name, fn, *args):
+    if timings is None:
+        return fn(*args)
+    t0 = time.perf_counter()
+    out = fn(*args)
+    timings[name] = timings.get(name, 0.0) + time.perf_counter() - t0
+    return out
+
+
+def parse_profile_page(prof_html, description, timings=None):
+    """All host-profile fields from one profile page (html or Document)."""
+    doc = _stage(timings, "parse", as_document, prof_html)
+    _stage(timings, "text", lambda: doc.text)
+    size, via = _stage(timings, "portfolio", extract_portfolio_size, doc)
+    others = _stage(timings, "other_listings", extract_other_listings, doc)
+    email, phone, extras = _stage(timings, "contacts", extract_contacts,
+                                  doc, description)
+    return {"portfolio_size": size, "portfolio_via": via,
+            "other_listings": others, "email": email, "phone": phone,
+            "contact_extras": extras}
+
+
+def parse_listing_pages(listing_html, reviews_html=None, profile_html=None,
+                        timings=None):
+    """Everything deep_analyze_listing extracts, from saved pages.
+
+    listing_html — listing as first loaded; reviews_html — same page after
+    'show all reviews' (optional); profile_html — host profile (optional,
+    None when it could not be reached)."""
+    doc = _stage(timings, "parse", as_document, listing_html)
+    _stage(timings, "text", lambda: doc.lower)
+    facts = {}
+    facts["description"] = _stage(timings, "description",
+                                  extract_description, doc)
+    facts["maintenance"] = _stage(timings, "maintenance",
+                                  extract_maintenance, doc)
+
+    # Reviews, host section, host id and price read the expanded page
+    if reviews_html:
+        doc = _stage(timings, "parse", as_document, reviews_html)
+    facts["review_gaps"] = _stage(timings, "reviews", extract_review_gaps, doc)
+
+    section, via = _stage(timings, "host_section", find_host_section, doc)
+    facts["host_section_via"] = via
+    facts["is_superhost"] = False
+    facts["host_name"] = None
+    if section is not None:
+        facts["is_superhost"] = is_superhost(doc.text_of(section))
+        facts["host_name"] = _stage(timings, "host_name",
+                                    extract_host_name, doc, section)
+
+    facts["host_id"], facts["host_id_via"] = _stage(
+        timings, "host_id", extract_host_id, doc.html)
+    facts["price"] = _stage(timings, "price", extract_price, doc)
+
+    if profile_html:
+        facts["profile"] = parse_profile_page(
+            profile_html, facts["description"], timings)
+    else:
+        facts["profile"] = None
+        facts["listing_count"] = extract_listing_count(doc.text)
+    return facts
+
+
+def embedded_facts(data, profile_html=None):
+    """parse_listing_pages-shaped facts from http_fetcher.parse_embedded_listing
+    output (+ the profile page when it was fetched)."""
+    facts = {"description": data['description'],
+             "maintenance": extract_maintenance(data['page_text'].lower()),
+             "review_gaps": [g for g in (review_gap(rv['rating'], rv['text'])
+                                         for rv in data['reviews']) if g],
+             "host_section_via": "JSON",
+             "is_superhost": data['is_superhost'],
+             "host_name": clean_host_name(data['host_name']),
+             "host_id": data['host_id'],
+             "host_id_via": "JSON" if data['host_id'] else None,
+             "price": data['price'],
+             "profile": None}
+    if profile_html:
+        facts["profile"] = parse_profile_page(profile_html, data['description'])
+    else:
+        facts["listing_count"] = extract_listing_count(data['page_text'])
+    return facts
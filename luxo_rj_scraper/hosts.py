@@ -0,0 +1,107 @@
+import re
+import time
+import threading
+from datetime import datetime, timezone
+
+# ──────────────────────────────────────────────
+# HOSTS — profile results shared by every listing of a host
+# ──────────────────────────────────────────────
+# The SQL side lives in migrations/006_hosts.sql. A host with 40 listings
+# used to cost 40 profile visits; now the first scrape stores the parsed
+# profile and the rest reuse it while it is younger than the TTL.
+
+PROFILE_COLUMNS = ("host_id, portfolio_size, other_listings, email, telefone, "
+                   "contact_extras, profile_scraped_at")
+
+
+_FRACTION_RE = re.compile(r'\.(\d+)')
+
+
+def _epoch(ts):
+    """timestamptz text from PostgREST → epoch seconds. Postgres trims
+    trailing zeros from the fraction (".12345+00:00"), which
+    datetime.fromisoformat only accepts from Python 3.11 on."""
+    ts = ts.replace("Z", "+00:00")
+    ts = _FRACTION_RE.sub(lambda m: "." + m.group(1)[:6].ljust(6, "0"), ts, 1)
+    at = datetime.fromisoformat(ts)
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return at.timestamp()
+
+
+def _to_profile(row):
+    """hosts row → the dict extract.parse_profile_page returns."""
+    return {"portfolio_size": row.get('portfolio_size') or 1,
+            "portfolio_via": "host cache",
+            "other_listings": row.get('other_listings') or [],
+            "email": row.get('email'), "phone": row.get('telefone'),
+            "contact_extras": row.get('contact_extras') or {}}
+
+
+class HostCache:
+    """Fresh host profiles, from memory first and the hosts table second.
+    ttl_seconds <= 0 disables reuse (every lead visits the profile)."""
+
+    def __init__(self, client, ttl_seconds):
+        self.client = client
+        self.ttl = ttl_seconds
+        self._mem = {}  # host_id -> (scraped_at epoch, profile)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, host_id):
+        """Parsed profile if scraped within the TTL, else None. A stale
+        memory entry is re-read from the table: another worker may have
+        refreshed the host since."""
+        if self.ttl <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(host_id)
+        if hit is None or now - hit[0] >= self.ttl:
+            # Age is filtered in the query; no row = nothing fresh
+            cutoff = datetime.fromtimestamp(now - self.ttl, timezone.utc)
+            res = (self.client.table("hosts").select(PROFILE_COLUMNS)
+                   .eq("host_id", host_id)
+                   .gte("profile_scraped_at", cutoff.isoformat()).execute())
+            row = res.data[0] if res.data else None
+            hit = None
+            if row:
+                try:
+                    at = _epoch(row['profile_scraped_at'])
+                except (TypeError, ValueError):
+                    at = now  # fresh per the query; re-read after one TTL
+                hit = (at, _to_profile(row))
+                with self._lock:
+                    self._mem[host_id] = hit
+        if hit:
+            self.hits += 1
+            return hit[1]
+        self.misses += 1
+        return None
+
+    def save(self, host_id, profile=None, name=None, category=None):
+        """Upserts the host row. Profile columns are only written when a
+        profile was actually parsed, so a failed visit never wipes them."""
+        row = {"host_id": host_id,
+               "updated_at": datetime.now(timezone.utc).isoformat()}
+        if name: row['nome'] = name
+        if category: row['category'] = category
+        if profile:
+            now = time.time()
+            row.update(portfolio_size=profile['portfolio_size'],
+                       other_listings=profile['other_listings'],
+                       email=profile['email'], telefone=profile['phone'],
+                       contact_extras=profile['contact_extras'],
+                       profile_scraped_at=datetime.fromtimestamp(
+                           now, timezone.utc).isoformat())
+            with self._lock:
+                self._mem[host_id] = (now, {**profile,
+                                            "portfolio_via": "host cache"})
+        self.client.table("hosts").upsert(row, on_conflict="host_id").execute()
+
+    def report(self):
+        if self.hits or self.misses:
+            print(f"    📇 Host cache: {self.hits} profile(s) reused, "
+                  f"{self.misses} to visit (TTL {self.ttl / 3600:.0f}h)")
@@ -0,0 +1,213 @@
+"""
+HTTP-first listing fetcher.
+
+Airbnb ships most of a listing page as embedded JSON (the same blob the
+Selenium path regex-matches "hostId" out of). When that blob is present we
+can skip Chrome entirely: one pooled HTTP request instead of a headless
+browser per lead.
+
+Offline check against a saved page:
+    python http_fetcher.py fixtures/listing_embedded.html
+"""
+import re
+import json
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+              "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
+
+# Script tags that carry the page's data blob
+_BLOB_RE = re.compile(
+    r'<script[^>]+id="(?:data-deferred-state[^"]*|data-injector-instances)"'
+    r'[^>]*>(.*?)</script>', re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def _build_session():
+    session = requests.Session()
+    # 429 is not retried: it is a block signal for the limiter (BLOCK_STATUSES)
+    retry = Retry(total=2, backoff_factor=1.0,
+                  status_forcelist=[500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16,
+                          max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    })
+    return session
+
+
+SESSION = _build_session()
+
+# Refused / throttled: the lead is blocked, not missing its blob
+BLOCK_STATUSES = (403, 429)
+
+
+def fetch_page(url, limiter=None, timeout=20):
+    """GETs a page through the shared session. Returns
+    (status, html, final_url); html is None unless the status is 200 and
+    status is None when the request itself failed."""
+    if limiter:
+        limiter.wait(url)
+    try:
+        resp = SESSION.get(url, timeout=timeout)
+    except requests.RequestException as e:
+        print(f"    ║ HTTP error: {e}")
+        return None, None, None
+    if resp.status_code != 200:
+        print(f"    ║ HTTP {resp.status_code} for {url[:60]}")
+        # Throttled / refused: lets an adaptive limiter back off
+        if resp.status_code in BLOCK_STATUSES and hasattr(limiter, "signal"):
+            limiter.signal(f"http_{resp.status_code}")
+        return resp.status_code, None, None
+    return resp.status_code, resp.text, resp.url
+
+
+def fetch_html(url, limiter=None, timeout=20):
+    """fetch_page without the status: (html, final_url), or (None, None)
+    on any HTTP failure."""
+    _, html, final_url = fetch_page(url, limiter, timeout)
+    return html, final_url
+
+
+# ──────────────────────────────────────────────
+# EMBEDDED JSON PARSING (pure — no network)
+# ──────────────────────────────────────────────
+def _load_blobs(html):
+    blobs = []
+    for raw in _BLOB_RE.findall(html or ""):
+        try:
+            blobs.append(json.loads(raw))
+        except ValueError:
+            continue
+    return blobs
+
+
+def _walk(obj):
+    """Yields every dict nested anywhere inside obj."""
+    stack = [obj]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            yield cur
+            stack.extend(cur.values())
+        elif isinstance(cur, list):
+            stack.extend(cur)
+
+
+def _sections(blobs):
+    """Maps sectionId -> section payload for every PDP section in the blob."""
+    found = {}
+    for blob in blobs:
+        for d in _walk(blob):
+            sid = d.get("sectionId")
+            if isinstance(sid, str) and isinstance(d.get("section"), dict):
+                found.setdefault(sid, d["section"])
+    return found
+
+
+def _strip_html(text):
+    return re.sub(r'\s+', ' ', _TAG_RE.sub(' ', text or '')).strip()
+
+
+def _parse_price(price_text, qualifier):
+    digits = ''.join(filter(str.isdigit,
+                            (price_text or '').split(',')[0].replace('.', '')))
+    if not digits:
+        return None
+    val = int(digits)
+    nm = re.search(r'(\d+)\s*noite', qualifier or '')
+    nights = int(nm.group(1)) if nm else 1
+    return int(val / nights) if nights > 1 else val
+
+
+def parse_embedded_listing(html):
+    """Extracts listing fields from the embedded data blob.
+
+    Returns None when the page has no usable blob (the caller should fall
+    back to Selenium), otherwise a dict with: description, host_id,
+    host_name, is_superhost, price, reviews [{rating, text}]."""
+    blobs = _load_blobs(html)
+    if not blobs:
+        return None
+    sections = _sections(blobs)
+    if not sections:
+        return None
+
+    out = {"description": "", "host_id": None, "host_name": None,
+           "is_superhost": False, "price": None, "reviews": [],
+           "page_text": ""}
+
+    # Description
+    desc = sections.get("DESCRIPTION_DEFAULT") or {}
+    html_desc = desc.get("htmlDescription") or {}
+    out["description"] = _strip_html(html_desc.get("htmlText")
+                                     or desc.get("description") or "")
+
+    # Host — MEET_YOUR_HOST carries a card with id/name/superhost,
+    # HOST_OVERVIEW_DEFAULT only a title like "Anfitriã(o): Name"
+    for sid in ("MEET_YOUR_HOST", "HOST_PROFILE_DEFAULT"):
+        card = (sections.get(sid) or {}).get("cardData") or {}
+        if card:
+            out["host_id"] = str(card.get("userId") or "") or None
+            out["host_name"] = card.get("name") or None
+            out["is_superhost"] = bool(card.get("isSuperhost"))
+            break
+    overview = sections.get("HOST_OVERVIEW_DEFAULT") or {}
+    if not out["host_name"] and overview.get("title"):
+        m = re.search(r'(?:Anfitri[ãa]\(?o?\)?[:\s]+|Hosted by\s+)(.+)',
+                      overview["title"])
+        if m:
+            out["host_name"] = m.group(1).strip()
+    if not out["host_id"]:
+        m = re.search(r'"hostId"\s*:\s*"?(\d+)"?', html)
+        if m:
+            out["host_id"] = m.group(1)
+    if not out["is_superhost"]:
+        out["is_superhost"] = any(bool(d.get("isSuperhost"))
+                                  for d in _walk(overview))
+
+    # Price — structuredDisplayPrice in the booking sidebar
+    for d in _walk(sections.get("BOOK_IT_SIDEBAR") or {}):
+        line = d.get("primaryLine")
+        if isinstance(line, dict) and line.get("price"):
+            out["price"] = _parse_price(line.get("price"),
+                                        line.get("qualifier"))
+            break
+
+    # Reviews
+    for sid in ("REVIEWS_DEFAULT", "REVIEWS"):
+        for rv in (sections.get(sid) or {}).get("reviews") or []:
+            if isinstance(rv, dict) and rv.get("comments"):
+                out["reviews"].append({
+                    "rating": int(rv.get("rating") or 5),
+                    "text": _strip_html(rv["comments"]),
+                })
+
+    # Every visible string on the page (amenities included) — the
+    # equivalent of soup.get_text() for keyword matching
+    strings = []
+    for section in sections.values():
+        for d in _walk(section):
+            strings.extend(v for k, v in d.items()
+                           if isinstance(v, str) and not k.startswith("__"))
+    out["page_text"] = _strip_html(" ".join(strings))
+
+    # A blob without description and host is not worth trusting
+    if not out["description"] and not out["host_id"]:
+        return None
+    return out
+
+
+if __name__ == "__main__":
+    import sys
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            parsed = parse_embedded_listing(f.read())
+        print(f"── {path}")
+        print(json.dumps(parsed, indent=2, ensure_ascii=False))
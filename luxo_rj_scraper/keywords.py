@@ -0,0 +1,174 @@
+"""
+Keyword registry — every keyword list the scraper matches against text,
+compiled once at import.
+
+Every term is matched in its listed spelling and accent-folded
+("imóveis" also as "imoveis", "anfitrião" also as "anfitriao") against
+the lowercased text, so accent-less text matches too without folding a
+whole page per call. Matching keeps the old `kw in text` (substring)
+semantics, one category at a time, stopping at the first hit:
+REGISTRY.any(text, category) / REGISTRY.present(text, categories), and
+REGISTRY.scan(text) for the terms themselves.
+
+Benchmark against the old per-list loops on the fixture pages:
+    python keywords.py [page.html ...]
+"""
+import unicodedata
+
+LUX_TITLE_KEYWORDS = ['luxo', 'luxury', 'vista mar', 'ocean view', 'cobertura',
+                      'penthouse', 'design', 'exclusivo']
+
+COMPANY_KEYWORDS = [
+    'stay', 'luxury', 'rent', 'aluguel', 'temporada', 'admin', 'management',
+    'gestão', 'gestao', 'group', 'grupo', 'properties', 'propriedades',
+    'imóveis', 'imoveis', 'real estate', 'host', 'hospedagem', 'suítes',
+    'suites', 'flat', 'apartment', 'apartamento', 'residencial',
+    'services', 'serviços', 'concierge', 'vip', 'elite', 'rio', 'conforto'
+]
+
+MAINTENANCE_MAP = {
+    'Mármore/Vidro': ['mármore', 'marble', 'vidro', 'glass', 'madeira maciça'],
+    'Piscina/Jacuzzi': ['piscina', 'pool', 'jacuzzi', 'hidromassagem'],
+    'Automação': ['automatizada', 'alexa', 'voice command', 'cinema', 'smart'],
+    'Café Premium': ['nespresso', 'espresso', 'cafeteira']
+}
+
+CLEANLINESS_FLAGS = ['poeira', 'sujo', 'limpeza', 'dust', 'dirty', 'mancha',
+                     'odor', 'rodapé', 'suja', 'manchada']
+
+SUPERHOST_KEYWORDS = ['superhost', 'superanfitrião', 'superanfitriã']
+
+HOST_TEXT_KEYWORDS = ['anfitrião', 'anfitriã', 'hosted by',
+                      'superhost', 'superanfitrião']
+
+
+def fold(text):
+    """Lowercase + strip accents. Terms are ASCII once folded, so any
+    character that does not fold to ASCII can be dropped."""
+    return (unicodedata.normalize("NFKD", text.lower())
+            .encode("ascii", "ignore").decode("ascii"))
+
+
+class KeywordRegistry:
+    """Named keyword categories. Each category keeps its own variant
+    list, so a caller only pays for the categories it asks about."""
+
+    def __init__(self, categories):
+        # List order kept (the early exit hits common terms first), the
+        # accent-folded spellings go after
+        self.categories = {
+            name: list(dict.fromkeys([*(t.lower() for t in terms),
+                                      *(fold(t) for t in terms)]))
+            for name, terms in categories.items()}
+        # Variant → folded term, so both spellings count as one term
+        self._canon = {v: fold(v) for terms in self.categories.values()
+                       for v in terms}
+        # Presence only needs the variants that contain no other one
+        # ("anfitrião" is implied by "anfitriã", "manchada" by "mancha")
+        self._probes = {
+            name: [t for t in terms
+                   if not any(u != t and u in t for u in terms)]
+            for name, terms in self.categories.items()}
+
+    def any(self, text, category, lowered=False):
+        """True when any term of one category occurs (stops at first hit)."""
+        text = text if lowered else text.lower()
+        return any(t in text for t in self._probes[category])
+
+    def present(self, text, categories, lowered=False):
+        """The categories (of `categories`) with at least one term in text."""
+        text = text if lowered else text.lower()
+        return {name for name in categories
+                if any(t in text for t in self._probes[name])}
+
+    def scan(self, text, categories=None, lowered=False):
+        """{category: set of folded terms found} for every category hit
+        (of `categories`, default all). Probes every term — use any() /
+        present() when presence is all that matters."""
+        text = text if lowered else text.lower()
+        hits = {}
+        for name in categories or self.categories:
+            found = {self._canon[t] for t in self.categories[name] if t in text}
+            if found:
+                hits[name] = found
+        return hits
+
+    def count(self, text, category, lowered=False):
+        """Number of distinct terms of one category found in text."""
+        return len(self.scan(text, [category], lowered).get(category, ()))
+
+
+CATEGORIES = {
+    "lux_title": LUX_TITLE_KEYWORDS,
+    "company": COMPANY_KEYWORDS,
+    "cleanliness": CLEANLINESS_FLAGS,
+    "superhost": SUPERHOST_KEYWORDS,
+    "host_section": HOST_TEXT_KEYWORDS,
+    **{f"maintenance:{label}": kws for label, kws in MAINTENANCE_MAP.items()},
+}
+REGISTRY = KeywordRegistry(CATEGORIES)
+MAINTENANCE_CATEGORIES = [f"maintenance:{label}" for label in MAINTENANCE_MAP]
+
+
+def maintenance_labels(hits):
+    """MAINTENANCE_MAP labels (in map order) among the hit categories (a
+    present() set or a scan() result)."""
+    return [lbl for lbl in MAINTENANCE_MAP if f"maintenance:{lbl}" in hits]
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import time
+    import extract
+
+    here = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+    paths = sys.argv[1:] or [os.path.join(here, f) for f in
+                             ("listing_ipanema.html", "reviews_ipanema.html",
+                              "listing_leblon.html", "listing_barra.html")]
+    rounds, repeats = 200, 5
+
+    def old_loops(text):
+        # What deep_analyze_listing + scoring did before: one `in` loop per list
+        low = text.lower()
+        maint = [lbl for lbl, kws in MAINTENANCE_MAP.items()
+                 if any(k in low for k in kws)]
+        lux = sum(1 for k in LUX_TITLE_KEYWORDS if k in low)
+        company = any(k in low for k in COMPANY_KEYWORDS)
+        dirty = any(f in low for f in CLEANLINESS_FLAGS)
+        superhost = any(k in low for k in SUPERHOST_KEYWORDS)
+        host = any(k in low for k in HOST_TEXT_KEYWORDS)
+        return maint, lux, company, dirty, superhost, host
+
+    def registry(text):
+        # Lowercased once, shared by every category (as Document.lower is)
+        low = text.lower()
+        hits = REGISTRY.present(low, [*MAINTENANCE_CATEGORIES, "company",
+                                      "cleanliness", "superhost",
+                                      "host_section"], lowered=True)
+        return (maintenance_labels(hits),
+                REGISTRY.count(low, "lux_title", lowered=True),
+                "company" in hits, "cleanliness" in hits,
+                "superhost" in hits, "host_section" in hits)
+
+    print("┌── Keyword matching, full page text "
+          f"(best of {repeats} × {rounds} rounds)")
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            text = extract.Document(f.read()).text
+        timings = {}
+        for name, fn in (("loops", old_loops), ("registry", registry)):
+            best = None
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                for _ in range(rounds):
+                    out = fn(text)
+                took = (time.perf_counter() - t0) / rounds
+                best = took if best is None else min(best, took)
+            timings[name] = (best, out)
+        ref = timings["loops"][1]
+        same = all(out == ref for _, out in timings.values())
+        print(f"│ {os.path.basename(path):<22} {len(text) / 1024:4.0f} KB  " +
+              "  ".join(f"{k} {t * 1000:6.3f} ms" for k, (t, _) in timings.items())
+              + ("  (same hits)" if same else "  (HITS DIFFER)"))
+    print("└──")
@@ -0,0 +1,161 @@
+"""
+Lean browser profile + page cost measurement.
+
+The lean profile blocks everything our selectors never read: images,
+media, web fonts and third-party analytics. Page cost (bytes over the
+wire, load time) is read from Chrome's performance log, so it covers
+cross-origin resources too.
+
+Compare both profiles on the VM:
+    python lean_profile.py <listing_url> [<url> ...]
+"""
+import json
+import threading
+
+BLOCKED_URL_PATTERNS = [
+    # Photos and media (Airbnb serves listing photos from muscache)
+    "*muscache.com/im/*", "*.jpg", "*.jpeg", "*.png", "*.webp", "*.gif",
+    "*.avif", "*.svg", "*.mp4", "*.webm", "*.m3u8",
+    # Web fonts
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    # Analytics / trackers
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googleadservices.com*", "*facebook.net*", "*facebook.com/tr*",
+    "*bat.bing.com*", "*hotjar.com*", "*tiktok.com*", "*branch.io*",
+    "*pinterest.com*", "*criteo.com*",
+]
+
+
+def apply_lean_options(opts):
+    """Chrome options half of the lean profile (applied before launch)."""
+    opts.add_argument("--blink-settings=imagesEnabled=false")
+    opts.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.media_stream": 2,
+    })
+
+
+def enable_measurement(opts):
+    """Turns on Chrome's performance log so page cost can be measured.
+    The log must be drained (measure_page) after every page load."""
+    opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def enable_blocking(driver):
+    """CDP half of the lean profile (applied to a live driver)."""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs",
+                           {"urls": BLOCKED_URL_PATTERNS})
+
+
+# ──────────────────────────────────────────────
+# PAGE COST
+# ──────────────────────────────────────────────
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def discard_log(driver):
+    """Drops what the performance log holds so far (back-navigation,
+    clicks, lazy loads after the last measure) — call right before the
+    page load that measure_page will count."""
+    try:
+        driver.get_log("performance")
+    except Exception:
+        pass
+
+
+def _bytes_from_log(driver):
+    total, requests, blocked = 0, 0, 0
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return None, 0, 0
+    for entry in entries:
+        try:
+            msg = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method = msg.get("method")
+        if method == "Network.loadingFinished":
+            total += msg["params"].get("encodedDataLength", 0)
+            requests += 1
+        elif (method == "Network.loadingFailed"
+              and msg["params"].get("blockedReason")):
+            blocked += 1
+    return total, requests, blocked
+
+
+def _load_ms(driver):
+    try:
+        return driver.execute_script(
+            "const n = performance.getEntriesByType('navigation')[0];"
+            "return n ? (n.loadEventEnd || n.domContentLoadedEventEnd)"
+            " - n.startTime : null;")
+    except Exception:
+        return None
+
+
+def measure_page(driver, profile, label):
+    """Records bytes transferred and load time for the page just loaded.
+    Drains the performance log, so call it once per page load."""
+    total, requests, blocked = _bytes_from_log(driver)
+    load_ms = _load_ms(driver)
+    if total is None:
+        return None
+    with _stats_lock:
+        st = _stats.setdefault((profile, label), {
+            "pages": 0, "bytes": 0, "requests": 0, "blocked": 0,
+            "load_ms": 0.0, "timed": 0})
+        st["pages"] += 1
+        st["bytes"] += total
+        st["requests"] += requests
+        st["blocked"] += blocked
+        if load_ms:
+            st["load_ms"] += load_ms
+            st["timed"] += 1
+    load_txt = f", load {load_ms / 1000:.1f}s" if load_ms else ""
+    print(f"    ║ 📦 {label} [{profile}]: {total / 1024:.0f} KB, "
+          f"{requests} req, {blocked} blocked{load_txt}")
+    return {"bytes": total, "requests": requests, "blocked": blocked,
+            "load_ms": load_ms}
+
+
+def report_page_costs():
+    with _stats_lock:
+        snapshot = {k: dict(v) for k, v in _stats.items()}
+    if not snapshot:
+        return
+    print("    ┌── Page cost by profile")
+    for (profile, label), st in sorted(snapshot.items()):
+        avg_kb = st["bytes"] / st["pages"] / 1024
+        avg_load = (st["load_ms"] / st["timed"] / 1000) if st["timed"] else 0
+        print(f"    │ {label} [{profile}]: n={st['pages']} "
+              f"avg {avg_kb:.0f} KB, {st['requests'] / st['pages']:.0f} req, "
+              f"load {avg_load:.1f}s")
+    print("    └──")
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from scraper import get_desktop_driver
+    import page_ready
+
+    urls = sys.argv[1:]
+    if not urls:
+        print("Usage: lean_profile.py <url> [<url> ...]")
+        sys.exit(1)
+    for lean in (False, True):
+        profile = "lean" if lean else "full"
+        driver = get_desktop_driver(lean=lean)
+        try:
+            for url in urls:
+                discard_log(driver)
+                driver.get(url)
+                page_ready.wait_for_document(driver, f"{profile} load", 30)
+                time.sleep(2)  # let late requests finish before counting
+                measure_page(driver, profile, "page")
+        finally:
+            driver.quit()
+    report_page_costs()
@@ -0,0 +1,180 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ──────────────────────────────────────────────
+# METRICS — where the time per lead goes
+# ──────────────────────────────────────────────
+# Each scrape is a trace of laps: begin_lead() starts the stopwatch and
+# every lap("stage") books the time since the previous lap to that stage,
+# so the stages of one lead always add up to its total. Outcomes (host id
+# via PdpMarker/JSON/none, login redirects, errors…) are plain counters.
+#
+# Exposed as Prometheus text on http://127.0.0.1:METRICS_PORT/metrics
+# (JSON on /metrics.json) and, with METRICS_FILE, one JSON line per lead.
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stages = {}    # stage -> {count, total, max}
+        self._counters = {}  # (event, value) -> n
+        self.jsonl_path = None
+        self.started = time.time()
+
+    # ── Aggregates ──
+    def observe(self, stage, seconds):
+        with self._lock:
+            st = self._stages.setdefault(stage, {"count": 0, "total": 0.0,
+                                                 "max": 0.0})
+            st["count"] += 1
+            st["total"] += seconds
+            st["max"] = max(st["max"], seconds)
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            trace["stages"][stage] = trace["stages"].get(stage, 0.0) + seconds
+
+    def count(self, event, value="", n=1):
+        with self._lock:
+            key = (event, str(value))
+            self._counters[key] = self._counters.get(key, 0) + n
+        trace = getattr(self._local, "trace", None)
+        if trace is not None and value:
+            trace["events"][event] = str(value)
+
+    def counter(self, event, value=""):
+        """Current value of one count() counter."""
+        with self._lock:
+            return self._counters.get((event, str(value)), 0)
+
+    def stage(self, name):
+        """Context manager timing one block as `name`."""
+        return _StageTimer(self, name)
+
+    # ── Per-lead trace (one per worker thread) ──
+    def begin_lead(self, lead_id, engine):
+        now = time.monotonic()
+        self._local.trace = {"lead_id": str(lead_id), "engine": engine,
+                             "t0": now, "last": now, "stages": {},
+                             "events": {}}
+
+    def lap(self, stage):
+        trace = getattr(self._local, "trace", None)
+        if trace is None:
+            return
+        now = time.monotonic()
+        seconds, trace["last"] = now - trace["last"], now
+        self.observe(stage, seconds)
+
+    def end_lead(self, outcome):
+        trace = getattr(self._local, "trace", None)
+        if trace is None:
+            return
+        self._local.trace = None
+        total = time.monotonic() - trace["t0"]
+        self.observe("lead_total", total)
+        self.count("lead", outcome)
+        if self.jsonl_path:
+            line = {"ts": round(time.time(), 3), "lead_id": trace["lead_id"],
+                    "engine": trace["engine"], "outcome": outcome,
+                    "total_s": round(total, 3),
+                    "stages_s": {k: round(v, 3)
+                                 for k, v in trace["stages"].items()},
+                    **trace["events"]}
+            try:
+                with self._lock, open(self.jsonl_path, "a",
+                                      encoding="utf-8") as f:
+                    f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"    ⚠ Could not write metrics line: {e}")
+
+    # ── Export ──
+    def snapshot(self):
+        with self._lock:
+            return {
+                "uptime_s": round(time.time() - self.started, 1),
+                "stages": {k: dict(v) for k, v in self._stages.items()},
+                "counters": [{"event": e, "value": v, "n": n}
+                             for (e, v), n in sorted(self._counters.items())],
+            }
+
+    def prometheus(self):
+        snap = self.snapshot()
+        out = ["# TYPE luxo_stage_seconds summary"]
+        for stage, st in sorted(snap["stages"].items()):
+            out.append(f'luxo_stage_seconds_sum{{stage="{stage}"}} {st["total"]:.6f}')
+            out.append(f'luxo_stage_seconds_count{{stage="{stage}"}} {st["count"]}')
+        out.append("# TYPE luxo_stage_seconds_max gauge")
+        for stage, st in sorted(snap["stages"].items()):
+            out.append(f'luxo_stage_seconds_max{{stage="{stage}"}} {st["max"]:.6f}')
+        out.append("# TYPE luxo_events_total counter")
+        for c in snap["counters"]:
+            out.append(f'luxo_events_total{{event="{c["event"]}",'
+                       f'value="{c["value"]}"}} {c["n"]}')
+        out.append("# TYPE luxo_uptime_seconds gauge")
+        out.append(f"luxo_uptime_seconds {snap['uptime_s']}")
+        return "\n".join(out) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Starts the /metrics endpoint on a daemon thread."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body = json.dumps(registry.snapshot()).encode("utf-8")
+                    ctype = "application/json"
+                elif self.path.startswith("/metrics"):
+                    body = registry.prometheus().encode("utf-8")
+                    ctype = "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http",
+                         daemon=True).start()
+        print(f"    📈 Metrics on http://{host}:{port}/metrics")
+        return server
+
+    def report(self):
+        snap = self.snapshot()
+        leads = snap["stages"].get("lead_total", {}).get("count", 0)
+        if not leads:
+            return
+        print(f"    ┌── Stage timings over {leads} lead(s)")
+        for stage, st in sorted(snap["stages"].items(),
+                                key=lambda kv: -kv[1]["total"]):
+            print(f"    │ {stage:<14} avg {st['total'] / leads:6.2f}s/lead  "
+                  f"max {st['max']:6.2f}s  ({st['count']}×)")
+        events = ", ".join(f"{c['event']}={c['value']}:{c['n']}"
+                           for c in snap["counters"])
+        print(f"    └── {events}")
+
+
+class _StageTimer:
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.monotonic() - self.t0)
+        return False
+
+
+# One registry per process
+METRICS = Metrics()
@@ -0,0 +1,13 @@
+-- 001 — one lead per listing URL
+-- Lets discovery bulk-upsert with ON CONFLICT (link_imovel) DO NOTHING
+-- instead of checking every card with its own SELECT.
+
+-- Keep the oldest row when the same link was inserted twice (ties on
+-- criado_em broken by id, so exactly one row survives)
+delete from leads a
+using leads b
+where a.link_imovel = b.link_imovel
+  and (a.criado_em, a.id) > (b.criado_em, b.id);
+
+create unique index if not exists leads_link_imovel_key
+    on leads (link_imovel);
@@ -0,0 +1,12 @@
+-- 002 — realtime feed for the watcher
+-- The app already streams `leads`; make sure the table is in the
+-- realtime publication so the watcher's pending-lead subscription fires.
+do $$
+begin
+    if not exists (
+        select 1 from pg_publication_tables
+        where pubname = 'supabase_realtime' and tablename = 'leads'
+    ) then
+        alter publication supabase_realtime add table leads;
+    end if;
+end $$;
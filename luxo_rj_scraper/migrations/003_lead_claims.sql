@@ -0,0 +1,91 @@
+-- 003 — atomic job claiming for multiple watchers
+-- pending → in_progress (claimed_by + lease) → ready/error.
+-- Crashed workers leave expired leases behind; reap_expired_leases()
+-- puts those leads back to pending (or error after too many attempts).
+
+alter table leads add column if not exists claimed_by text;
+alter table leads add column if not exists lease_expires_at timestamptz;
+alter table leads add column if not exists claim_attempts int not null default 0;
+
+create index if not exists leads_status_lease_idx
+    on leads (intelligence_status, lease_expires_at);
+
+-- Claims up to p_limit pending leads for one worker. FOR UPDATE SKIP LOCKED
+-- means two watchers calling this at the same time never get the same row.
+create or replace function claim_pending_leads(
+    p_worker text,
+    p_limit int default 10,
+    p_lease_seconds int default 900
+) returns setof leads
+language sql as $$
+    update leads l
+       set intelligence_status = 'in_progress',
+           claimed_by = p_worker,
+           lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+           claim_attempts = l.claim_attempts + 1
+     where l.id in (
+           select id from leads
+            where intelligence_status = 'pending'
+            order by criado_em
+            limit p_limit
+            for update skip locked)
+    returning l.*;
+$$;
+
+-- Extends the lease on leads this worker still holds.
+create or replace function renew_leases(
+    p_worker text,
+    p_ids uuid[],
+    p_lease_seconds int default 900
+) returns int
+language plpgsql as $$
+declare n int;
+begin
+    update leads
+       set lease_expires_at = now() + make_interval(secs => p_lease_seconds)
+     where id = any(p_ids)
+       and claimed_by = p_worker
+       and intelligence_status = 'in_progress';
+    get diagnostics n = row_count;
+    return n;
+end $$;
+
+-- Hands leads this worker still holds back to the queue (clean shutdown).
+-- A lead that keeps coming back unfinished ends up as 'error'.
+create or replace function release_leases(
+    p_worker text,
+    p_ids uuid[],
+    p_max_attempts int default 3
+) returns int
+language plpgsql as $$
+declare n int;
+begin
+    update leads
+       set intelligence_status = case when claim_attempts >= p_max_attempts
+                                      then 'error' else 'pending' end,
+           claimed_by = null,
+           lease_expires_at = null
+     where id = any(p_ids)
+       and claimed_by = p_worker
+       and intelligence_status = 'in_progress';
+    get diagnostics n = row_count;
+    return n;
+end $$;
+
+-- Returns leads whose lease ran out (worker crashed) to the queue.
+create or replace function reap_expired_leases(
+    p_max_attempts int default 3
+) returns int
+language plpgsql as $$
+declare n int;
+begin
+    update leads
+       set intelligence_status = case when claim_attempts >= p_max_attempts
+                                      then 'error' else 'pending' end,
+           claimed_by = null,
+           lease_expires_at = null
+     where intelligence_status = 'in_progress'
+       and lease_expires_at < now();
+    get diagnostics n = row_count;
+    return n;
+end $$;
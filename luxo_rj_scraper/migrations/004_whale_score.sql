@@ -0,0 +1,20 @@
+-- 004 — server-side "whale" score
+-- relative_score used to be recomputed inside the app on every stream
+-- event. The scraper now writes it (scoring.whale_factors) after each
+-- enrichment and during `python scraper.py rescore`, together with the
+-- four weighted factors so the ranking can be explained:
+--   score_luxury  price rank in the table        (45%)
+--   score_scale   host portfolio size × 10       (25%)
+--   score_service maintenance items × 20         (20%)
+--   score_pro     company host 100 / person 50   (10%)
+-- Backfill: run `python scraper.py rescore` once after this migration.
+
+alter table leads add column if not exists relative_score real;
+alter table leads add column if not exists score_luxury real;
+alter table leads add column if not exists score_scale real;
+alter table leads add column if not exists score_service real;
+alter table leads add column if not exists score_pro real;
+
+-- The app streams leads ordered by score with a limit
+create index if not exists leads_relative_score_idx
+    on leads (relative_score desc nulls last);
@@ -0,0 +1,17 @@
+-- 005 — structured columns instead of JSON blocks packed into descricao
+-- The scraper used to append "--- HOST_LISTINGS_JSON ---",
+-- "--- CONTACT_INFO_JSON ---" and "--- AI_INTEL_JSON ---" blocks to the
+-- free-text description, and the app split them back out on every
+-- detail open. They now live in their own columns; descricao is just the
+-- listing description.
+-- Backfill: run `python scraper.py unpack` once after this migration
+-- (parses the blocks out of existing rows and strips them from descricao).
+
+alter table leads add column if not exists host_listings jsonb;
+alter table leads add column if not exists contact_extras jsonb;
+alter table leads add column if not exists ai_intel jsonb;
+
+-- Contact lookups, e.g. contact_extras @> '{"instagram": "..."}'
+-- or contact_extras ? 'whatsapp'
+create index if not exists leads_contact_extras_idx
+    on leads using gin (contact_extras);
@@ -0,0 +1,23 @@
+-- 006 — one row per Airbnb host, shared by all of their listings
+-- The host profile (/users/profile/{host_id}) is the slowest page of a
+-- scrape. Its results now live here, keyed by host_id; a lead whose host
+-- was scraped less than HOST_CACHE_TTL seconds ago reuses the row instead
+-- of visiting the profile again (hosts.HostCache).
+
+create table if not exists hosts (
+    host_id text primary key,
+    nome text,
+    category text,                       -- Company / Person
+    portfolio_size int,
+    other_listings jsonb,                -- room URLs from the profile
+    email text,
+    telefone text,
+    contact_extras jsonb,
+    profile_scraped_at timestamptz,      -- null until a profile was parsed
+    updated_at timestamptz not null default now()
+);
+
+alter table leads add column if not exists host_id text
+    references hosts (host_id) on delete set null;
+
+create index if not exists leads_host_id_idx on leads (host_id);
@@ -0,0 +1,36 @@
+-- 007 — leads discovered from a host's profile (HOST_ENQUEUE)
+-- A scraped profile lists the host's other rooms; the scraper can insert
+-- them as pending leads. crawl_depth / parent_lead_id record where a lead
+-- came from (0 = search discovery) and priority carries the parent's
+-- relative_score, so listings of strong hosts are scraped first.
+
+alter table leads add column if not exists crawl_depth int not null default 0;
+alter table leads add column if not exists parent_lead_id uuid
+    references leads (id) on delete set null;
+alter table leads add column if not exists priority real;
+
+create index if not exists leads_pending_priority_idx
+    on leads (priority desc nulls last, criado_em)
+    where intelligence_status = 'pending';
+
+-- Same as 003, but highest priority first (discovery leads have none and
+-- keep their old first-in first-out order after those)
+create or replace function claim_pending_leads(
+    p_worker text,
+    p_limit int default 10,
+    p_lease_seconds int default 900
+) returns setof leads
+language sql as $$
+    update leads l
+       set intelligence_status = 'in_progress',
+           claimed_by = p_worker,
+           lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+           claim_attempts = l.claim_attempts + 1
+     where l.id in (
+           select id from leads
+            where intelligence_status = 'pending'
+            order by priority desc nulls last, criado_em
+            limit p_limit
+            for update skip locked)
+    returning l.*;
+$$;
@@ -0,0 +1,19 @@
+-- 008 — resumable search discovery
+-- One row per (run, target). The scraper saves next_offset after every
+-- results page and sets done when a target is exhausted, so a restarted
+-- `python scraper.py search` skips finished targets and continues the
+-- others from the page where it stopped. A run is one day by default
+-- (DISCOVERY_RUN overrides it).
+
+create table if not exists discovery_checkpoints (
+    run_id text not null,
+    query text not null,
+    bairro text,
+    next_offset int not null default 0,
+    pages int not null default 0,
+    cards int not null default 0,
+    new_leads int not null default 0,
+    done boolean not null default false,
+    updated_at timestamptz not null default now(),
+    primary key (run_id, query)
+);
@@ -0,0 +1,41 @@
+-- 009 — re-crawl scheduling + change detection
+-- Ready leads used to be final. Now every scrape stores a hash of the
+-- fields we track (recrawl.HASH_FIELDS) and the time it is due again:
+-- high relative_score → sooner (RECRAWL_MIN_DAYS), low → later
+-- (RECRAWL_MAX_DAYS). schedule_recrawls() puts due leads back to
+-- pending; when a re-scrape hashes the same, only the status/schedule
+-- columns are written.
+
+alter table leads add column if not exists content_hash text;
+alter table leads add column if not exists last_scraped_at timestamptz;
+alter table leads add column if not exists next_recrawl_at timestamptz;
+
+create index if not exists leads_recrawl_due_idx
+    on leads (next_recrawl_at)
+    where intelligence_status = 'ready';
+
+-- Existing ready leads: same policy as the scraper defaults (3-30 days)
+update leads
+   set next_recrawl_at = now() + make_interval(
+           days => (30 - 27 * least(coalesce(relative_score, 0), 100) / 100)::int)
+ where intelligence_status = 'ready' and next_recrawl_at is null;
+
+-- Moves up to p_limit due leads back to the queue; returns how many.
+create or replace function schedule_recrawls(p_limit int default 50)
+returns int
+language plpgsql as $$
+declare n int;
+begin
+    update leads
+       set intelligence_status = 'pending',
+           claim_attempts = 0
+     where id in (
+           select id from leads
+            where intelligence_status = 'ready'
+              and next_recrawl_at <= now()
+            order by next_recrawl_at
+            limit p_limit
+            for update skip locked);
+    get diagnostics n = row_count;
+    return n;
+end $$;
@@ -0,0 +1,94 @@
+-- 010 — value-ordered pending queue with aging
+-- Claims used to take pending leads by priority (007, host-enqueued leads
+-- only) and then oldest first. Now every queued lead carries a priority
+-- on the relative_score scale (0-100+):
+--   discovery   scoring.queue_priority(lux_score, preco_noite)
+--   host links  the parent's relative_score (007)
+--   re-crawls   the lead's own relative_score
+-- and leads the user asked for (app tap → requested_at) get
+-- p_request_boost on top. Waiting adds p_aging points per hour, so a low
+-- value lead still reaches the front eventually.
+
+alter table leads add column if not exists queued_at timestamptz;
+alter table leads add column if not exists requested_at timestamptz;
+
+-- queued_at = when the lead (re-)entered the queue. A released or reaped
+-- claim (in_progress → pending) keeps its place; a finished lead is no
+-- longer a pending request.
+create or replace function leads_queue_stamp() returns trigger
+language plpgsql as $$
+begin
+    if new.intelligence_status = 'pending'
+       and (tg_op = 'INSERT'
+            or old.intelligence_status not in ('pending', 'in_progress')) then
+        new.queued_at := now();
+    elsif new.intelligence_status in ('ready', 'error') then
+        new.requested_at := null;
+    end if;
+    return new;
+end $$;
+
+drop trigger if exists leads_queue_stamp on leads;
+create trigger leads_queue_stamp
+    before insert or update of intelligence_status on leads
+    for each row execute function leads_queue_stamp();
+
+-- Leads already waiting: priority from what discovery stored, age from
+-- when they were found
+update leads
+   set priority = coalesce(priority,
+           coalesce(lux_score, 0) + 20 * least(coalesce(preco_noite, 0) / 10000.0, 1)),
+       queued_at = coalesce(queued_at, criado_em)
+ where intelligence_status = 'pending';
+
+-- New parameters change the signature: drop the 003/007 version so the
+-- RPC call is not ambiguous
+drop function if exists claim_pending_leads(text, int, int);
+
+create or replace function claim_pending_leads(
+    p_worker text,
+    p_limit int default 10,
+    p_lease_seconds int default 900,
+    p_aging real default 1.0,
+    p_request_boost real default 1000
+) returns setof leads
+language sql as $$
+    update leads l
+       set intelligence_status = 'in_progress',
+           claimed_by = p_worker,
+           lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+           claim_attempts = l.claim_attempts + 1
+     where l.id in (
+           select id from leads
+            where intelligence_status = 'pending'
+            order by coalesce(priority, 0)
+                     + case when requested_at is not null
+                            then p_request_boost else 0 end
+                     + p_aging * extract(epoch from now()
+                           - coalesce(queued_at, criado_em)) / 3600.0 desc,
+                     criado_em
+            limit p_limit
+            for update skip locked)
+    returning l.*;
+$$;
+
+-- Re-crawls queue at the lead's own value (same as 009 otherwise)
+create or replace function schedule_recrawls(p_limit int default 50)
+returns int
+language plpgsql as $$
+declare n int;
+begin
+    update leads
+       set intelligence_status = 'pending',
+           claim_attempts = 0,
+           priority = coalesce(relative_score, lux_score)
+     where id in (
+           select id from leads
+            where intelligence_status = 'ready'
+              and next_recrawl_at <= now()
+            order by next_recrawl_at
+            limit p_limit
+            for update skip locked);
+    get diagnostics n = row_count;
+    return n;
+end $$;
@@ -0,0 +1,31 @@
+-- 011 — bulk lead updates without upsert
+-- db.bulk_update_leads used upsert(on_conflict id): a lead deleted while
+-- it was being scraped came back as a ghost row holding only id + status.
+-- This function only UPDATEs rows that exist. p_rows is a JSON array of
+-- objects with the same keys; p_columns lists the keys to write (besides
+-- id). Returns the number of rows updated.
+
+create or replace function bulk_update_leads(
+    p_rows jsonb,
+    p_columns text[]
+) returns int
+language plpgsql as $$
+declare
+    sets text;
+    n int;
+begin
+    select string_agg(format('%I = r.%I', c, c), ', ')
+      into sets
+      from unnest(p_columns) c
+     where c <> 'id';
+    if sets is null then
+        return 0;
+    end if;
+    execute format(
+        'update leads l set %s
+           from jsonb_populate_recordset(null::leads, $1) r
+          where l.id = r.id', sets)
+      using p_rows;
+    get diagnostics n = row_count;
+    return n;
+end $$;
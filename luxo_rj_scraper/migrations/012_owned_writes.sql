@@ -0,0 +1,53 @@
+-- 012 — a lead is only written by the worker that holds it
+-- claim_lead() claims one given lead (single-URL mode) the same way
+-- claim_pending_leads() claims the queue, so a watcher cannot scrape it
+-- at the same time. bulk_update_leads() gains p_worker: when set, only
+-- rows still claimed by that worker are updated (a lead reaped and
+-- re-claimed elsewhere is not overwritten by the old holder).
+
+create or replace function claim_lead(
+    p_worker text,
+    p_id uuid,
+    p_lease_seconds int default 900
+) returns setof leads
+language sql as $$
+    update leads l
+       set intelligence_status = 'in_progress',
+           claimed_by = p_worker,
+           lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+           claim_attempts = l.claim_attempts + 1
+     where l.id = p_id
+       and (l.intelligence_status <> 'in_progress'
+            or l.claimed_by = p_worker
+            or l.lease_expires_at < now())
+    returning l.*;
+$$;
+
+drop function if exists bulk_update_leads(jsonb, text[]);
+
+create or replace function bulk_update_leads(
+    p_rows jsonb,
+    p_columns text[],
+    p_worker text default null
+) returns int
+language plpgsql as $$
+declare
+    sets text;
+    n int;
+begin
+    select string_agg(format('%I = r.%I', c, c), ', ')
+      into sets
+      from unnest(p_columns) c
+     where c <> 'id';
+    if sets is null then
+        return 0;
+    end if;
+    execute format(
+        'update leads l set %s
+           from jsonb_populate_recordset(null::leads, $1) r
+          where l.id = r.id
+            and ($2 is null or l.claimed_by = $2)', sets)
+      using p_rows, p_worker;
+    get diagnostics n = row_count;
+    return n;
+end $$;
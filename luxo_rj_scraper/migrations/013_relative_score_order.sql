@@ -0,0 +1,9 @@
+-- 013 — relative_score index in the order the app asks for
+-- The app streams `order=relative_score.desc` (the realtime stream API
+-- has no nulls option), which Postgres reads as DESC NULLS FIRST. The
+-- 004 index was built `desc nulls last`, so it could not serve that
+-- order and every app load sorted the table. Rebuilt to match.
+
+drop index if exists leads_relative_score_idx;
+create index if not exists leads_relative_score_idx
+    on leads (relative_score desc);
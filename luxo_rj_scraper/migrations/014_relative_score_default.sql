@@ -0,0 +1,10 @@
+-- 014 — no unscored leads at the top of the app
+-- The app streams `order=relative_score.desc`, which Postgres reads as
+-- NULLS FIRST, and the realtime stream API has no nulls option (013).
+-- Leads discovery inserts carried no score, so they took the top of the
+-- list and the stream's limit. They now start at 0. The watcher's
+-- periodic `rescore` (RESCORE_EVERY) gives them, and every older lead,
+-- a score against the current price ranks.
+
+alter table leads alter column relative_score set default 0;
+update leads set relative_score = 0 where relative_score is null;
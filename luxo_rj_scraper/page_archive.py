@@ -0,0 +1,126 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+
+# ──────────────────────────────────────────────
+# PAGE ARCHIVE — every fetched page, compressed, for offline replay
+# ──────────────────────────────────────────────
+# Layout under PAGE_ARCHIVE_DIR:
+#   objects/ab/abcdef….html.gz   one gzip file per distinct page (sha256 of
+#                                the HTML), so a page fetched twice
+#                                unchanged is stored once
+#   index.jsonl                  one line per fetch:
+#                                {ts, url, kind, lead_id, engine, sha, bytes}
+# Retention is by size: prune() drops the least recently fetched objects
+# (and their index lines) until the objects fit in max_bytes.
+# `python scraper.py replay` re-runs extraction over the latest pages of
+# every lead — see scraper.replay_archive().
+
+PRUNE_EVERY = 200  # put() calls between size checks
+
+
+class PageArchive:
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._objects = os.path.join(root, "objects")
+        self._index = os.path.join(root, "index.jsonl")
+        self._lock = threading.Lock()
+        self._puts = 0
+        os.makedirs(self._objects, exist_ok=True)
+
+    def _path(self, sha):
+        return os.path.join(self._objects, sha[:2], f"{sha}.html.gz")
+
+    def put(self, url, kind, html, lead_id=None, engine="selenium"):
+        """Archives one fetched page; returns its content hash."""
+        raw = html.encode("utf-8")
+        sha = hashlib.sha256(raw).hexdigest()
+        path = self._path(sha)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp, "wb", compresslevel=6) as f:
+                f.write(raw)
+            os.replace(tmp, path)
+        entry = {"ts": round(time.time(), 3), "url": url, "kind": kind,
+                 "lead_id": None if lead_id is None else str(lead_id),
+                 "engine": engine, "sha": sha, "bytes": len(raw)}
+        with self._lock:
+            with open(self._index, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._puts += 1
+            due = self._puts % PRUNE_EVERY == 0
+        if due:
+            self.prune()
+        return sha
+
+    def get(self, sha):
+        with gzip.open(self._path(sha), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def entries(self):
+        if not os.path.exists(self._index):
+            return []
+        with open(self._index, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def latest_by_lead(self, accept=None):
+        """{lead_id: {kind: newest index entry}} for pages that still exist
+        and pass accept(entry) (e.g. not a login wall), when given."""
+        by_kind = {}
+        for e in self.entries():
+            if e.get("lead_id"):
+                by_kind.setdefault((e["lead_id"], e["kind"]), []).append(e)
+        latest = {}
+        for (lead_id, kind), entries in by_kind.items():
+            for e in reversed(entries):
+                if (os.path.exists(self._path(e["sha"]))
+                        and (accept is None or accept(e))):
+                    latest.setdefault(lead_id, {})[kind] = e
+                    break
+        return latest
+
+    def size(self):
+        total = 0
+        for d in os.scandir(self._objects):
+            if d.is_dir():
+                total += sum(f.stat().st_size for f in os.scandir(d.path))
+        return total
+
+    def prune(self):
+        """Deletes the least recently fetched objects until the archive
+        fits in max_bytes. Returns the bytes freed."""
+        if not self.max_bytes:
+            return 0
+        with self._lock:
+            total = self.size()
+            if total <= self.max_bytes:
+                return 0
+            entries = self.entries()
+            last_seen = {}
+            for e in entries:
+                last_seen[e["sha"]] = max(e["ts"], last_seen.get(e["sha"], 0))
+            freed, dropped = 0, set()
+            for sha in sorted(last_seen, key=last_seen.get):
+                if total - freed <= self.max_bytes:
+                    break
+                path = self._path(sha)
+                try:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                except OSError:
+                    pass
+                dropped.add(sha)
+            tmp = self._index + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for e in entries:
+                    if e["sha"] not in dropped:
+                        f.write(json.dumps(e, ensure_ascii=False) + "\n")
+            os.replace(tmp, self._index)
+        print(f"    🗄 Page archive pruned {len(dropped)} page(s), "
+              f"{freed / 1e6:.1f} MB freed")
+        return freed
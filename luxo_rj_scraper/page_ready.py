@@ -0,0 +1,142 @@
+import time
+import random
+import threading
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+# ──────────────────────────────────────────────
+# PAGE READINESS — wait for the DOM the parser needs, not a fixed sleep
+# ──────────────────────────────────────────────
+# Every wait still lasts at least a random floor so we never hammer
+# Airbnb at machine speed.
+MIN_JITTER = (0.8, 1.6)
+POLL_INTERVAL = 0.25
+
+# DOM markers the parser depends on
+DESCRIPTION_MARKERS = [
+    'div[data-section-id="DESCRIPTION_DEFAULT"]',
+    'div[data-testid="pdp-description-content"]',
+]
+HOST_SECTION_MARKERS = [
+    'div[data-section-id="HOST_OVERVIEW_DEFAULT"]',
+    'div[data-section-id="HOST_PROFILE_DEFAULT"]',
+    'div[data-testid="pdp-host-profile-section"]',
+    'section[data-section-id="HOST_PROFILE_DEFAULT"]',
+    'a[href*="PdpHomeMarketplace"]',
+]
+# A listing is ready when one marker of EACH group is in: the description
+# renders well before the host overview / hostId link
+LISTING_MARKERS = [DESCRIPTION_MARKERS, HOST_SECTION_MARKERS]
+REVIEW_MARKERS = [
+    'div[role="dialog"] div[data-review-id]',
+    'div[role="dialog"] div[data-testid="pdp-review-card-content"]',
+]
+# Every host has at least the listing we came from; a bare 'section'
+# would match the login wall too
+PROFILE_MARKERS = [
+    'a[href*="/rooms/"]',
+]
+SEARCH_MARKERS = [
+    'div[data-testid="card-container"]',
+]
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _record(label, elapsed, timed_out):
+    with _stats_lock:
+        st = _stats.setdefault(label, {"count": 0, "total": 0.0,
+                                       "max": 0.0, "timeouts": 0})
+        st["count"] += 1
+        st["total"] += elapsed
+        st["max"] = max(st["max"], elapsed)
+        if timed_out:
+            st["timeouts"] += 1
+
+
+def record_wait(label, elapsed, timed_out):
+    """Books a wait done outside Selenium (tab_pool) into the same stats."""
+    _record(label, elapsed, timed_out)
+
+
+def _finish(label, started, ready, floor):
+    elapsed = time.monotonic() - started
+    if elapsed < floor:
+        time.sleep(floor - elapsed)
+        elapsed = floor
+    _record(label, elapsed, not ready)
+    status = "ready" if ready else "TIMEOUT"
+    print(f"    ║ ⏱ {label}: {status} in {elapsed:.1f}s")
+    return elapsed
+
+
+def wait_until(driver, label, condition, timeout=15):
+    """Polls condition(driver) until truthy or timeout. Never raises on
+    timeout — the parser copes with missing sections. Returns seconds waited."""
+    started = time.monotonic()
+    floor = random.uniform(*MIN_JITTER)
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(
+            condition)
+        ready = True
+    except TimeoutException:
+        ready = False
+    return _finish(label, started, ready, floor)
+
+
+def wait_for_any(driver, label, selectors, timeout=15):
+    """Waits until at least one of the CSS selectors matches."""
+    css = ", ".join(selectors)
+    return wait_until(
+        driver, label,
+        lambda d: d.find_elements(By.CSS_SELECTOR, css), timeout)
+
+
+def wait_for_all(driver, label, groups, timeout=15):
+    """Waits until every group of CSS selectors has at least one match."""
+    css = [", ".join(g) for g in groups]
+    return wait_until(
+        driver, label,
+        lambda d: all(d.find_elements(By.CSS_SELECTOR, c) for c in css),
+        timeout)
+
+
+def wait_for_document(driver, label, timeout=10):
+    """Waits for document.readyState == 'complete'."""
+    return wait_until(
+        driver, label,
+        lambda d: d.execute_script("return document.readyState") == "complete",
+        timeout)
+
+
+def wait_for_stable_count(driver, label, selector, settle=0.75, timeout=4):
+    """Waits until the number of elements matching selector stops growing
+    for `settle` seconds (lazy-loaded lists after a scroll)."""
+    state = {"count": -1, "since": time.monotonic()}
+
+    def _settled(d):
+        n = len(d.find_elements(By.CSS_SELECTOR, selector))
+        now = time.monotonic()
+        if n != state["count"]:
+            state["count"], state["since"] = n, now
+            return False
+        return now - state["since"] >= settle
+
+    return wait_until(driver, label, _settled, timeout)
+
+
+def report_waits():
+    """Prints how long each kind of wait really took."""
+    with _stats_lock:
+        snapshot = {k: dict(v) for k, v in _stats.items()}
+    if not snapshot:
+        return
+    print("    ┌── Page readiness waits")
+    for label, st in sorted(snapshot.items()):
+        avg = st["total"] / st["count"]
+        print(f"    │ {label}: n={st['count']} avg={avg:.1f}s "
+              f"max={st['max']:.1f}s timeouts={st['timeouts']}")
+    total = sum(st["total"] for st in snapshot.values())
+    print(f"    └── Total waited: {total:.0f}s")
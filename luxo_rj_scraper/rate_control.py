@@ -0,0 +1,91 @@
+import time
+from worker_pool import HostLimiter
+
+# ──────────────────────────────────────────────
+# RATE CONTROL — back off when Airbnb pushes back
+# ──────────────────────────────────────────────
+# Every page outcome is reported as a signal: "ok", or a block signal
+# (login wall, captcha, HTTP 403/429, empty search, listing without any
+# of its sections). Block signals double the gap between page loads (up
+# to max_interval); each "ok" shrinks it back 10% toward the base gap.
+# `trip_after` block signals in a row open the circuit breaker: every
+# wait() sleeps until the cool-down ends, and the cool-down doubles each
+# time the breaker re-trips without a success in between.
+
+# Visible text that only shows up on challenge / bot-check pages (match
+# against page text, not raw HTML — scripts mention "captcha" anyway)
+CAPTCHA_MARKERS = ["verify you are human", "confirme que você é humano",
+                   "press & hold", "pressione e segure",
+                   "security check", "verificação de segurança"]
+
+
+class Blocked(Exception):
+    """The page is a login wall / challenge, not the page we asked for.
+    The lead must go back to the queue, not be marked error."""
+
+
+def block_signal(url, page_text):
+    """"login" / "captcha" when a loaded page is a wall, else None.
+    page_text is the lowercased visible text (extract.Document.lower)."""
+    if url and "/login" in url:
+        return "login"
+    if any(m in (page_text or "") for m in CAPTCHA_MARKERS):
+        return "captcha"
+    return None
+
+
+class AdaptiveLimiter(HostLimiter):
+    def __init__(self, min_interval=2.0, jitter=1.0, max_interval=60.0,
+                 trip_after=3, cooldown=300.0, max_cooldown=3600.0):
+        super().__init__(min_interval, jitter)
+        self.base_interval = min_interval
+        self.max_interval = max_interval
+        self.trip_after = trip_after
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._cooldown = cooldown
+        self._streak = 0
+        self._open_until = 0.0
+        self.trips = 0
+        self.signals = {}
+
+    @property
+    def open_for(self):
+        """Seconds left on an open breaker (0 when closed)."""
+        return max(0.0, self._open_until - time.monotonic())
+
+    def wait(self, url):
+        while True:
+            remaining = self.open_for
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 30.0))
+        super().wait(url)
+
+    def signal(self, kind):
+        with self._lock:
+            self.signals[kind] = self.signals.get(kind, 0) + 1
+            if kind == "ok":
+                self._streak = 0
+                self._cooldown = self.base_cooldown
+                self.min_interval = max(self.base_interval,
+                                        self.min_interval * 0.9)
+                return
+            self._streak += 1
+            self.min_interval = min(self.max_interval, self.min_interval * 2)
+            print(f"    🚦 Block signal '{kind}' ({self._streak} in a row) — "
+                  f"page gap now {self.min_interval:.1f}s")
+            if self._streak >= self.trip_after and self.open_for <= 0:
+                self.trips += 1
+                self._open_until = time.monotonic() + self._cooldown
+                print(f"    ⛔ Circuit breaker OPEN for {self._cooldown:.0f}s "
+                      f"(trip #{self.trips})")
+                self._cooldown = min(self.max_cooldown, self._cooldown * 2)
+                self._streak = 0
+
+    def report(self):
+        if not self.signals:
+            return
+        parts = ", ".join(f"{k}={v}" for k, v in sorted(self.signals.items()))
+        print(f"    🚦 Rate control: {parts}; gap {self.min_interval:.1f}s, "
+              f"{self.trips} breaker trip(s)")
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from supabase import acreate_client
+from realtime import RealtimeSubscribeStates
+
+# ──────────────────────────────────────────────
+# REALTIME — wake the watcher when a lead becomes 'pending'
+# ──────────────────────────────────────────────
+# Same Supabase realtime feed the Flutter app streams from. Runs its own
+# asyncio loop in a background thread; the (sync) watcher just waits on
+# wake_event.
+RECONNECT_MIN = 2.0
+RECONNECT_MAX = 60.0
+
+
+class PendingListener:
+    """Subscribes to INSERT/UPDATE events on leads with
+    intelligence_status=pending and sets wake_event for each one."""
+
+    def __init__(self, url, key, table="leads"):
+        self.url = url
+        self.key = key
+        self.table = table
+        self.wake_event = threading.Event()
+        self.connected = False
+        self.events = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="realtime",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _on_change(self, payload):
+        self.events += 1
+        self.wake_event.set()
+
+    def _run(self):
+        asyncio.run(self._main())
+
+    async def _main(self):
+        backoff = RECONNECT_MIN
+        while not self._stop.is_set():
+            lost = asyncio.Event()
+
+            def _on_state(state, err=None):
+                if state == RealtimeSubscribeStates.SUBSCRIBED:
+                    self.connected = True
+                    print("    📡 Realtime subscribed to pending leads.")
+                else:
+                    self.connected = False
+                    print(f"    📡 Realtime state: {state} {err or ''}")
+                    lost.set()
+
+            client = None
+            try:
+                client = await acreate_client(self.url, self.key)
+                channel = client.channel("watcher-pending-leads")
+                for event in ("INSERT", "UPDATE"):
+                    channel.on_postgres_changes(
+                        event, self._on_change, table=self.table,
+                        schema="public", filter="intelligence_status=eq.pending")
+                await channel.subscribe(_on_state)
+                backoff = RECONNECT_MIN
+                # Stay here until the channel drops or we are stopped
+                while not lost.is_set() and not self._stop.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        pass
+            except Exception as e:
+                self.connected = False
+                print(f"    📡 Realtime error: {e}")
+            finally:
+                if client is not None:
+                    try: await client.remove_all_channels()
+                    except Exception: pass
+
+            if self._stop.is_set():
+                break
+            # Missed events while disconnected are covered by the
+            # watcher's fallback poll — wake it once on reconnect.
+            self.wake_event.set()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX)
+
+
+def wait_for_work(listener, fallback_interval):
+    """Blocks until realtime signals new pending leads, or until the
+    fallback interval passes. Returns True if woken by an event."""
+    woke = listener.wake_event.wait(timeout=fallback_interval)
+    listener.wake_event.clear()
+    return woke
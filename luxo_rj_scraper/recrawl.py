@@ -0,0 +1,40 @@
+import json
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+# ──────────────────────────────────────────────
+# RE-CRAWL — freshness policy + change detection
+# ──────────────────────────────────────────────
+# The SQL side lives in migrations/009_recrawl.sql. A ready lead is due
+# again after a number of days that shrinks with its relative_score, and
+# a re-scrape whose tracked fields hash the same as last time does not
+# rewrite the row.
+
+# Fields whose change is worth a write: price, host, reviews, portfolio,
+# plus the maintenance hooks and contacts the pitch is built from
+HASH_FIELDS = ("preco_noite", "anfitriao", "cleanliness_gap",
+               "host_portfolio_size", "maintenance_items",
+               "email", "telefone", "contact_extras")
+
+
+def content_hash(fields):
+    """Stable hash of the tracked fields of a lead."""
+    tracked = {k: fields.get(k) for k in HASH_FIELDS}
+    raw = json.dumps(tracked, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def next_due(relative_score, min_days, max_days, now=None):
+    """Linear between max_days (score 0) and min_days (score 100)."""
+    score = min(max(float(relative_score or 0), 0.0), 100.0)
+    days = max_days - (max_days - min_days) * score / 100.0
+    now = now or datetime.now(timezone.utc)
+    return (now + timedelta(days=days)).isoformat()
+
+
+def schedule_due(client, limit):
+    """Puts up to `limit` due ready leads back to pending."""
+    n = client.rpc("schedule_recrawls", {"p_limit": int(limit)}).execute().data
+    if n:
+        print(f"    🔄 Re-crawl: {n} lead(s) due, back in the queue")
+    return n or 0
@@ -0,0 +1,254 @@
+"""
+Scoring + categorization + sales pitch — pure functions over lead fields.
+
+Used right after a scrape (scraper._finalize_updates) and by
+`python scraper.py rescore`, which recomputes every lead from the stored
+columns alone, so a change here never needs a re-scrape.
+"""
+import re
+import json
+import time
+from bisect import bisect_right
+from keywords import REGISTRY, LUX_TITLE_KEYWORDS
+
+# Discovery never counts photos; every stored lux_score assumed this many
+DEFAULT_PHOTOS = 30
+
+CATEGORY_BADGES = ["Company Host", "Person Host", "Unknown Host"]
+# Legacy "--- <NAME>_JSON ---" blocks packed into descricao (before
+# migrations/005) → the column that now holds each one
+BLOCK_COLUMNS = {"HOST_LISTINGS": "host_listings",
+                 "CONTACT_INFO": "contact_extras",
+                 "AI_INTEL": "ai_intel"}
+_BLOCK_RE = re.compile(r'\s*--- (HOST_LISTINGS|CONTACT_INFO|AI_INTEL)_JSON ---\n(.*?)\n---',
+                       re.DOTALL)
+
+
+# ──────────────────────────────────────────────
+# LUXURY SCORE (Arithmetic — no AI)
+# ──────────────────────────────────────────────
+def get_lux_score(price, title, photos_count=DEFAULT_PHOTOS, badges=None):
+    price_pts = min(((price or 0) / 10000.0) * 50.0, 50.0)
+    kw_pts = (REGISTRY.count(title or "", "lux_title")
+              / len(LUX_TITLE_KEYWORDS)) * 30.0
+    photo_pts = min((photos_count / 50.0) * 10.0, 10.0)
+    badge_pts = 0
+    if badges:
+        if "Luxe" in badges: badge_pts = 10.0
+        elif "Plus" in badges: badge_pts = 5.0
+    return int(round(price_pts + kw_pts + photo_pts + badge_pts, 0))
+
+
+# ──────────────────────────────────────────────
+# HOST CATEGORIZATION (Company vs Person)
+# ──────────────────────────────────────────────
+def categorize_host(name, portfolio_size):
+    if not name:
+        return "Person"
+
+    # Check portfolio size (strong indicator)
+    if portfolio_size and portfolio_size > 2:
+        return "Company"
+
+    # Check for company keywords (accent-insensitive)
+    if REGISTRY.any(name, "company"):
+        return "Company"
+
+    # Check word count
+    words = name.split()
+    if len(words) > 4:
+        return "Company"
+
+    # DEFAULT
+    return "Person"
+
+
+def parse_badges(raw):
+    """Badges column as a list (older rows stored it as a JSON string)."""
+    if isinstance(raw, str):
+        try: raw = json.loads(raw)
+        except ValueError: raw = []
+    return list(raw or [])
+
+
+def with_category_badge(badges, category):
+    """Badge list with any old host-category tag replaced by this one."""
+    out = [b for b in parse_badges(badges) if b not in CATEGORY_BADGES]
+    out.append(f"{category} Host")
+    return out
+
+
+# ──────────────────────────────────────────────
+# SALES PITCH + AI intel
+# ──────────────────────────────────────────────
+MAINT_SEGMENTS = {
+    'Mármore/Vidro': "Notei que seu imóvel possui superfícies nobres como mármore e vidros amplos, que exigem um cuidado especializado para manter o brilho e a sofisticação que seus hóspedes esperam.",
+    'Piscina/Jacuzzi': "Como sua propriedade oferece o diferencial de piscina/jacuzzi, sabemos que a manutenção impecável desses itens é o que separa um comentário 5 estrelas de uma reclamação sobre higiene.",
+    'Automação': "Vi que você investiu em automação e tecnologia. Esse tipo de setup exige uma equipe que entenda de cuidados técnicos para não comprometer os sistemas durante a operação.",
+    'Café Premium': "O capricho com mimos como café premium mostra que você preza pela experiência. Nossa gestão foca em elevar esse padrão em todos os pontos de contato."
+}
+
+
+def build_pitch(host_name, title, maintenance, gap):
+    anfitriao_pitch = host_name or 'Parceiro'
+    titulo_pitch = title or 'seu imóvel'
+    selected_segments = [MAINT_SEGMENTS[m] for m in (maintenance or [])
+                         if m in MAINT_SEGMENTS]
+
+    # Cleanliness Gap handling
+    if gap:
+        gap_segment = f"Vi alguns comentários sobre a limpeza (mencionaram: {gap}). Em locações de alto padrão, esses detalhes impactam diretamente seu ranking e preço médio. Podemos resolver isso definitivamente."
+    else:
+        gap_segment = "Seu imóvel tem um potencial incrível para o mercado de ultra-luxo, e uma gestão operacional de precisão pode ajudar a maximizar seu retorno."
+
+    # Combine into a unique pitch
+    pitch = f"Olá {anfitriao_pitch}! Tudo bem?\n\n"
+    pitch += f"Estava analisando o perfil do seu imóvel '{titulo_pitch}' e fiquei impressionado com o padrão. "
+    if selected_segments:
+        pitch += " ".join(selected_segments) + " "
+    pitch += f"\n\n{gap_segment}\n\n"
+    pitch += "Trabalhamos com consultoria e gestão operacional focada exatamente nesse nível de exigência. Gostaria de agendar uma breve conversa ou uma visita técnica sem compromisso?\n\nNo aguardo!"
+    return pitch
+
+
+def build_intel(lux_score, pitch, analysis_date=None):
+    return {
+        "luxury": (lux_score or 0) / 100.0,
+        "wa_hook": pitch,
+        "analysis_date": analysis_date or time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def split_blocks(descricao):
+    """(descricao without any legacy JSON block, {column: parsed value})."""
+    descricao = descricao or ""
+    matches = list(_BLOCK_RE.finditer(descricao))
+    if not matches:
+        return descricao, {}
+    found = {}
+    for m in matches:
+        try:
+            found[BLOCK_COLUMNS[m.group(1)]] = json.loads(m.group(2))
+        except ValueError:
+            pass
+    return _BLOCK_RE.sub("", descricao).strip(), found
+
+
+def stored_intel(row):
+    """ai_intel column, or the legacy block in descricao for rows not yet
+    unpacked."""
+    return row.get('ai_intel') or split_blocks(row.get('descricao'))[1].get('ai_intel')
+
+
+def unpack_row(row):
+    """Moves legacy JSON blocks out of descricao into their columns. Returns
+    {descricao, host_listings, contact_extras, ai_intel} or {} when the row
+    has no blocks. A column that already has a value wins over its block."""
+    base, found = split_blocks(row.get('descricao'))
+    if base == (row.get('descricao') or ""):
+        return {}
+    out = {"descricao": base}
+    for col in BLOCK_COLUMNS.values():
+        out[col] = row.get(col) or found.get(col)
+    return out
+
+
+# ──────────────────────────────────────────────
+# WHALE SCORE — relative ranking shown in the app
+# ──────────────────────────────────────────────
+WHALE_WEIGHTS = {"score_luxury": 0.45, "score_scale": 0.25,
+                 "score_service": 0.20, "score_pro": 0.10}
+WHALE_FIELDS = ["relative_score", *WHALE_WEIGHTS]
+
+
+class PriceRanks:
+    """Price rank of a lead within the whole table (1 = most expensive;
+    ties share the best rank). Missing prices count as 0."""
+
+    def __init__(self, prices):
+        self._asc = sorted(float(p or 0) for p in prices)
+        self.n = len(self._asc)
+
+    def rank(self, price):
+        # 1 + number of prices strictly above this one
+        return 1 + self.n - bisect_right(self._asc, float(price or 0))
+
+
+def whale_factors(row, ranks):
+    """relative_score and its four factors (0-100 each), as the app's
+    v2.5.0 equation: price rank 45%, scale 25%, service need 20%,
+    professionalism 10%."""
+    n = max(ranks.n, 1)
+    rank = min(ranks.rank(row.get('preco_noite')), n)
+    luxury = ((n - rank + 1) / n) * 100.0
+    scale = min(max(float(row.get('host_portfolio_size') or 1) * 10.0, 0.0), 100.0)
+    service = min(len(row.get('maintenance_items') or []) * 20.0, 100.0)
+    is_pro = any('Company' in str(b) or 'Empresa' in str(b)
+                 for b in parse_badges(row.get('badges')))
+    pro = 100.0 if is_pro else 50.0
+    factors = {"score_luxury": round(luxury, 2), "score_scale": round(scale, 2),
+               "score_service": round(service, 2), "score_pro": pro}
+    factors["relative_score"] = round(
+        sum(factors[k] * w for k, w in WHALE_WEIGHTS.items()), 2)
+    return factors
+
+
+# ──────────────────────────────────────────────
+# QUEUE PRIORITY — claim order for pending leads (migrations/010)
+# ──────────────────────────────────────────────
+def queue_priority(lux_score, price):
+    """Value of a freshly discovered lead before it is scraped: lux_score
+    plus up to 20 points for price (R$10k/night and up), on the same
+    0-100+ scale as relative_score."""
+    return round((lux_score or 0)
+                 + 20.0 * min(float(price or 0) / 10000.0, 1.0), 2)
+
+
+# ──────────────────────────────────────────────
+# BULK RESCORE — one stored row in, changed fields out
+# ──────────────────────────────────────────────
+RESCORE_FIELDS = ("id, titulo, preco_noite, anfitriao, badges, descricao, "
+                  "lux_score, maintenance_items, cleanliness_gap, ai_intel, "
+                  "host_portfolio_size, intelligence_status, "
+                  + ", ".join(WHALE_FIELDS))
+
+
+def _whale_changes(row, badges, ranks):
+    if ranks is None:
+        return {}
+    factors = whale_factors({**row, "badges": badges}, ranks)
+    if all(row.get(k) is not None and abs(row[k] - v) < 0.005
+           for k, v in factors.items()):
+        return {}
+    return factors
+
+
+def rescore_row(row, ranks=None):
+    """Recomputes lux_score for every lead, plus the host category badge
+    and pitch for analyzed ('ready') leads, and the whale score when
+    `ranks` (PriceRanks over the whole table) is given. Returns only what
+    changed: {lux_score, badges, ai_intel} and/or the WHALE_FIELDS."""
+    lux = get_lux_score(row.get('preco_noite'), row.get('titulo'),
+                        DEFAULT_PHOTOS, parse_badges(row.get('badges')))
+    badges = parse_badges(row.get('badges'))
+    intel = None
+
+    if row.get('intelligence_status') == 'ready':
+        category = categorize_host(row.get('anfitriao'),
+                                   row.get('host_portfolio_size') or 1)
+        badges = with_category_badge(badges, category)
+        pitch = build_pitch(row.get('anfitriao'), row.get('titulo'),
+                            row.get('maintenance_items'),
+                            row.get('cleanliness_gap'))
+        old_intel = stored_intel(row) or {}
+        if (old_intel.get('wa_hook') != pitch
+                or old_intel.get('luxury') != lux / 100.0):
+            intel = build_intel(lux, pitch)
+
+    changes = _whale_changes(row, badges, ranks)
+    if (lux != row.get('lux_score')
+            or badges != parse_badges(row.get('badges'))
+            or intel is not None):
+        changes.update(lux_score=lux, badges=badges,
+                       ai_intel=intel or row.get('ai_intel'))
+    return changes
@@ -1,9 +1,6 @@
 import os
 import time
-import random
-import re
-import json
-from bs4 import BeautifulSoup
+import threading
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
@@ -12,6 +9,24 @@ from webdriver_manager.chrome import ChromeDriverManager
 from supabase import create_client, Client
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from worker_pool import WorkerPool, PoliteDriver
+from browser_pool import BrowserPool, resolve_chromedriver
+import page_ready
+import http_fetcher
+import db
+import realtime_watch
+import claims
+import lean_profile
+import hosts
+import discovery
+import recrawl
+import page_archive
+import rate_control
+import tab_pool
+from metrics import METRICS
+import extract
+import scoring
+from scoring import get_lux_score, categorize_host
 
 # ──────────────────────────────────────────────
 # CONFIG
@@ -31,8 +46,91 @@ if not SUPABASE_URL or not SUPABASE_KEY:
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 print("✅ Supabase OK.")
 
-def get_desktop_driver():
-    """Returns a Chrome driver configured as a full desktop browser."""
+# Parallel deep-scrape: one Chrome per worker, shared per-host spacing
+SCRAPE_WORKERS = int(get_env("SCRAPE_WORKERS") or 1)
+HOST_MIN_INTERVAL = float(get_env("HOST_MIN_INTERVAL") or 2.0)
+# Adaptive pacing: block signals double the page gap up to RATE_MAX_INTERVAL;
+# BREAKER_TRIP_AFTER in a row pause every page load for BREAKER_COOLDOWN s
+RATE_MAX_INTERVAL = float(get_env("RATE_MAX_INTERVAL") or 60)
+BREAKER_TRIP_AFTER = int(get_env("BREAKER_TRIP_AFTER") or 3)
+BREAKER_COOLDOWN = float(get_env("BREAKER_COOLDOWN") or 300)
+# "selenium" (default) or "http" — http tries the embedded page JSON first
+# and only falls back to Chrome when the blob is missing
+FETCH_ENGINE = (get_env("FETCH_ENGINE") or "selenium").lower()
+# FETCH_ENGINE=tabs: leads in flight as tabs of one Chrome (tab_pool.py);
+# no new tab while Chrome's RSS is over TAB_MEMORY_BUDGET_MB
+TAB_CONCURRENCY = int(get_env("TAB_CONCURRENCY") or 4)
+TAB_MEMORY_BUDGET_MB = float(get_env("TAB_MEMORY_BUDGET_MB") or 1200)
+# Lead updates are buffered and written back in bulk every N leads
+WRITE_BATCH_SIZE = int(get_env("WRITE_BATCH_SIZE") or 50)
+# Watcher: realtime wake-ups; polling only as a safety net / while
+# realtime is down (backoff between POLL_MIN and POLL_MAX)
+WATCHER_SAFETY_POLL = float(get_env("WATCHER_SAFETY_POLL") or 300)
+WATCHER_POLL_MIN = float(get_env("WATCHER_POLL_MIN") or 5)
+WATCHER_POLL_MAX = float(get_env("WATCHER_POLL_MAX") or 60)
+# Seconds a warm browser may sit idle before the watcher closes it
+WARM_BROWSER_IDLE = float(get_env("WARM_BROWSER_IDLE") or 300)
+# Job claims (migrations/003): several watchers can share the queue
+WORKER_ID = get_env("WORKER_ID") or claims.default_worker_id()
+CLAIM_BATCH = int(get_env("CLAIM_BATCH") or SCRAPE_WORKERS * 4)
+CLAIM_LEASE = int(get_env("CLAIM_LEASE") or 900)
+MAX_CLAIM_ATTEMPTS = int(get_env("MAX_CLAIM_ATTEMPTS") or 3)
+# Claim order: priority + QUEUE_REQUEST_BOOST for app requests + aging
+# points per hour waited, so low-value leads still get their turn
+QUEUE_AGING_PER_HOUR = float(get_env("QUEUE_AGING_PER_HOUR") or 1.0)
+QUEUE_REQUEST_BOOST = float(get_env("QUEUE_REQUEST_BOOST") or 1000)
+# Warm browser pool: recycle a Chrome after N page loads or this much RSS
+BROWSER_MAX_PAGES = int(get_env("BROWSER_MAX_PAGES") or 200)
+BROWSER_MAX_RSS_MB = float(get_env("BROWSER_MAX_RSS_MB") or 1500)
+# Lean profile: block images, media, fonts and trackers
+LEAN_BROWSER = (get_env("LEAN_BROWSER") or "0").lower() in ("1", "true", "yes")
+# Log bytes transferred + load time per page (Chrome performance log).
+# Each number covers its page load and what ran on that page before it
+# was measured (profile: the lazy-load scrolls); off by default
+PAGE_METRICS = (get_env("PAGE_METRICS") or "0").lower() in ("1", "true", "yes")
+BROWSER_PROFILE = "lean" if LEAN_BROWSER else "full"
+# Rows per page when streaming the table for `rescore` / `unpack`
+RESCORE_PAGE_SIZE = int(get_env("RESCORE_PAGE_SIZE") or 1000)
+# Seconds a table-wide price ranking is reused for relative_score
+WHALE_RANK_TTL = float(get_env("WHALE_RANK_TTL") or 300)
+# Seconds between watcher `rescore` passes: new leads shift the price
+# ranks every stored relative_score was computed against (0 = off)
+RESCORE_EVERY = float(get_env("RESCORE_EVERY") or 21600)
+# Seconds a scraped host profile is reused for that host's other listings
+HOST_CACHE_TTL = float(get_env("HOST_CACHE_TTL") or 86400)
+# Insert the rooms found on a host profile as pending leads
+HOST_ENQUEUE = (get_env("HOST_ENQUEUE") or "0").lower() in ("1", "true", "yes")
+HOST_ENQUEUE_MAX_DEPTH = int(get_env("HOST_ENQUEUE_MAX_DEPTH") or 1)
+HOST_ENQUEUE_CAP = int(get_env("HOST_ENQUEUE_CAP") or 10)
+# Search discovery: targets file, result pages per target, run id
+# (checkpoints are per run; the default run is today's date)
+DISCOVERY_TARGETS = get_env("DISCOVERY_TARGETS")
+DISCOVERY_MAX_PAGES = int(get_env("DISCOVERY_MAX_PAGES") or 15)
+DISCOVERY_RUN = get_env("DISCOVERY_RUN")
+# Targets searched at the same time (one browser each)
+DISCOVERY_WORKERS = int(get_env("DISCOVERY_WORKERS") or 3)
+# Re-crawl policy: ready leads are due again after MIN days (score 100)
+# to MAX days (score 0); the watcher checks for due leads every CHECK_EVERY s
+RECRAWL_MIN_DAYS = float(get_env("RECRAWL_MIN_DAYS") or 3)
+RECRAWL_MAX_DAYS = float(get_env("RECRAWL_MAX_DAYS") or 30)
+RECRAWL_BATCH = int(get_env("RECRAWL_BATCH") or 50)
+RECRAWL_CHECK_EVERY = float(get_env("RECRAWL_CHECK_EVERY") or 3600)
+# Metrics: Prometheus-style endpoint on 127.0.0.1:METRICS_PORT (watcher;
+# 0 = off) and/or one JSON line per lead appended to METRICS_FILE
+METRICS_PORT = int(get_env("METRICS_PORT") or 0)
+METRICS.jsonl_path = get_env("METRICS_FILE")
+# Compressed, content-addressed archive of every fetched listing/reviews/
+# profile page (for `replay`); oldest pages are dropped past the size cap
+PAGE_ARCHIVE_DIR = get_env("PAGE_ARCHIVE_DIR")
+PAGE_ARCHIVE_MAX_MB = float(get_env("PAGE_ARCHIVE_MAX_MB") or 2048)
+# Save every fetched page here (grows the fixtures/ corpus for bench_parser.py)
+SAVE_PAGES_DIR = get_env("SAVE_PAGES_DIR")
+
+def get_desktop_driver(lean=None):
+    """Returns a Chrome driver configured as a full desktop browser.
+    lean=True (default: LEAN_BROWSER) blocks images, media, fonts and
+    analytics — none of our selectors need them."""
+    lean = LEAN_BROWSER if lean is None else lean
     opts = Options()
     opts.add_argument("--headless=new")
     opts.add_argument("--no-sandbox")
@@ -44,300 +142,448 @@ def get_desktop_driver():
     opts.add_argument("--disable-blink-features=AutomationControlled")
     opts.add_experimental_option("excludeSwitches", ["enable-automation"])
     opts.add_experimental_option('useAutomationExtension', False)
+    if lean:
+        lean_profile.apply_lean_options(opts)
+    if PAGE_METRICS:
+        lean_profile.enable_measurement(opts)
     try:
-        svc = Service(ChromeDriverManager().install())
-        return webdriver.Chrome(service=svc, options=opts)
+        svc = Service(resolve_chromedriver(
+            lambda: ChromeDriverManager().install()))
+        driver = webdriver.Chrome(service=svc, options=opts)
     except:
-        return webdriver.Chrome(options=opts)
+        driver = webdriver.Chrome(options=opts)
+    if lean:
+        try: lean_profile.enable_blocking(driver)
+        except Exception as e: print(f"    ⚠ Lean profile CDP blocking failed: {e}")
+    return driver
+
+def _measure_start(driver):
+    """Starts a page's count clean: traffic since the last measure (the
+    previous page's back-navigation, reviews modal…) is not its cost."""
+    if PAGE_METRICS:
+        lean_profile.discard_log(driver)
+
+def _measure(driver, label):
+    if PAGE_METRICS:
+        lean_profile.measure_page(driver, BROWSER_PROFILE, label)
+
+def _archive_page(lead_id, kind, url, html, engine="selenium"):
+    """Keeps the page in the PAGE_ARCHIVE_DIR archive (see `replay`)."""
+    if page_store is None or not html:
+        return
+    try:
+        page_store.put(url, kind, html, lead_id, engine)
+    except Exception as e:
+        print(f"    ║ ⚠ Could not archive {kind} page: {e}")
 
-# ──────────────────────────────────────────────
-# LUXURY SCORE (Arithmetic — no AI)
-# ──────────────────────────────────────────────
-def get_lux_score(price, title, photos_count, badges=None):
-    price_pts = min((price / 10000.0) * 50.0, 50.0)
-    kws = ['luxo', 'luxury', 'vista mar', 'ocean view', 'cobertura',
-           'penthouse', 'design', 'exclusivo']
-    kw_pts = (sum(1 for k in kws if k in title.lower()) / len(kws)) * 30.0
-    photo_pts = min((photos_count / 50.0) * 10.0, 10.0)
-    badge_pts = 0
-    if badges:
-        if "Luxe" in badges: badge_pts = 10.0
-        elif "Plus" in badges: badge_pts = 5.0
-    return int(round(price_pts + kw_pts + photo_pts + badge_pts, 0))
+def _save_fixture(key, kind, html):
+    """Writes a fetched page to SAVE_PAGES_DIR as <kind>_<key>.html."""
+    if not SAVE_PAGES_DIR or not html:
+        return
+    try:
+        os.makedirs(SAVE_PAGES_DIR, exist_ok=True)
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(key))
+        with open(os.path.join(SAVE_PAGES_DIR, f"{kind}_{safe}.html"),
+                  "w", encoding="utf-8") as f:
+            f.write(html)
+    except OSError as e:
+        print(f"    ⚠ Could not save page: {e}")
+
+# One pool of warm drivers shared by every mode in this process
+browser_pool = BrowserPool(get_desktop_driver,
+                           max_pages=BROWSER_MAX_PAGES,
+                           max_rss_mb=BROWSER_MAX_RSS_MB)
+_host_limiter = rate_control.AdaptiveLimiter(
+    min_interval=HOST_MIN_INTERVAL, max_interval=RATE_MAX_INTERVAL,
+    trip_after=BREAKER_TRIP_AFTER, cooldown=BREAKER_COOLDOWN)
+host_cache = hosts.HostCache(supabase, HOST_CACHE_TTL)
+page_store = (page_archive.PageArchive(PAGE_ARCHIVE_DIR, PAGE_ARCHIVE_MAX_MB * 1e6)
+              if PAGE_ARCHIVE_DIR else None)
 
 # ──────────────────────────────────────────────
-# HOST CATEGORIZATION (Company vs Person)
+# EXTRACTION HELPERS (shared by Selenium + HTTP engines)
 # ──────────────────────────────────────────────
-COMPANY_KEYWORDS = [
-    'stay', 'luxury', 'rent', 'aluguel', 'temporada', 'admin', 'management', 
-    'gestão', 'gestao', 'group', 'grupo', 'properties', 'propriedades', 
-    'imóveis', 'imoveis', 'real estate', 'host', 'hospedagem', 'suítes', 
-    'suites', 'flat', 'apartment', 'apartamento', 'residencial', 
-    'services', 'serviços', 'concierge', 'vip', 'elite', 'rio', 'conforto'
-]
-
-def categorize_host(name, portfolio_size):
-    if not name:
-        return "Person"
-    
-    name_lower = name.lower()
-    
-    # Check portfolio size (strong indicator)
-    if portfolio_size and portfolio_size > 2:
-        return "Company"
-    
-    # Check for company keywords
-    for kw in COMPANY_KEYWORDS:
-        if kw in name_lower:
-            return "Company"
-            
-    # Check word count
-    words = name.split()
-    if len(words) > 4:
-        return "Company"
-    
-    # DEFAULT
-    return "Person"
+def _apply_profile(prof, updates):
+    """Writes parsed host-profile fields (extract.parse_profile_page) into
+    the update payload: portfolio, host_listings, contact_extras, email/phone."""
+    updates['host_portfolio_size'] = prof['portfolio_size']
+    if prof['portfolio_via']:
+        print(f"    ║ ✅ MATCH [{prof['portfolio_via']}]: {prof['portfolio_size']}")
+    else:
+        print(f"    ║ ⚠ Portfolio still 1. No patterns matched.")
+    print(f"    ║ Final portfolio_size: {updates['host_portfolio_size']}")
+
+    other_listings = prof['other_listings']
+    updates['host_listings'] = other_listings
+    if other_listings:
+        print(f"    ║ Cataloged {len(other_listings)} listings")
+
+    if prof['email']:
+        updates['email'] = prof['email']
+        print(f"    ║ 📧 Email found: {prof['email']}")
+    if prof['phone']:
+        updates['telefone'] = prof['phone']
+        print(f"    ║ 📞 Phone found: {prof['phone']}")
+
+    contact_extras = prof['contact_extras']
+    for k, v in contact_extras.items():
+        print(f"    ║ {'📸' if k == 'instagram' else '🌐'} {k.capitalize()}: {v}")
+    updates['contact_extras'] = contact_extras
+
+    if not any(k in updates for k in ['email', 'telefone']) \
+            and not contact_extras:
+        print(f"    ║ ⚠ No contact info found on profile")
+
+def _apply_superhost(is_superhost, updates, lead_data):
+    print(f"    ║ Superhost: {is_superhost}")
+    current_badges = scoring.parse_badges(lead_data.get('badges'))
+    if is_superhost and "Superhost" not in current_badges:
+        current_badges.append("Superhost")
+        updates['badges'] = current_badges
+
+def _apply_gaps(gap_mentions, updates):
+    if gap_mentions:
+        updates['cleanliness_gap'] = " | ".join(sorted(set(gap_mentions))[:3])
+        print(f"    ║ Cleanliness gaps: {len(gap_mentions)}")
+
+_ranks_lock = threading.Lock()
+_ranks_cache = {"ranks": None, "at": 0.0}
+
+def _load_price_ranks(trips=None):
+    prices = []
+    for rows in db.iter_leads(supabase, "id, preco_noite", RESCORE_PAGE_SIZE, trips):
+        prices.extend(r.get('preco_noite') for r in rows)
+    return scoring.PriceRanks(prices)
+
+def _set_price_ranks(ranks):
+    with _ranks_lock:
+        _ranks_cache["ranks"] = ranks
+        _ranks_cache["at"] = time.monotonic()
+
+def _refresh_price_ranks(trips=None):
+    """Reloads the table-wide price ranking once it is older than
+    WHALE_RANK_TTL. Called once per batch before the workers start, so no
+    lead's pitch step waits on the full-table read."""
+    with _ranks_lock:
+        fresh = (_ranks_cache["ranks"] is not None
+                 and time.monotonic() - _ranks_cache["at"] <= WHALE_RANK_TTL)
+    if not fresh:
+        _set_price_ranks(_load_price_ranks(trips))
+
+def _price_ranks():
+    """The cached table-wide price ranking (loaded on first use only —
+    _refresh_price_ranks keeps it current between batches)."""
+    with _ranks_lock:
+        ranks = _ranks_cache["ranks"]
+    if ranks is None:
+        _refresh_price_ranks()
+        with _ranks_lock:
+            ranks = _ranks_cache["ranks"]
+    return ranks
+
+def _finalize_updates(updates, lead_data):
+    """Host category badge, sales pitch and whale score, appended to the
+    update payload."""
+    # ─── 7. Host Categorization ───
+    host_cat = categorize_host(updates.get('anfitriao'),
+                               updates.get('host_portfolio_size', 1))
+    updates['badges'] = scoring.with_category_badge(
+        updates.get('badges') or lead_data.get('badges'), host_cat)
+    print(f"    ║ Categorized: {host_cat} Host")
+
+    # ─── 8. GENERATE AI SALES PITCH ───
+    try:
+        pitch = scoring.build_pitch(
+            updates.get('anfitriao'),
+            updates.get('titulo') or lead_data.get('titulo'),
+            updates.get('maintenance_items'), updates.get('cleanliness_gap'))
+        updates['ai_intel'] = scoring.build_intel(
+            updates.get('lux_score') or lead_data.get('lux_score'), pitch)
+
+        print(f"    ║ AI Pitch generated: {len(pitch)} chars")
+
+    except Exception as ai_err:
+        print(f"    ║ ⚠ AI Pitch generation failed: {ai_err}")
+
+    # ─── 9. Whale score (relative_score + factors, read by the app) ───
+    try:
+        updates.update(scoring.whale_factors({**lead_data, **updates},
+                                             _price_ranks()))
+        print(f"    ║ Whale score: {updates['relative_score']:.1f}")
+    except Exception as ws_err:
+        print(f"    ║ ⚠ Whale score failed: {ws_err}")
+    return host_cat
+
+def _cached_profile(host_id, updates):
+    """Applies a fresh cached host profile; True when the visit can be skipped."""
+    try:
+        prof = host_cache.get(host_id)
+    except Exception as e:
+        print(f"    ║ ⚠ Host cache lookup failed: {e}")
+        return False
+    if prof is None:
+        return False
+    print(f"    ║ ♻ Host {host_id} scraped recently — skipping profile visit")
+    _apply_profile(prof, updates)
+    return True
+
+def _link_host(host_id, prof, updates, host_cat):
+    """Upserts the hosts row (profile columns only when `prof` was just
+    parsed) and links the lead to it."""
+    if not host_id:
+        return
+    try:
+        host_cache.save(host_id, prof, updates.get('anfitriao'), host_cat)
+        updates['host_id'] = host_id
+    except Exception as e:
+        print(f"    ║ ⚠ Could not save host {host_id}: {e}")
+
+def _enqueue_host_listings(lead_id, url, prof, updates, lead_data):
+    """Turns the host's other rooms (from a freshly parsed profile) into
+    pending leads: at most HOST_ENQUEUE_CAP new ones per host,
+    HOST_ENQUEUE_MAX_DEPTH hops from a search-discovered lead, ranked by
+    the parent's score."""
+    depth = (lead_data.get('crawl_depth') or 0) + 1
+    if not HOST_ENQUEUE or not prof or depth > HOST_ENQUEUE_MAX_DEPTH:
+        return
+    own = extract.room_link(url)
+    batch = {}
+    for item in prof['other_listings']:
+        link = extract.room_link(item['url'])
+        if link and link != own and link not in batch:
+            batch[link] = item['title']
+    if not batch:
+        return
+    try:
+        # Manual targets keep the www. form, so check both spellings
+        known = db.existing_links(
+            supabase, [*batch, *(l.replace("://", "://www.", 1) for l in batch)])
+        known = {l.replace("://www.", "://", 1) for l in known}
+        rows = [{"link_imovel": link, "titulo": title,
+                 "bairro": lead_data.get('bairro'),
+                 "anfitriao": updates.get('anfitriao'),
+                 "host_id": updates.get('host_id'),
+                 "lux_score": get_lux_score(None, title),
+                 "intelligence_status": "pending",
+                 "crawl_depth": depth, "parent_lead_id": lead_id,
+                 "priority": updates.get('relative_score')}
+                for link, title in batch.items() if link not in known]
+        # Capped after the dedupe, so known rooms do not use up the cap
+        rows = rows[:HOST_ENQUEUE_CAP]
+        db.bulk_insert_leads(supabase, rows)
+        print(f"    ║ ➕ Enqueued {len(rows)} listing(s) of this host "
+              f"(depth {depth}, {len(known)} already known)")
+    except Exception as e:
+        print(f"    ║ ⚠ Could not enqueue host listings: {e}")
+
+# Everything the enrichment reads from an existing lead row
+LEAD_FIELDS = ("id, link_imovel, titulo, preco_noite, bairro, anfitriao, "
+               "badges, descricao, email, telefone, cleanliness_gap, lux_score, "
+               "maintenance_items, host_portfolio_size, crawl_depth, "
+               "content_hash, host_id, host_listings, contact_extras, "
+               "ai_intel, " + ", ".join(scoring.WHALE_FIELDS))
+
+def _load_lead(lead_id):
+    """Single-lead read, for callers that did not prefetch the row."""
+    resp = supabase.table("leads").select(LEAD_FIELDS).eq("id", lead_id).execute()
+    return resp.data[0] if resp.data else {}
+
+_UNCHANGED_KEYS = ['intelligence_status', 'claimed_by', 'lease_expires_at',
+                   'claim_attempts', 'last_scraped_at', 'next_recrawl_at']
+
+def _differs(key, value, lead_data):
+    """True when `value` is not what the stored row already holds for
+    `key` (a column the row was not read with counts as different)."""
+    if key not in lead_data:
+        return True
+    old = lead_data[key]
+    if key == 'ai_intel' and isinstance(value, dict) and isinstance(old, dict):
+        # Stamped on every build — not a change on its own
+        value = {k: v for k, v in value.items() if k != 'analysis_date'}
+        old = {k: v for k, v in old.items() if k != 'analysis_date'}
+    return value != old
+
+def _with_recrawl_schedule(updates, lead_data):
+    """Stamps the content hash and next re-crawl time. When the tracked
+    fields hash the same as the stored row, only the status/schedule
+    columns and the untracked fields that really changed (score,
+    badges, description…) are kept."""
+    fields = {**lead_data, **updates}
+    digest = recrawl.content_hash(fields)
+    updates['last_scraped_at'] = datetime.now().astimezone().isoformat()
+    updates['next_recrawl_at'] = recrawl.next_due(
+        fields.get('relative_score'), RECRAWL_MIN_DAYS, RECRAWL_MAX_DAYS)
+    if digest == lead_data.get('content_hash'):
+        kept = {k: v for k, v in updates.items()
+                if k in _UNCHANGED_KEYS or _differs(k, v, lead_data)}
+        changed = [k for k in kept if k not in _UNCHANGED_KEYS]
+        print(f"    ║ ♻ Unchanged since last scrape — status/schedule"
+              f" + {len(changed)} changed field(s)")
+        return kept
+    updates['content_hash'] = digest
+    return updates
+
+def _requeue_blocked(lead_id, sink=None, lead_data=None):
+    """Puts a lead that hit a block back to pending. The claim that
+    fetched it is handed back too: a blocked lead did not fail, so it
+    must not creep toward MAX_CLAIM_ATTEMPTS lap after lap."""
+    attempts = (lead_data or {}).get('claim_attempts') or 1
+    _save_updates(lead_id, {"intelligence_status": "pending",
+                            "claim_attempts": max(0, attempts - 1)}, sink)
+    METRICS.end_lead("blocked")
+
+def _save_updates(lead_id, updates, sink=None, lead_data=None):
+    """Queues the update on the batch sink, or writes it right away.
+    Every final write also drops this worker's claim on the lead, and
+    only lands while this worker still holds it."""
+    updates['claimed_by'] = None
+    updates['lease_expires_at'] = None
+    if updates.get('intelligence_status') == 'ready':
+        updates['claim_attempts'] = 0
+        updates = _with_recrawl_schedule(updates, lead_data or {})
+    if sink is not None:
+        # Only fields this scrape set: padding from the prefetched row would
+        # overwrite edits made in the app meanwhile (a few more calls)
+        sink.add(lead_id, updates)
+    else:
+        supabase.table("leads").update(updates).eq("id", lead_id).eq(
+            "claimed_by", WORKER_ID).execute()
 
 # ──────────────────────────────────────────────
 # DEEP SCRAPE — visits a listing, gets everything
 # ──────────────────────────────────────────────
-def deep_analyze_listing(driver, lead_id, url):
+def deep_analyze_listing(driver, lead_id, url, lead_data=None, sink=None):
     """Scrapes a single listing: description, reviews, host profile, portfolio.
-    NO AI. Purely Selenium + BS4. Status → 'ready' when done."""
+    NO AI. Purely Selenium + BS4. Status → 'ready' when done.
+    lead_data is the prefetched lead row; sink batches the final write."""
     print(f"\n    ╔══ [Scrape] {url[:60]}...")
+    waited = 0.0
+    METRICS.begin_lead(lead_id, "selenium")
     try:
+        _measure_start(driver)
         driver.get(url)
-        time.sleep(random.uniform(5, 7))
+        waited += page_ready.wait_for_all(
+            driver, "listing", page_ready.LISTING_MARKERS, timeout=20)
+        _measure(driver, "listing")
+        METRICS.lap("page_load")
 
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        page_text = soup.get_text().lower()
+        listing_html = driver.page_source
+        doc = extract.Document(listing_html)
         updates = {"intelligence_status": "ready"}
-        
-        # Fetch current data to preserve existing manually added info
-        curr_resp = supabase.table("leads").select("badges, anfitriao").eq("id", lead_id).execute()
-        lead_data = curr_resp.data[0] if curr_resp.data else {}
+
+        # Current row — preserves existing manually added info
+        if lead_data is None:
+            lead_data = _load_lead(lead_id)
 
         # ─── 1. Description ───
-        desc_el = soup.select_one(
-            'div[data-section-id="DESCRIPTION_DEFAULT"], '
-            'div[data-testid="pdp-description-content"]')
-        description = desc_el.get_text(strip=True) if desc_el else ""
+        description = extract.extract_description(doc)
         updates['descricao'] = description
         print(f"    ║ Description: {len(description)} chars")
 
+        # A login wall / challenge is not a listing: back off, don't mark error
+        wall = rate_control.block_signal(driver.current_url,
+                                         "" if description else doc.lower)
+        if wall:
+            _host_limiter.signal(wall)
+            raise rate_control.Blocked(f"{wall} wall instead of the listing")
+        # Only real listings are kept: a wall would be replayed as one
+        _save_fixture(lead_id, "listing", listing_html)
+        _archive_page(lead_id, "listing", driver.current_url, listing_html)
+
         # ─── 2. Maintenance hooks ───
-        maint_map = {
-            'Mármore/Vidro': ['mármore', 'marble', 'vidro', 'glass', 'madeira maciça'],
-            'Piscina/Jacuzzi': ['piscina', 'pool', 'jacuzzi', 'hidromassagem'],
-            'Automação': ['automatizada', 'alexa', 'voice command', 'cinema', 'smart'],
-            'Café Premium': ['nespresso', 'espresso', 'cafeteira']
-        }
-        found_maint = [lbl for lbl, kws in maint_map.items()
-                       if any(k in page_text for k in kws)]
+        found_maint = extract.extract_maintenance(doc.lower)
         updates['maintenance_items'] = found_maint
         print(f"    ║ Maintenance: {found_maint}")
+        METRICS.lap("parse")
 
         # ─── 3. Cleanliness gap (reviews ≤ 4★) ───
-        flags = ['poeira', 'sujo', 'limpeza', 'dust', 'dirty', 'mancha',
-                 'odor', 'rodapé', 'suja', 'manchada']
-        gap_mentions = []
         try:
             btn = driver.find_element(
                 By.CSS_SELECTOR,
                 'button[data-testid="pdp-show-all-reviews-button"]')
             driver.execute_script("arguments[0].click();", btn)
-            time.sleep(3)
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
+            waited += page_ready.wait_for_any(
+                driver, "reviews", page_ready.REVIEW_MARKERS, timeout=8)
+            reviews_html = driver.page_source
+            _save_fixture(lead_id, "reviews", reviews_html)
+            _archive_page(lead_id, "reviews", url, reviews_html)
+            doc = extract.Document(reviews_html)
         except:
             pass
 
-        for card in soup.select(
-                'div[data-review-id], div[data-testid="pdp-review-card-content"]'):
-            try:
-                rating = 5
-                r_el = card.select_one(
-                    'span[aria-label*="estrela"], span[aria-label*="star"]')
-                if r_el:
-                    m = re.search(r'(\d)', r_el.get('aria-label', ''))
-                    if m: rating = int(m.group(1))
-                if rating <= 4:
-                    t_el = card.select_one(
-                        'span._163atp1, div[data-testid="pdp-review-description"]')
-                    if t_el:
-                        txt = t_el.get_text().lower()
-                        if any(f in txt for f in flags):
-                            gap_mentions.append(
-                                f"({rating}★): {txt[:80].strip()}...")
-            except:
-                continue
-
-        if gap_mentions:
-            updates['cleanliness_gap'] = " | ".join(list(set(gap_mentions))[:3])
-            print(f"    ║ Cleanliness gaps: {len(gap_mentions)}")
+        _apply_gaps(extract.extract_review_gaps(doc), updates)
+        METRICS.lap("reviews")
 
         # ─── 4. Host section — badges + name ───
-        lead_row = supabase.table("leads").select(
-            "titulo, preco_noite, bairro, anfitriao, badges"
-        ).eq("id", lead_id).single().execute()
-        lead_data = lead_row.data or {}
-
-        # Try multiple selectors for host section
-        host_selectors = [
-            'div[data-section-id="HOST_PROFILE_DEFAULT"]',
-            'div[data-testid="pdp-host-profile-section"]',
-            'div[data-section-id="HOST_OVERVIEW_DEFAULT"]',
-            'section[data-section-id="HOST_PROFILE_DEFAULT"]',
-        ]
-        host_section = None
-        for sel in host_selectors:
-            host_section = soup.select_one(sel)
-            if host_section:
-                print(f"    ║ Host section via: {sel}")
-                break
-
-        # Fallback: find by text content (anfitrião/anfitriã/superhost)
-        if not host_section:
-            for section in soup.select('section, div[data-section-id]'):
-                txt = section.get_text().lower()
-                if any(kw in txt for kw in [
-                    'anfitrião', 'anfitriã', 'hosted by',
-                    'superhost', 'superanfitrião'
-                ]):
-                    host_section = section
-                    sid = section.get('data-section-id', '?')
-                    print(f"    ║ Host section via TEXT MATCH "
-                          f"(tag={section.name}, section-id={sid})")
-                    break
-
-        if not host_section:
+        host_section, via = extract.find_host_section(doc)
+        if host_section is not None:
+            print(f"    ║ Host section via: {via}")
+        else:
             # Dump page structure for debugging
-            testids = [el.get('data-testid') for el in
-                       soup.select('[data-testid]')][:20]
-            section_ids = [el.get('data-section-id') for el in
-                           soup.select('[data-section-id]')][:20]
+            testids, section_ids = extract.page_structure(doc)
             print(f"    ║ ⚠ HOST SECTION NOT FOUND!")
             print(f"    ║ data-testid on page: {testids}")
             print(f"    ║ data-section-id on page: {section_ids}")
-            full_text = soup.get_text()
             for kw in ['anfitrião', 'anfitriã', 'hosted by', 'superhost']:
-                idx = full_text.lower().find(kw)
+                idx = doc.lower.find(kw)
                 if idx >= 0:
-                    snip = full_text[max(0, idx-30):idx+80].strip()
+                    snip = doc.text[max(0, idx-30):idx+80].strip()
                     print(f"    ║ '{kw}' in page text: «{snip}»")
 
         print(f"    ║ Host section found: {host_section is not None}")
 
-
-        if host_section:
-            h_text = host_section.get_text()
+        if host_section is not None:
+            h_text = doc.text_of(host_section)
             print(f"    ║ Host section text (200ch): {h_text[:200]}")
+            _apply_superhost(extract.is_superhost(h_text), updates, lead_data)
 
-            # Superhost badge (EN + PT)
-            is_superhost = any(kw in h_text.lower() for kw in [
-                'superhost', 'superanfitrião', 'superanfitriã'])
-            print(f"    ║ Superhost: {is_superhost}")
-            current_badges = lead_data.get('badges') or []
-            if isinstance(current_badges, str):
-                try: current_badges = json.loads(current_badges)
-                except: current_badges = []
-            if is_superhost and "Superhost" not in current_badges:
-                current_badges.append("Superhost")
-                updates['badges'] = current_badges
-
-            # Host name — extract from section text, NOT from h2/h3
-            # (h2/h3 often picks up "Consultar Perfil" button text)
-            host_name = None
-
-            # Try regex patterns on the section text
-            name_patterns = [
-                r'Anfitri[ãa]\(?o?\)?[:\s]+([A-ZÀ-Ú][\w\s\-&\.]+)',
-                r'Hosted by\s+(.+?)(?:\s*$|\s*Superhost)',
-                r'Hospede-se com\s+(.+?)(?:\s*$|\s*Superhost)',
-            ]
-            for pat in name_patterns:
-                m = re.search(pat, h_text)
-                if m:
-                    candidate = m.group(1).strip()
-                    # Filter out garbage
-                    if candidate and candidate.lower() not in [
-                        'consultar perfil', 'ver perfil', 'profile'
-                    ]:
-                        host_name = candidate
-                        break
-
-            # Fallback: try h2/h3 but filter garbage
-            if not host_name:
-                host_name_el = host_section.select_one('h2, h3, h1')
-                if host_name_el:
-                    raw = host_name_el.get_text(strip=True)
-                    raw = re.sub(
-                        r'(Hosted by|Hospede-se com|Anfitriã?o:?\s*)',
-                        '', raw, flags=re.IGNORECASE).strip()
-                    if raw and raw.lower() not in [
-                        'consultar perfil', 'ver perfil', 'profile'
-                    ]:
-                        host_name = raw
-
-            # Clean trailing garbage from host name
-            if host_name:
-                # Strip "Superhost" suffix (often stuck to name)
-                host_name = re.sub(r'Superhost.*$', '', host_name,
-                                   flags=re.IGNORECASE).strip()
-                # Strip "X anos hospedando" suffix
-                host_name = re.sub(r'\d+\s*anos?\s*hospedando.*$', '',
-                                   host_name, flags=re.IGNORECASE).strip()
-                # Strip trailing dots/spaces/special chars
-                host_name = host_name.rstrip(' ·.·')
-
+            host_name = extract.extract_host_name(doc, host_section)
             if host_name:
                 updates['anfitriao'] = host_name
                 print(f"    ║ Host name: {host_name}")
             else:
                 print(f"    ║ ⚠ Could not extract host name")
+        METRICS.count("host_section", via if host_section is not None else "none")
+        _host_limiter.signal("ok" if description or host_section is not None
+                             else "missing")
+        METRICS.lap("host_section")
 
         # ─── 5. HOST PROFILE — find the HOST (not a commenter!) ───
         # KEY: Airbnb marks host links with ?previous_page_name=PdpHomeMarketplace
         # KEY: /users/show/ REDIRECTS to login! Use /users/profile/ instead!
         navigated_to_profile = False
 
-        # Strategy 1: Search raw HTML for host profile URL with Pdp marker
-        raw_html = driver.page_source
-        host_url_match = re.search(
-            r'/users/(?:show|profile)/(\d+)\?[^"\']*PdpHomeMarketplace',
-            raw_html)
-
-        host_id = None
-        if host_url_match:
-            host_id = host_url_match.group(1)
-            print(f"    ║ ✅ HOST ID found via PdpMarker: {host_id}")
+        host_id, id_via = extract.extract_host_id(doc.html)
+        METRICS.count("host_id", id_via or "none")
+        if host_id:
+            print(f"    ║ ✅ HOST ID found via {id_via}: {host_id}")
         else:
-            # Strategy 2: Extract host ID from page JSON data
-            host_id_match = re.search(
-                r'"hostId"\s*:\s*"?(\d+)"?', raw_html)
-            if host_id_match:
-                host_id = host_id_match.group(1)
-                print(f"    ║ ✅ Host ID from JSON: {host_id}")
-            else:
-                print(f"    ║ ⚠ No host ID found anywhere on page.")
+            print(f"    ║ ⚠ No host ID found anywhere on page.")
 
-        if host_id:
+        prof = None
+        from_cache = bool(host_id) and _cached_profile(host_id, updates)
+
+        if host_id and not from_cache:
             # Use /users/profile/ (NOT /users/show/ which redirects to login!)
             # Keep the PdpHomeMarketplace param — Airbnb expects it
             host_url = (f"https://www.airbnb.com.br/users/profile/{host_id}"
                         f"?previous_page_name=PdpHomeMarketplace")
             print(f"    ║ Navigating to: {host_url}")
+            _measure_start(driver)
             driver.get(host_url)
-            time.sleep(8)
+            waited += page_ready.wait_for_document(driver, "profile", timeout=15)
 
             # Check if we got redirected to login
             landed_url = driver.current_url
             if '/login' in landed_url:
+                METRICS.count("login_redirect", "profile")
+                _host_limiter.signal("login")
                 print(f"    ║ ⚠ Redirected to login! Trying alt URL...")
                 # Try without params
                 alt_url = f"https://www.airbnb.com.br/users/profile/{host_id}"
                 driver.get(alt_url)
-                time.sleep(8)
+                waited += page_ready.wait_for_document(
+                    driver, "profile (alt)", timeout=15)
                 landed_url = driver.current_url
 
             if '/login' not in landed_url:
@@ -347,171 +593,36 @@ def deep_analyze_listing(driver, lead_id, url):
                 print(f"    ║ ❌ Still on login page. Cannot access profile.")
 
         print(f"    ║ On host profile: {navigated_to_profile}")
+        METRICS.count("profile", "cache" if from_cache
+                      else "visited" if navigated_to_profile
+                      else "unreachable" if host_id else "no_host_id")
 
         if navigated_to_profile:
             try:
 
+                waited += page_ready.wait_for_any(
+                    driver, "profile content", page_ready.PROFILE_MARKERS,
+                    timeout=10)
+
                 # Scroll progressively to trigger all lazy loads
                 for scroll_pct in [0.3, 0.6, 1.0]:
                     driver.execute_script(
                         f"window.scrollTo(0, document.body.scrollHeight * {scroll_pct});")
-                    time.sleep(2)
+                    waited += page_ready.wait_for_stable_count(
+                        driver, "profile scroll", 'a[href*="/rooms/"]')
 
+                _measure(driver, "profile")
                 prof_html = driver.page_source
-                prof_soup = BeautifulSoup(prof_html, 'html.parser')
-                prof_text = prof_soup.get_text()
-
-                # DEBUG: Show what the profile page actually says
+                _save_fixture(lead_id, "profile", prof_html)
+                _archive_page(lead_id, "profile", driver.current_url, prof_html)
                 print(f"    ║ Profile page title: {driver.title}")
                 print(f"    ║ Profile URL landed: {driver.current_url}")
-                print(f"    ║ Profile text length: {len(prof_text)} chars")
-
-                # Search for listing count keywords in the full text
-                for keyword in ['anúncio', 'listing', 'acomodaç', 'place']:
-                    idx = prof_text.lower().find(keyword)
-                    if idx >= 0:
-                        snippet = prof_text[max(0, idx-40):idx+60].strip()
-                        print(f"    ║ Found '{keyword}' at pos {idx}: "
-                              f"«{snippet}»")
-
-                # Try multiple regex patterns
-                patterns = [
-                    (r'(\d+)\s*an[uú]ncios?', 'anúncios'),
-                    (r'[Vv]er\s+(?:os\s+)?(\d+)', 'Ver os N'),
-                    (r'[Ss]ee\s+all\s+(\d+)', 'See all N'),
-                    (r'(\d+)\s+acomoda[çc]', 'acomodações'),
-                    (r'(\d+)\s+places?\b', 'places'),
-                    (r'(\d+)\s+listings?\b', 'listings'),
-                    (r'[Ss]howing\s+(\d+)', 'Showing N'),
-                ]
-
-                portfolio_size = 1
-                for pat, label in patterns:
-                    m = re.search(pat, prof_text)
-                    if m:
-                        val = int(m.group(1))
-                        if val > 1:  # Ignore "1 anúncio" (not useful)
-                            portfolio_size = val
-                            print(f"    ║ ✅ MATCH [{label}]: {val}")
-                            break
-                        else:
-                            print(f"    ║ Match [{label}] = {val} (skipped, =1)")
-
-                updates['host_portfolio_size'] = portfolio_size
-
-                if portfolio_size <= 1:
-                    # Last resort: count all /rooms/ links on profile
-                    room_links = set()
-                    for a in prof_soup.select('a[href*="/rooms/"]'):
-                        room_links.add(a['href'].split('?')[0])
-                    if len(room_links) > 1:
-                        updates['host_portfolio_size'] = len(room_links)
-                        print(f"    ║ Fallback: {len(room_links)} room links")
-                    else:
-                        print(f"    ║ ⚠ Portfolio still 1. No patterns matched.")
-
-                print(f"    ║ Final portfolio_size: "
-                      f"{updates['host_portfolio_size']}")
-
-                # Scrape visible listing links from profile
-                other_listings = []
-                seen = set()
-                for a_tag in prof_soup.select('a[href*="/rooms/"]'):
-                    room_href = a_tag['href'].split('?')[0]
-                    room_url = ("https://www.airbnb.com.br" + room_href
-                                if room_href.startswith('/') else room_href)
-                    title_text = a_tag.get_text(strip=True)[:60] or "Listing"
-                    if room_url not in seen:
-                        other_listings.append(
-                            {"title": title_text, "url": room_url})
-                        seen.add(room_url)
-
-                if other_listings:
-                    host_block = (f"--- HOST_LISTINGS_JSON ---\n"
-                                  f"{json.dumps(other_listings)}\n---")
-                    updates['descricao'] = f"{host_block}\n\n{description}"
-                    print(f"    ║ Cataloged {len(other_listings)} listings")
-
-                # ─── CONTACT INFO EXTRACTION ───
-                # Search profile text + listing description for contact info
-                all_text = prof_text + "\n" + (description or "")
-
-                # Email extraction
-                emails_found = re.findall(
-                    r'[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}',
-                    all_text)
-                # Filter out airbnb internal emails
-                real_emails = [
-                    e for e in emails_found
-                    if not any(x in e.lower() for x in [
-                        'airbnb', 'noreply', 'example',
-                        'test', 'luxuryrj', 'host_'
-                    ])
-                ]
-                if real_emails:
-                    updates['email'] = real_emails[0]
-                    print(f"    ║ 📧 Email found: {real_emails[0]}")
-
-                # Phone extraction (Brazilian formats)
-                phones_found = re.findall(
-                    r'(?:\+?55\s?)?(?:\(?\d{2}\)?\s?)?\d{4,5}[\-\s]?\d{4}',
-                    all_text)
-                if phones_found:
-                    # Clean phone number
-                    raw_phone = phones_found[0]
-                    clean_phone = re.sub(r'[^\d+]', '', raw_phone)
-                    if len(clean_phone) >= 10:
-                        updates['telefone'] = clean_phone
-                        print(f"    ║ 📞 Phone found: {clean_phone}")
-
-                # Website / Instagram extraction from profile links
-                contact_extras = {}
-                for a_tag in prof_soup.select('a[href]'):
-                    href = a_tag.get('href', '')
-                    # Instagram
-                    ig_match = re.search(
-                        r'instagram\.com/([a-zA-Z0-9_.]+)', href)
-                    if ig_match:
-                        ig_handle = ig_match.group(1)
-                        if ig_handle.lower() not in ['airbnb', 'p', 'reel']:
-                            contact_extras['instagram'] = f"@{ig_handle}"
-                            print(f"    ║ 📸 Instagram: @{ig_handle}")
-                    # External website (not airbnb)
-                    if ('http' in href and
-                            'airbnb' not in href and
-                            'google' not in href and
-                            'facebook' not in href and
-                            'instagram' not in href and
-                            'apple' not in href and
-                            'play.google' not in href):
-                        contact_extras['website'] = href
-                        print(f"    ║ 🌐 Website: {href}")
-
-                # Also check profile text for Instagram handles
-                ig_text = re.findall(r'@([a-zA-Z0-9_.]{3,30})', all_text)
-                for handle in ig_text:
-                    if handle.lower() not in [
-                        'airbnb', 'gmail', 'hotmail', 'yahoo',
-                        'outlook', 'icloud'
-                    ] and 'instagram' not in contact_extras:
-                        contact_extras['instagram'] = f"@{handle}"
-                        print(f"    ║ 📸 Instagram (text): @{handle}")
-                        break
-
-                # Append contact extras to description as JSON
-                if contact_extras:
-                    contact_block = (f"\n--- CONTACT_INFO_JSON ---\n"
-                                     f"{json.dumps(contact_extras)}\n---")
-                    updates['descricao'] = (
-                        updates.get('descricao', description or '')
-                        + contact_block)
-
-                if not any(k in updates for k in ['email', 'telefone']) \
-                        and not contact_extras:
-                    print(f"    ║ ⚠ No contact info found on profile")
+
+                prof = extract.parse_profile_page(prof_html, description)
+                _apply_profile(prof, updates)
 
                 driver.back()
-                time.sleep(3)
+                waited += page_ready.wait_for_document(driver, "back", timeout=5)
 
             except Exception as he:
                 print(f"    ║ ❌ Host profile error: {he}")
@@ -519,145 +630,258 @@ def deep_analyze_listing(driver, lead_id, url):
                 traceback.print_exc()
                 try: driver.back()
                 except: pass
-        else:
+        elif not from_cache:
             print("    ║ Could not reach host profile page.")
             # Try to find count directly on listing page
-            listing_count_match = re.search(
-                r'(\d+)\s*an[uú]ncios?', soup.get_text())
-            if listing_count_match:
-                val = int(listing_count_match.group(1))
-                updates['host_portfolio_size'] = val
-                print(f"    ║ Found count on listing page: {val}")
-            else:
-                updates['host_portfolio_size'] = 1
+            count = extract.extract_listing_count(doc.text)
+            updates['host_portfolio_size'] = count or 1
+            if count:
+                print(f"    ║ Found count on listing page: {count}")
+        METRICS.lap("profile")
 
         # ─── 6. Price verification ───
-        try:
-            price_el = soup.select_one(
-                'span._1y74zjx, [data-testid="price-summary-total-price"]')
-            if price_el:
-                digits = ''.join(filter(str.isdigit,
-                    price_el.get_text().split(',')[0].replace('.', '')))
-                if digits:
-                    updates['preco_noite'] = int(int(digits) / 3)
-                    print(f"    ║ Price: R$ {updates['preco_noite']}/night")
-        except:
-            pass
-
-        # ─── 7. Host Categorization ───
-        host_name_final = updates.get('anfitriao')
-        portfolio_final = updates.get('host_portfolio_size', 1)
-        host_cat = categorize_host(host_name_final, portfolio_final)
-        
-        current_badges = updates.get('badges') or (lead_data.get('badges') if 'lead_data' in locals() else []) or []
-        if isinstance(current_badges, str):
-            try: current_badges = json.loads(current_badges)
-            except: current_badges = []
-        
-        # Add category tag to badges list
-        cat_tag = f"{host_cat} Host"
-        # Clear old ones and add new
-        current_badges = [b for b in current_badges if b not in ["Company Host", "Person Host", "Unknown Host"]]
-        current_badges.append(cat_tag)
-        updates['badges'] = current_badges
-        
-        print(f"    ║ Categorized: {cat_tag}")
+        price = extract.extract_price(doc)
+        if price:
+            updates['preco_noite'] = price
+            print(f"    ║ Price: R$ {updates['preco_noite']}/night")
 
-        # ─── 8. GENERATE AI SALES PITCH ───
-        try:
-            anfitriao_pitch = updates.get('anfitriao') or 'Parceiro'
-            titulo_pitch = updates.get('titulo') or 'seu imóvel'
-            maintenance = updates.get('maintenance_items') or []
-            gap = updates.get('cleanliness_gap')
-            
-            # Base segments for different maintenance items
-            maint_segments = {
-                'Mármore/Vidro': "Notei que seu imóvel possui superfícies nobres como mármore e vidros amplos, que exigem um cuidado especializado para manter o brilho e a sofisticação que seus hóspedes esperam.",
-                'Piscina/Jacuzzi': "Como sua propriedade oferece o diferencial de piscina/jacuzzi, sabemos que a manutenção impecável desses itens é o que separa um comentário 5 estrelas de uma reclamação sobre higiene.",
-                'Automação': "Vi que você investiu em automação e tecnologia. Esse tipo de setup exige uma equipe que entenda de cuidados técnicos para não comprometer os sistemas durante a operação.",
-                'Café Premium': "O capricho com mimos como café premium mostra que você preza pela experiência. Nossa gestão foca em elevar esse padrão em todos os pontos de contato."
-            }
-            
-            selected_segments = [maint_segments[m] for m in maintenance if m in maint_segments]
-            
-            # Cleanliness Gap handling
-            if gap:
-                gap_segment = f"Vi alguns comentários sobre a limpeza (mencionaram: {gap}). Em locações de alto padrão, esses detalhes impactam diretamente seu ranking e preço médio. Podemos resolver isso definitivamente."
-            else:
-                gap_segment = "Seu imóvel tem um potencial incrível para o mercado de ultra-luxo, e uma gestão operacional de precisão pode ajudar a maximizar seu retorno."
-
-            # Combine into a unique pitch
-            pitch = f"Olá {anfitriao_pitch}! Tudo bem?\n\n"
-            pitch += f"Estava analisando o perfil do seu imóvel '{titulo_pitch}' e fiquei impressionado com o padrão. "
-            if selected_segments:
-                pitch += " ".join(selected_segments) + " "
-            pitch += f"\n\n{gap_segment}\n\n"
-            pitch += "Trabalhamos com consultoria e gestão operacional focada exatamente nesse nível de exigência. Gostaria de agendar uma breve conversa ou uma visita técnica sem compromisso?\n\nNo aguardo!"
-            
-            # Create AI Intel Block
-            ai_intel = {
-                "luxury": (updates.get('lux_score') or 0) / 100.0,
-                "wa_hook": pitch,
-                "analysis_date": time.strftime("%Y-%m-%d %H:%M:%S")
-            }
-            
-            # Inject into description
-            new_desc = (updates.get('descricao') or lead_data.get('descricao') or "")
-            if "--- AI_INTEL_JSON ---" not in new_desc:
-                updates['descricao'] = new_desc + f"\n\n--- AI_INTEL_JSON ---\n{json.dumps(ai_intel, indent=2)}\n---"
-            
-            print(f"    ║ AI Pitch generated: {len(pitch)} chars")
-            
-        except Exception as ai_err:
-            print(f"    ║ ⚠ AI Pitch generation failed: {ai_err}")
+        host_cat = _finalize_updates(updates, lead_data)
+        METRICS.lap("pitch")
+        _link_host(host_id, prof, updates, host_cat)
+        _enqueue_host_listings(lead_id, url, prof, updates, lead_data)
+        METRICS.lap("host_link")
 
         # ─── Save ───
-        supabase.table("leads").update(updates).eq("id", lead_id).execute()
+        _save_updates(lead_id, updates, sink, lead_data)
+        METRICS.lap("db_write")
+        METRICS.end_lead("ready")
+        print(f"    ║ Idle wait this lead: {waited:.1f}s")
         print(f"    ╚══ [DONE] Lead {lead_id} → 'ready'\n")
 
+    except rate_control.Blocked as b:
+        print(f"    ╚══ [BLOCKED] {b} — lead goes back to the queue")
+        _requeue_blocked(lead_id, sink, lead_data)
     except Exception as e:
         print(f"    ╚══ [ERROR] {e}")
         import traceback
         traceback.print_exc()
-        supabase.table("leads").update(
-            {"intelligence_status": "error"}
-        ).eq("id", lead_id).execute()
+        _save_updates(lead_id, {"intelligence_status": "error"}, sink)
+        METRICS.end_lead("error")
+
+# ──────────────────────────────────────────────
+# HTTP SCRAPE — same result as deep_analyze_listing, no browser
+# ──────────────────────────────────────────────
+def http_analyze_listing(lead_id, url, limiter=None, lead_data=None, sink=None):
+    """Scrapes a listing from its embedded page JSON over plain HTTP.
+    Returns False without touching the DB when the blob is missing,
+    so the caller can fall back to deep_analyze_listing (not on a login
+    wall / challenge or HTTP 403/429: that lead is requeued instead)."""
+    print(f"\n    ╔══ [HTTP] {url[:60]}...")
+    METRICS.begin_lead(lead_id, "http")
+    status, html, landed_url = http_fetcher.fetch_page(url, limiter)
+    METRICS.lap("page_load")
+    if status in http_fetcher.BLOCK_STATUSES:
+        # fetch_page already signalled the limiter; Chrome would hit the
+        # same block, so requeue instead of falling back
+        print(f"    ╚══ [BLOCKED] HTTP {status} — lead goes back to the queue")
+        _requeue_blocked(lead_id, sink, lead_data)
+        return True
+    data = http_fetcher.parse_embedded_listing(html) if html else None
+    METRICS.lap("parse")
+    wall = html and not data and rate_control.block_signal(
+        landed_url, extract.Document(html).lower)
+    if wall:
+        # No Chrome fallback into a wall — back off and requeue the lead
+        _host_limiter.signal(wall)
+        print(f"    ╚══ [BLOCKED] {wall} wall — lead goes back to the queue")
+        _requeue_blocked(lead_id, sink, lead_data)
+        return True
+    if not data:
+        print("    ╚══ [HTTP] No embedded data — falling back to Selenium")
+        METRICS.end_lead("http_fallback")
+        return False
+    _host_limiter.signal("ok")
+    _archive_page(lead_id, "embedded", landed_url or url, html, "http")
+
+    try:
+        updates = {"intelligence_status": "ready"}
+        if lead_data is None:
+            lead_data = _load_lead(lead_id)
+
+        # ─── 1. Description ───
+        description = data['description']
+        updates['descricao'] = description
+        print(f"    ║ Description: {len(description)} chars")
+
+        # ─── 2. Maintenance hooks ───
+        found_maint = extract.extract_maintenance(data['page_text'].lower())
+        updates['maintenance_items'] = found_maint
+        print(f"    ║ Maintenance: {found_maint}")
+
+        # ─── 3. Cleanliness gap (reviews ≤ 4★) ───
+        gaps = [extract.review_gap(rv['rating'], rv['text'])
+                for rv in data['reviews']]
+        _apply_gaps([g for g in gaps if g], updates)
+
+        # ─── 4. Host — badges + name ───
+        _apply_superhost(data['is_superhost'], updates, lead_data)
+
+        host_name = extract.clean_host_name(data['host_name'])
+        if host_name and host_name.lower() not in extract.NAME_BLACKLIST:
+            updates['anfitriao'] = host_name
+            print(f"    ║ Host name: {host_name}")
+
+        METRICS.lap("parse")
+
+        # ─── 5. Host profile over HTTP ───
+        host_id = data['host_id']
+        METRICS.count("host_id", "JSON" if host_id else "none")
+        prof_html, prof = None, None
+        from_cache = bool(host_id) and _cached_profile(host_id, updates)
+        if host_id and not from_cache:
+            print(f"    ║ ✅ Host ID from JSON: {host_id}")
+            prof_html, landed_url = http_fetcher.fetch_html(
+                f"https://www.airbnb.com.br/users/profile/{host_id}"
+                f"?previous_page_name=PdpHomeMarketplace", limiter)
+            if prof_html and '/login' in (landed_url or ''):
+                METRICS.count("login_redirect", "profile")
+                _host_limiter.signal("login")
+                print(f"    ║ ⚠ Profile redirected to login.")
+                prof_html = None
+            _archive_page(lead_id, "profile", landed_url, prof_html, "http")
+
+        if prof_html:
+            prof = extract.parse_profile_page(prof_html, description)
+            _apply_profile(prof, updates)
+        elif not from_cache:
+            updates['host_portfolio_size'] = (
+                extract.extract_listing_count(data['page_text']) or 1)
+        METRICS.count("profile", "cache" if from_cache
+                      else "visited" if prof_html
+                      else "unreachable" if host_id else "no_host_id")
+        METRICS.lap("profile")
+
+        # ─── 6. Price ───
+        if data['price']:
+            updates['preco_noite'] = data['price']
+            print(f"    ║ Price: R$ {updates['preco_noite']}/night")
+
+        host_cat = _finalize_updates(updates, lead_data)
+        METRICS.lap("pitch")
+        _link_host(host_id, prof, updates, host_cat)
+        _enqueue_host_listings(lead_id, url, prof, updates, lead_data)
+        METRICS.lap("host_link")
+
+        _save_updates(lead_id, updates, sink, lead_data)
+        METRICS.lap("db_write")
+        METRICS.end_lead("ready")
+        print(f"    ╚══ [DONE] Lead {lead_id} → 'ready' (no browser)\n")
+
+    except Exception as e:
+        print(f"    ╚══ [ERROR] {e}")
+        import traceback
+        traceback.print_exc()
+        _save_updates(lead_id, {"intelligence_status": "error"}, sink)
+        METRICS.end_lead("error")
+    return True
 
 # ──────────────────────────────────────────────
 # SEARCH — Discover new leads from neighborhoods
 # ──────────────────────────────────────────────
-def scrape_main_leads():
-    """Scrapes Airbnb search results for new leads across multiple states."""
-    print("--- Running Multi-State Scraper (RJ, SP, MG, ES) ---")
-    
-    # Target high-end areas for luxury lead generation
-    targets = [
-        # RIO DE JANEIRO
-        {"bairro": "Ipanema (RJ)", "query": "Ipanema--Rio-de-Janeiro--RJ"},
-        {"bairro": "Leblon (RJ)", "query": "Leblon--Rio-de-Janeiro--RJ"},
-        {"bairro": "Barra/Joá (RJ)", "query": "Barra-da-Tijuca--Rio-de-Janeiro--RJ"},
-        {"bairro": "Angra dos Reis (RJ)", "query": "Angra-dos-Reis--RJ"},
-        {"bairro": "Búzios (RJ)", "query": "Búzios--RJ"},
-        {"bairro": "Região Serrana (RJ)", "query": "Petrópolis--RJ"},
-        
-        # SÃO PAULO
-        {"bairro": "Jardins/Itaim (SP)", "query": "Jardins--São-Paulo--SP"},
-        {"bairro": "Vila Nova Conceição (SP)", "query": "Vila-Nova-Conceição--São-Paulo--SP"},
-        {"bairro": "Litoral Norte (SP)", "query": "Ilhabela--SP"},
-        {"bairro": "Guarujá (SP)", "query": "Guarujá--SP"},
-        {"bairro": "Campos do Jordão (SP)", "query": "Campos-do-Jordão--SP"},
-        
-        # MINAS GERAIS
-        {"bairro": "BH Premium (MG)", "query": "Belo-Horizonte--MG"},
-        {"bairro": "Nova Lima (MG)", "query": "Nova-Lima--MG"},
-        {"bairro": "Escarpas/Capitólio (MG)", "query": "Escarpas-do-Lago--MG"},
-        {"bairro": "Tiradentes (MG)", "query": "Tiradentes--MG"},
-        
-        # ESPÍRITO SANTO
-        {"bairro": "Vitória/Vila Velha (ES)", "query": "Vitória--ES"},
-        {"bairro": "Guarapari (ES)", "query": "Guarapari--ES"},
-        {"bairro": "Região das Montanhas (ES)", "query": "Domingos-Martins--ES"}
-    ]
+def _discover_target(driver, target, checkpoints, checkin, checkout,
+                     num_nights, trips):
+    """Pages through one target's search results, starting from its
+    checkpoint, inserting new cards page by page. A target is done when
+    a page brings no card it has not seen yet (or DISCOVERY_MAX_PAGES).
+    Returns this call's counters as a discovery.TargetResult."""
+    loc_label, loc_query = target["bairro"], target["query"]
+    cp = checkpoints.get(loc_query)
+    if cp['done']:
+        print(f" ✔ {loc_label}: finished earlier in run {checkpoints.run_id}")
+        return discovery.TargetResult(target, "skipped")
+    result = discovery.TargetResult(target)
+    offset, pages = cp['next_offset'], cp['pages']
+    cards_total, new_total = cp['cards'], cp['new_leads']
+    seen = set()
+    print(f" 🔍 Target: {loc_label}"
+          + (f" (resuming at offset {offset})" if offset else ""))
+
+    while pages < DISCOVERY_MAX_PAGES:
+        try:
+            _measure_start(driver)
+            driver.get(discovery.search_url(loc_query, checkin, checkout, offset))
+            page_ready.wait_for_any(
+                driver, "search", page_ready.SEARCH_MARKERS, timeout=20)
+            _measure(driver, "search")
+
+            search_html = driver.page_source
+            _save_fixture(f"{loc_query}_{offset}", "search", search_html)
+            doc = extract.Document(search_html)
+            if pages == 0 and not extract.search_cards(doc):
+                print(f"    ⚠ No listings found for {loc_label}. Retrying with generic search...")
+                # Generic fallback if specific query fails
+                generic_query = loc_label.split(' (')[0].replace(' ', '-')
+                driver.get(discovery.search_url(generic_query))
+                page_ready.wait_for_any(
+                    driver, "search (fallback)", page_ready.SEARCH_MARKERS,
+                    timeout=15)
+                doc = extract.Document(driver.page_source)
+
+            cards = extract.extract_search_cards(doc, num_nights, limit=None)
+            if pages == 0 and not cards:
+                # An empty first page is the softest block signal there is
+                wall = rate_control.block_signal(driver.current_url, doc.lower)
+                _host_limiter.signal(wall or "empty")
+                if wall:
+                    raise rate_control.Blocked(f"{wall} wall on search")
+            elif cards:
+                _host_limiter.signal("ok")
+            # Gather this page's cards first, then one dedupe + one insert
+            batch = {}
+            for card in cards:
+                if card['link_imovel'] not in batch and card['link_imovel'] not in seen:
+                    lux = get_lux_score(card['preco_noite'], card['titulo'], 30)
+                    batch[card['link_imovel']] = dict(
+                        card, bairro=loc_label, lux_score=lux,
+                        priority=scoring.queue_priority(lux, card['preco_noite']),
+                        intelligence_status="pending")
+            if not batch:
+                print(f"    ║ Page {pages + 1}: no new cards — end of results")
+                break
+            seen.update(batch)
+
+            known = db.existing_links(supabase, list(batch), trips)
+            new_leads = [l for link, l in batch.items() if link not in known]
+            db.bulk_insert_leads(supabase, new_leads, trips)
+            for lead in new_leads:
+                print(f"    [+] {lead['titulo'][:25]}... ({loc_label})")
+            print(f"    ║ Page {pages + 1} (offset {offset}): {len(cards)} cards, "
+                  f"{len(new_leads)} new, {len(known)} already known")
+        except Exception as e:
+            # Not marked done — the next run resumes from this page
+            print(f"    ║ ❌ Error on {loc_label} at offset {offset}: {e}")
+            return result.finish("error")
+
+        pages += 1
+        offset += len(cards)
+        cards_total += len(batch)
+        new_total += len(new_leads)
+        result.add_page(len(batch), len(new_leads))
+        checkpoints.save(target, next_offset=offset, pages=pages,
+                         cards=cards_total, new_leads=new_total)
+
+    checkpoints.save(target, done=True)
+    return result.finish("done")
+
+def scrape_main_leads(targets=None, run_id=None):
+    """Discovers new leads from Airbnb search results for every target in
+    targets.json, all result pages deep, resuming an interrupted run.
+    Targets run on DISCOVERY_WORKERS browsers at once; every page load
+    still goes through the shared host limiter, so the request rate to
+    Airbnb stays the same and only the render/wait time overlaps."""
+    targets = targets or discovery.load_targets(DISCOVERY_TARGETS)
+    run_id = run_id or DISCOVERY_RUN or discovery.default_run_id()
+    print(f"--- Running Discovery: {len(targets)} target(s), run {run_id} ---")
 
     checkin_dt = datetime.now() + timedelta(days=14)
     checkout_dt = checkin_dt + timedelta(days=3)
@@ -665,133 +889,400 @@ def scrape_main_leads():
     checkout = checkout_dt.strftime("%Y-%m-%d")
     num_nights = 3
 
-    driver = get_desktop_driver()
+    trips = db.RoundTrips()
+    checkpoints = discovery.Checkpoints(supabase, run_id).load()
+    results = []
+    pool = WorkerPool(DISCOVERY_WORKERS, browser_pool, limiter=_host_limiter)
+    t0 = time.monotonic()
     try:
-        for target in targets:
-            loc_label = target["bairro"]
-            loc_query = target["query"]
-            
-            print(f" 🔍 Target: {loc_label}")
-            url = (f"https://www.airbnb.com.br/s/{loc_query}/homes"
-                   f"?price_min=1000&room_types%5B%5D=Entire+home%2Fapt"
-                   f"&checkin={checkin}&checkout={checkout}")
-            
-            driver.get(url)
-            time.sleep(10)
-
-            # Handle possible "Show map" or "Filter" overlays that might block results
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            listings = soup.select('div[data-testid="card-container"]')
-            print(f"    ║ Found {len(listings)} listings")
-
-            if not listings:
-                print(f"    ⚠ No listings found for {loc_label}. Retrying with generic search...")
-                # Generic fallback if specific query fails
-                generic_query = loc_label.split(' (')[0].replace(' ', '-')
-                url_fallback = (f"https://www.airbnb.com.br/s/{generic_query}/homes"
-                                f"?price_min=1000&room_types%5B%5D=Entire+home%2Fapt")
-                driver.get(url_fallback)
-                time.sleep(5)
-                soup = BeautifulSoup(driver.page_source, 'html.parser')
-                listings = soup.select('div[data-testid="card-container"]')
-
-            for item in listings[:20]:
-                try:
-                    title_el = item.select_one(
-                        'div[data-testid="listing-card-title"]')
-                    title = (title_el.get_text(strip=True)
-                             if title_el else "Luxury Property")
-
-                    price_el = item.select_one(
-                        'div[data-testid="price-availability-row"] div')
-                    price = 1000
-                    if price_el:
-                        ptxt = price_el.get_text()
-                        nm = re.search(r'por (\d+) noit', ptxt)
-                        denom = int(nm.group(1)) if nm else 1
-                        digits = ''.join(filter(
-                            str.isdigit,
-                            ptxt.split(',')[0].replace('.', '')))
-                        if digits:
-                            val = int(digits)
-                            price = (int(val / (denom if denom > 1
-                                                 else num_nights))
-                                     if denom > 1 or val > 5000 else val)
-
-                    link_el = item.find('a', href=True)
-                    link = ("https://airbnb.com.br"
-                            + link_el['href'].split('?')[0]
-                            if link_el else "")
-
-                    if link:
-                        exists = supabase.table("leads").select("id").eq(
-                            "link_imovel", link).execute()
-                        if not exists.data:
-                            lead = {
-                                "titulo": title,
-                                "link_imovel": link,
-                                "preco_noite": price,
-                                "bairro": loc_label,
-                                "lux_score": get_lux_score(price, title, 30),
-                                "intelligence_status": "pending"
-                            }
-                            supabase.table("leads").insert(lead).execute()
-                            print(f"    [+] {title[:25]}... ({loc_label})")
-                except Exception as e:
-                    print(f"    ║ ❌ Error processing item: {e}")
-                    continue
+        pool.run(targets, lambda driver, target: results.append(
+            _discover_target(driver, target, checkpoints, checkin, checkout,
+                             num_nights, trips)))
+    finally:
+        page_ready.report_waits()
+        lean_profile.report_page_costs()
+        _host_limiter.report()
+        trips.report("Discovery DB round trips")
+        discovery.report(results, run_id, time.monotonic() - t0)
+    return results
+
+# ──────────────────────────────────────────────
+# DEEP BATCH — fans pending leads out over the worker pool
+# ──────────────────────────────────────────────
+def _scrape_one(driver, p, sink=None):
+    """HTTP engine first when enabled; Chrome only if the page needs it."""
+    if FETCH_ENGINE == "http" and http_analyze_listing(
+            p['id'], p['link_imovel'], _host_limiter,
+            lead_data=p, sink=sink):
+        return
+    deep_analyze_listing(driver, p['id'], p['link_imovel'],
+                         lead_data=p, sink=sink)
+
+def _scrape_tab_pages(lead, pages, sink):
+    """tab_pool callback: the pages one tab fetched for a lead → the same
+    updates deep_analyze_listing writes (via the replay helpers)."""
+    lead_id, url = lead['id'], lead['link_imovel']
+    METRICS.begin_lead(lead_id, "tabs")
+    try:
+        listing_url, listing_html = pages["listing"]
+        reviews_html = pages["reviews"][1] if pages["reviews"] else None
+        prof_html = None
+        if pages["profile"]:
+            prof_url, prof_html = pages["profile"]
+            if '/login' in (prof_url or ''):
+                METRICS.count("login_redirect", "profile")
+                _host_limiter.signal("login")
+                prof_html = None
+        facts = extract.parse_listing_pages(listing_html, reviews_html, prof_html)
+        METRICS.lap("parse")
+
+        # A login wall / challenge is not a listing: back off, requeue
+        wall = not facts['description'] and rate_control.block_signal(
+            listing_url, extract.Document(listing_html).lower)
+        if wall:
+            _host_limiter.signal(wall)
+            print(f"    ║ [tabs] ⛔ {wall} wall on {url[:50]} — requeued")
+            _requeue_blocked(lead_id, sink, lead)
+            return
+        for kind in ("listing", "reviews", "profile"):
+            if kind == "profile" and not prof_html:
+                continue  # login redirect — not the host's profile
+            if pages[kind]:
+                _save_fixture(lead_id, kind, pages[kind][1])
+                _archive_page(lead_id, kind, *pages[kind], "tabs")
+        _host_limiter.signal("ok" if facts['description']
+                             or facts['host_section_via'] else "missing")
+
+        prof, host_id = facts['profile'], facts['host_id']
+        METRICS.count("host_id", facts['host_id_via'] if host_id else "none")
+        if prof is None and host_id:
+            # Skipped as fresh in the host cache (or unreachable)
+            facts['profile'] = _host_profile(host_id)
+        METRICS.count("profile", "visited" if prof
+                      else "cache" if facts['profile']
+                      else "unreachable" if host_id else "no_host_id")
+        updates = _facts_to_updates(facts, lead)
+        updates['intelligence_status'] = "ready"
+        METRICS.lap("pitch")
+        host_cat = categorize_host(updates.get('anfitriao'),
+                                   updates.get('host_portfolio_size', 1))
+        _link_host(host_id, prof, updates, host_cat)
+        _enqueue_host_listings(lead_id, url, prof, updates, lead)
+        METRICS.lap("host_link")
+
+        _save_updates(lead_id, updates, sink, lead)
+        METRICS.lap("db_write")
+        METRICS.end_lead("ready")
+        print(f"    ║ [tabs] ✅ {url[:50]} → 'ready'")
+    except Exception as e:
+        print(f"    ║ [tabs] ❌ {url[:50]}: {e}")
+        _save_updates(lead_id, {"intelligence_status": "error"}, sink)
+        METRICS.end_lead("error")
+
+def _tab_failed(lead, error, sink):
+    """tab_pool callback: a lead whose pages never came in (CDP error,
+    navigation timeout) or crashed the parse is written as 'error', like
+    a failed Selenium scrape."""
+    METRICS.begin_lead(lead['id'], "tabs")
+    _save_updates(lead['id'], {"intelligence_status": "error"}, sink)
+    METRICS.end_lead("error")
+
+def _host_profile(host_id):
+    """Fresh cached profile for host_id, or None (also on lookup errors)."""
+    try:
+        return host_cache.get(host_id)
+    except Exception as e:
+        print(f"    ║ ⚠ Host cache lookup failed: {e}")
+        return None
+
+def claim_pending():
+    """Reaps expired leases, then atomically claims the next batch of
+    pending leads for this worker. One call returns full rows with every
+    field the enrichment needs, so workers never re-read their lead."""
+    claims.reap_expired(supabase, MAX_CLAIM_ATTEMPTS)
+    return claims.claim_batch(supabase, WORKER_ID, CLAIM_BATCH, CLAIM_LEASE,
+                              aging=QUEUE_AGING_PER_HOUR,
+                              request_boost=QUEUE_REQUEST_BOOST)
+
+def run_deep_batch(rows, num_workers=None):
+    """Deep-scrapes a batch of claimed lead rows across N workers and
+    writes the results back in bulk. Browsers come from (and return to)
+    the shared warm browser_pool."""
+    trips = db.RoundTrips()
+    trips.add("claim")  # the claim that produced `rows`
+    sink = db.UpdateBuffer(supabase, flush_size=WRITE_BATCH_SIZE, trips=trips,
+                           worker_id=WORKER_ID)
+    pool = WorkerPool(num_workers or SCRAPE_WORKERS, browser_pool,
+                      limiter=_host_limiter)
+    ids = [r['id'] for r in rows]
+    try:
+        _refresh_price_ranks(trips)
+    except Exception as e:
+        print(f"    ⚠ Could not refresh price ranks: {e}")
+    try:
+        with claims.LeaseKeeper(supabase, WORKER_ID, ids, CLAIM_LEASE):
+            if FETCH_ENGINE == "tabs":
+                stats = tab_pool.run_tabs(
+                    browser_pool, rows,
+                    lambda p, pages: _scrape_tab_pages(p, pages, sink),
+                    _host_limiter, lambda hid: _host_profile(hid) is not None,
+                    lambda html: extract.extract_host_id(html)[0],
+                    max_tabs=TAB_CONCURRENCY,
+                    memory_budget_mb=TAB_MEMORY_BUDGET_MB,
+                    parse_threads=max(1, (os.cpu_count() or 2) - 1),
+                    on_failed=lambda p, e: _tab_failed(p, e, sink),
+                    blocked_urls=(lean_profile.BLOCKED_URL_PATTERNS
+                                  if LEAN_BROWSER else None))
+            else:
+                stats = pool.run(
+                    rows, lambda driver, p: _scrape_one(driver, p, sink))
     finally:
-        driver.quit()
+        with METRICS.stage("db_flush"):
+            sink.flush()
+        # Anything still held (crash mid-batch, Ctrl+C) goes back to pending
+        try: claims.release(supabase, WORKER_ID, ids, MAX_CLAIM_ATTEMPTS)
+        except Exception as e: print(f"    ⚠ Could not release claims: {e}")
+    page_ready.report_waits()
+    lean_profile.report_page_costs()
+    host_cache.report()
+    _host_limiter.report()
+    METRICS.report()
+    browser_pool.report()
+    trips.report("Deep batch DB round trips")
+    return stats
+
+def _drain_queue():
+    """Claims and scrapes batches until the queue is empty. Stops early
+    while the circuit breaker is open, and after a batch that came back
+    entirely blocked: re-claiming would only cycle the same leads.
+    Returns the number of batches run."""
+    batches = 0
+    while True:
+        if _host_limiter.open_for > 0:
+            # Claiming now would only park leads behind the breaker
+            print(f"⛔ Circuit breaker open — not claiming for "
+                  f"{_host_limiter.open_for:.0f}s")
+            return batches
+        pending = claim_pending()
+        if not pending:
+            return batches
+        print(f"🔔 {len(pending)} lead(s) claimed by {WORKER_ID}...")
+        blocked = METRICS.counter("lead", "blocked")
+        run_deep_batch(pending)
+        batches += 1
+        if METRICS.counter("lead", "blocked") - blocked >= len(pending):
+            print("⛔ Whole batch came back blocked — not re-claiming")
+            return batches
 
 # ──────────────────────────────────────────────
 # WATCHER — Waits for app requests
 # ──────────────────────────────────────────────
 def start_watcher():
-    """Polls for 'pending' leads and deep-scrapes them."""
+    """Waits for 'pending' leads (realtime push, polling as fallback) and
+    deep-scrapes them, keeping browsers warm between batches."""
     print("\n🚀 [WATCHER] Scrape Engine ACTIVE.")
     print("Requests from your phone appear here.\n")
+    if METRICS_PORT:
+        METRICS.serve(METRICS_PORT)
 
-    while True:
-        try:
-            pending = supabase.table("leads").select(
-                "id, link_imovel"
-            ).eq("intelligence_status", "pending").execute()
-
-            if pending.data:
-                print(f"🔔 {len(pending.data)} lead(s) to scrape...")
-                driver = get_desktop_driver()
-                try:
-                    for p in pending.data:
-                        deep_analyze_listing(
-                            driver, p['id'], p['link_imovel'])
-                finally:
-                    driver.quit()
+    listener = realtime_watch.PendingListener(SUPABASE_URL, SUPABASE_KEY).start()
+    poll = WATCHER_POLL_MIN
+    next_recrawl_check = 0.0
+    next_rescore = time.monotonic() + RESCORE_EVERY
+
+    try:
+        while True:
+            try:
+                if RECRAWL_CHECK_EVERY > 0 and time.monotonic() >= next_recrawl_check:
+                    next_recrawl_check = time.monotonic() + RECRAWL_CHECK_EVERY
+                    recrawl.schedule_due(supabase, RECRAWL_BATCH)
+                if RESCORE_EVERY > 0 and time.monotonic() >= next_rescore:
+                    # Keeps stored relative_score in line with today's
+                    # price ranks (and scores leads discovery left at 0)
+                    next_rescore = time.monotonic() + RESCORE_EVERY
+                    rescore_all()
+                if _drain_queue():
+                    poll = WATCHER_POLL_MIN
                     print("✅ Batch done. Waiting...\n")
-        except Exception as e:
-            print(f"Watcher error: {e}")
+            except Exception as e:
+                print(f"Watcher error: {e}")
 
-        time.sleep(5)
+            if listener.connected:
+                interval = WATCHER_SAFETY_POLL
+            else:
+                interval = poll
+                poll = min(poll * 2, WATCHER_POLL_MAX)
+            realtime_watch.wait_for_work(
+                listener, min(interval, WARM_BROWSER_IDLE))
+            browser_pool.close_idle(WARM_BROWSER_IDLE)
+    finally:
+        browser_pool.close_all()
+        listener.stop()
 
 # ──────────────────────────────────────────────
 # PROCESS PENDING (one-off)
 # ──────────────────────────────────────────────
 def process_pending_once():
-    """Finds all pending leads and scrapes them once."""
-    pending = supabase.table("leads").select(
-        "id, link_imovel"
-    ).eq("intelligence_status", "pending").execute()
-
-    if not pending.data:
+    """Claims and scrapes pending leads until the queue is empty (or
+    Airbnb is blocking us — see _drain_queue)."""
+    if not _drain_queue():
         print("    No pending leads.")
-        return
 
-    print(f"🔔 {len(pending.data)} leads to scrape...")
-    driver = get_desktop_driver()
-    try:
-        for p in pending.data:
-            deep_analyze_listing(driver, p['id'], p['link_imovel'])
-    finally:
-        driver.quit()
+# ──────────────────────────────────────────────
+# RESCORE — recompute scores/categories/pitches from stored fields
+# ──────────────────────────────────────────────
+def rescore_all(page_size=None):
+    """Streams the leads table and writes back only rows whose lux_score,
+    host category badge, pitch or whale score changed. No browser, no
+    Airbnb. A first pass over the prices ranks the whole table."""
+    page_size = page_size or RESCORE_PAGE_SIZE
+    trips = db.RoundTrips()
+    t0 = time.monotonic()
+    scanned, changed = 0, 0
+    print(f"    ╔══ [Rescore] pages of {page_size}")
+    ranks = _load_price_ranks(trips)
+    _set_price_ranks(ranks)  # fresh: the next batch reuses it
+    print(f"    ║ Price ranks over {ranks.n} lead(s)")
+    for rows in db.iter_leads(supabase, scoring.RESCORE_FIELDS, page_size, trips):
+        updates = []
+        for row in rows:
+            upd = scoring.rescore_row(row, ranks)
+            if upd:
+                updates.append({"id": row['id'], **upd})
+        scanned += len(rows)
+        changed += len(updates)
+        db.bulk_update_leads(supabase, updates, trips)
+        print(f"    ║ {scanned} scanned, {changed} changed")
+    elapsed = time.monotonic() - t0
+    print(f"    ╚══ [Rescore] {changed}/{scanned} lead(s) updated in {elapsed:.1f}s")
+    trips.report("Rescore DB round trips")
+    return changed
+
+def unpack_all(page_size=None):
+    """One-off backfill for migrations/005: moves the JSON blocks packed
+    into descricao by older runs into host_listings / contact_extras /
+    ai_intel. Only rows that still have blocks are written."""
+    page_size = page_size or RESCORE_PAGE_SIZE
+    trips = db.RoundTrips()
+    t0 = time.monotonic()
+    scanned, changed = 0, 0
+    fields = "id, descricao, " + ", ".join(scoring.BLOCK_COLUMNS.values())
+    print(f"    ╔══ [Unpack] pages of {page_size}")
+    for rows in db.iter_leads(supabase, fields, page_size, trips):
+        updates = []
+        for row in rows:
+            upd = scoring.unpack_row(row)
+            if upd:
+                updates.append({"id": row['id'], **upd})
+        scanned += len(rows)
+        changed += len(updates)
+        db.bulk_update_leads(supabase, updates, trips)
+        print(f"    ║ {scanned} scanned, {changed} unpacked")
+    elapsed = time.monotonic() - t0
+    print(f"    ╚══ [Unpack] {changed}/{scanned} lead(s) updated in {elapsed:.1f}s")
+    trips.report("Unpack DB round trips")
+    return changed
+
+# ──────────────────────────────────────────────
+# REPLAY — current extraction over archived pages, no page loads
+# ──────────────────────────────────────────────
+# Fields replay compares to decide whether a lead changed; the pitch date
+# and whale score move on every run and do not count on their own
+_REPLAY_SKIP = {'ai_intel', *scoring.WHALE_FIELDS}
+
+def _facts_to_updates(facts, lead_data, keep_portfolio=False):
+    """Lead columns from extract.parse_listing_pages-shaped facts, through
+    the same helpers the live scrape uses. keep_portfolio: without a
+    profile page, keep the stored host_portfolio_size (it came from a
+    profile or the host cache) instead of the listing page's count."""
+    updates = {"descricao": facts['description'],
+               "maintenance_items": facts['maintenance']}
+    _apply_gaps(facts['review_gaps'], updates)
+    _apply_superhost(facts['is_superhost'], updates, lead_data)
+    host_name = facts['host_name']
+    if host_name and host_name.lower() not in extract.NAME_BLACKLIST:
+        updates['anfitriao'] = host_name
+    if facts['profile']:
+        _apply_profile(facts['profile'], updates)
+    elif keep_portfolio and lead_data.get('host_portfolio_size'):
+        updates['host_portfolio_size'] = lead_data['host_portfolio_size']
+    else:
+        updates['host_portfolio_size'] = facts.get('listing_count') or 1
+    if facts['price']:
+        updates['preco_noite'] = facts['price']
+    _finalize_updates(updates, lead_data)
+    return updates
+
+def _archived_page_ok(entry):
+    """False for an archived page that is a login wall / challenge (the
+    same block_signal check the live scrape runs), so replay falls back
+    to the newest real page of that kind."""
+    if entry['kind'] == 'profile':
+        return '/login' not in (entry.get('url') or '')
+    html = page_store.get(entry['sha'])
+    doc = extract.Document(html)
+    if entry['kind'] == 'embedded':
+        real = http_fetcher.parse_embedded_listing(html)
+    else:
+        real = extract.extract_description(doc)
+    return bool(real) or not rate_control.block_signal(entry.get('url'),
+                                                       doc.lower)
+
+def _replay_facts(pages):
+    """Facts from the newest archived pages of one lead (None if unusable)."""
+    listing, embedded = pages.get('listing'), pages.get('embedded')
+    profile = pages.get('profile')
+    profile_html = page_store.get(profile['sha']) if profile else None
+    if listing and (not embedded or listing['ts'] >= embedded['ts']):
+        reviews = pages.get('reviews')
+        # Only the reviews page expanded from this same listing load
+        reviews_html = (page_store.get(reviews['sha'])
+                        if reviews and reviews['ts'] >= listing['ts'] else None)
+        return extract.parse_listing_pages(
+            page_store.get(listing['sha']), reviews_html, profile_html)
+    data = http_fetcher.parse_embedded_listing(page_store.get(embedded['sha']))
+    return extract.embedded_facts(data, profile_html) if data else None
+
+def replay_archive():
+    """Re-runs the current extraction over the newest archived pages of
+    every lead in PAGE_ARCHIVE_DIR and writes the leads whose fields
+    changed in bulk — a parser fix needs no new page loads."""
+    if page_store is None:
+        print("    ⚠ PAGE_ARCHIVE_DIR is not set — nothing to replay")
+        return 0
+    trips = db.RoundTrips()
+    t0 = time.monotonic()
+    latest = page_store.latest_by_lead(_archived_page_ok)
+    latest = {k: v for k, v in latest.items()
+              if 'listing' in v or 'embedded' in v}
+    leads = db.leads_by_ids(supabase, list(latest), LEAD_FIELDS, trips)
+    print(f"    ╔══ [Replay] {len(latest)} archived lead(s), "
+          f"{len(leads)} still in the table")
+    rows, failed = [], 0
+    for lead_id, pages in latest.items():
+        lead = leads.get(lead_id)
+        if lead is None:
+            continue
+        try:
+            facts = _replay_facts(pages)
+            if facts is None:
+                continue
+            updates = _facts_to_updates(facts, lead, keep_portfolio=True)
+        except Exception as e:
+            failed += 1
+            print(f"    ║ ❌ Replay failed for {lead_id}: {e}")
+            continue
+        if all(updates[k] == lead.get(k) for k in updates if k not in _REPLAY_SKIP):
+            continue
+        updates['content_hash'] = recrawl.content_hash({**lead, **updates})
+        rows.append({"id": lead['id'], **updates})
+    for i in range(0, len(rows), WRITE_BATCH_SIZE):
+        db.bulk_update_leads(supabase, rows[i:i + WRITE_BATCH_SIZE], trips)
+    elapsed = time.monotonic() - t0
+    print(f"    ╚══ [Replay] {len(rows)}/{len(leads)} lead(s) changed, "
+          f"{failed} failed, in {elapsed:.1f}s")
+    trips.report("Replay DB round trips")
+    return len(rows)
 
 # ──────────────────────────────────────────────
 # MAIN
@@ -809,39 +1300,68 @@ if __name__ == "__main__":
     if mode.startswith("http"):
         url = mode.split('?')[0]
         print(f"🎯 Targeted scrape: {url}")
-        driver = get_desktop_driver()
+        driver = PoliteDriver(browser_pool, _host_limiter)
+        lid = None
         try:
             exists = supabase.table("leads").select("id").eq(
                 "link_imovel", url).execute()
             if exists.data:
-                lid = exists.data[0]['id']
+                # Claimed like a queue job, so a watcher can't scrape it too
+                row = claims.claim_one(supabase, WORKER_ID,
+                                       exists.data[0]['id'], CLAIM_LEASE)
+                if row is None:
+                    print("    ⚠ Another worker is scraping this lead right now.")
+                    sys.exit(1)
             else:
-                res = supabase.table("leads").insert({
+                lease_end = datetime.now().astimezone() + timedelta(seconds=CLAIM_LEASE)
+                row = supabase.table("leads").insert({
                     "titulo": "Manual Target",
                     "link_imovel": url,
-                    "intelligence_status": "pending",
+                    "intelligence_status": "in_progress",
+                    "claimed_by": WORKER_ID,
+                    "lease_expires_at": lease_end.isoformat(),
                     "bairro": "Manual"
-                }).execute()
-                lid = res.data[0]['id']
-            deep_analyze_listing(driver, lid, url)
+                }).execute().data[0]
+            lid = row['id']
+            with claims.LeaseKeeper(supabase, WORKER_ID, [lid], CLAIM_LEASE):
+                deep_analyze_listing(driver, lid, url)
         finally:
-            driver.quit()
+            driver.release()
+            browser_pool.close_all()
+            # Crash mid-scrape: hand the lead to the queue
+            if lid is not None:
+                try: claims.release(supabase, WORKER_ID, [lid], MAX_CLAIM_ATTEMPTS)
+                except Exception as e: print(f"    ⚠ Could not release claim: {e}")
         sys.exit(0)
 
     # ── Named modes ──
     mode = mode.lower()
 
-    if "search" in mode:
-        scrape_main_leads()
-        print("\n⚡ Now deep-scraping all pending leads...")
-        process_pending_once()
-
-    elif "deep" in mode:
-        process_pending_once()
-
-    elif "watcher" in mode:
-        start_watcher()
+    try:
+        if "search" in mode:
+            # Same warm browser carries on from discovery into deep scrapes
+            scrape_main_leads()
+            print("\n⚡ Now deep-scraping all pending leads...")
+            process_pending_once()
+
+        elif "deep" in mode:
+            process_pending_once()
+
+        elif "watcher" in mode:
+            start_watcher()
+
+        elif "rescore" in mode:
+            rescore_all()
+        elif "unpack" in mode:
+            unpack_all()
+        elif "replay" in mode:
+            replay_archive()
+        elif "recrawl" in mode:
+            recrawl.schedule_due(supabase, RECRAWL_BATCH)
+            process_pending_once()
 
-    else:
-        print(f"Unknown mode: {mode}")
-        print("Usage: scraper.py [watcher|search|deep|<URL>]")
+        else:
+            print(f"Unknown mode: {mode}")
+            print("Usage: scraper.py [watcher|search|deep|recrawl|replay|rescore|unpack|<URL>]")
+    finally:
+        browser_pool.close_all()
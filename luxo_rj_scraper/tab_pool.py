@@ -0,0 +1,363 @@
+import json
+import time
+import random
+import asyncio
+import itertools
+from urllib.request import urlopen
+
+try:
+    import websockets
+except ImportError:  # optional — only FETCH_ENGINE=tabs needs it
+    websockets = None
+
+import page_ready
+from browser_pool import driver_rss_mb
+from metrics import METRICS
+
+# ──────────────────────────────────────────────
+# MULTI-TAB ORCHESTRATOR — several leads in flight inside one Chrome
+# ──────────────────────────────────────────────
+# A Selenium driver does one page at a time and spends most of it
+# waiting. Here one pooled Chrome is driven straight over CDP (the
+# browser-level DevTools websocket, flattened target sessions) from an
+# asyncio loop: each lead gets its own tab for listing → reviews →
+# profile, and up to `max_tabs` leads run at once. Page loads still go
+# through the shared host limiter, so Airbnb sees the same request rate;
+# only the waiting overlaps.
+#
+# Sized for the 2-vCPU watcher VM: a new tab only opens while Chrome's
+# RSS is under `memory_budget_mb`, and page parsing runs on
+# cpu_count - 1 threads so one core stays free for Chrome. The run ends
+# with Chrome RSS per concurrent page, next to the one-tab baseline
+# (what one browser per lead costs).
+
+PROFILE_URL = ("https://www.airbnb.com.br/users/profile/{host_id}"
+               "?previous_page_name=PdpHomeMarketplace")
+REVIEWS_BUTTON = 'button[data-testid="pdp-show-all-reviews-button"]'
+SAMPLE_EVERY = 1.0  # seconds between RSS samples
+
+
+def browser_ws_url(driver):
+    """Browser-level DevTools websocket of a Selenium-started Chrome."""
+    address = driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+    with urlopen(f"http://{address}/json/version", timeout=5) as resp:
+        return json.loads(resp.read())["webSocketDebuggerUrl"]
+
+
+class CDPError(Exception):
+    pass
+
+
+class CDPConnection:
+    """One websocket to the browser; commands for every tab are
+    multiplexed over it by sessionId."""
+
+    def __init__(self, ws_url):
+        self.ws_url = ws_url
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._ws = None
+        self._reader = None
+
+    async def __aenter__(self):
+        if websockets is None:
+            raise RuntimeError("FETCH_ENGINE=tabs needs `pip install websockets`")
+        # Whole pages come back as one message
+        self._ws = await websockets.connect(self.ws_url, max_size=None,
+                                            ping_interval=None)
+        self._reader = asyncio.create_task(self._read())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._reader.cancel()
+        await self._ws.close()
+
+    async def _read(self):
+        try:
+            async for raw in self._ws:
+                msg = json.loads(raw)
+                fut = self._pending.pop(msg.get("id"), None)
+                if fut is None or fut.done():
+                    continue  # events are not needed — readiness is polled
+                if "error" in msg:
+                    fut.set_exception(CDPError(msg["error"].get("message")))
+                else:
+                    fut.set_result(msg.get("result", {}))
+        except Exception as e:
+            for fut in self._pending.values():
+                if not fut.done():
+                    fut.set_exception(CDPError(f"connection lost: {e}"))
+
+    async def send(self, method, params=None, session_id=None, timeout=30):
+        msg_id = next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = fut
+        msg = {"id": msg_id, "method": method, "params": params or {}}
+        if session_id:
+            msg["sessionId"] = session_id
+        await self._ws.send(json.dumps(msg))
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            self._pending.pop(msg_id, None)
+
+
+class Tab:
+    """One page target: navigate, wait for DOM markers, read HTML."""
+
+    def __init__(self, cdp, target_id, session_id):
+        self.cdp = cdp
+        self.target_id = target_id
+        self.session_id = session_id
+
+    @classmethod
+    async def open(cls, cdp, blocked_urls=None):
+        """New blank tab. blocked_urls: URL patterns for this tab's
+        Network.setBlockedURLs (lean_profile.BLOCKED_URL_PATTERNS) — the
+        Selenium-side blocking only covers the driver's own session."""
+        target = await cdp.send("Target.createTarget", {"url": "about:blank"})
+        attached = await cdp.send("Target.attachToTarget", {
+            "targetId": target["targetId"], "flatten": True})
+        tab = cls(cdp, target["targetId"], attached["sessionId"])
+        if blocked_urls:
+            await cdp.send("Network.enable", session_id=tab.session_id)
+            await cdp.send("Network.setBlockedURLs", {"urls": blocked_urls},
+                           session_id=tab.session_id)
+        return tab
+
+    async def eval(self, expression):
+        res = await self.cdp.send("Runtime.evaluate", {
+            "expression": expression, "returnByValue": True},
+            session_id=self.session_id)
+        return res.get("result", {}).get("value")
+
+    async def goto(self, url, timeout=15):
+        """Navigates and waits until the previous document is gone, so
+        marker polling never matches the page being left."""
+        await self.eval("window.__tabPoolLeft = true")
+        res = await self.cdp.send("Page.navigate", {"url": url},
+                                  session_id=self.session_id)
+        if res.get("errorText"):
+            raise CDPError(f"navigation failed: {res['errorText']}")
+        started = time.monotonic()
+        while time.monotonic() - started < timeout:
+            try:
+                if not await self.eval("window.__tabPoolLeft === true"):
+                    return
+            except CDPError:
+                pass  # context torn down mid-navigation
+            await asyncio.sleep(page_ready.POLL_INTERVAL)
+        raise CDPError(f"navigation to {url[:50]} did not commit "
+                       f"in {timeout}s")
+
+    async def wait_for_any(self, label, selectors, timeout=15):
+        """page_ready.wait_for_any, without a thread blocked on it."""
+        return await self.wait_for_all(label, [selectors], timeout)
+
+    async def wait_for_all(self, label, groups, timeout=15):
+        """page_ready.wait_for_all: one match in every selector group."""
+        started = time.monotonic()
+        probe = " && ".join(
+            f"!!document.querySelector({json.dumps(', '.join(g))})"
+            for g in groups)
+        ready = False
+        while time.monotonic() - started < timeout:
+            try:
+                if await self.eval(probe):
+                    ready = True
+                    break
+            except CDPError:
+                pass  # context torn down mid-navigation
+            await asyncio.sleep(page_ready.POLL_INTERVAL)
+        floor = random.uniform(*page_ready.MIN_JITTER)
+        left = floor - (time.monotonic() - started)
+        if left > 0:
+            await asyncio.sleep(left)
+        page_ready.record_wait(label, time.monotonic() - started, not ready)
+        return ready
+
+    async def click(self, selector):
+        return await self.eval(
+            f"(e => e ? (e.click(), true) : false)"
+            f"(document.querySelector({json.dumps(selector)}))")
+
+    async def snapshot(self):
+        """(landed url, outer HTML)."""
+        return (await self.eval("location.href"),
+                await self.eval("document.documentElement.outerHTML"))
+
+    async def close(self):
+        try:
+            await self.cdp.send("Target.closeTarget",
+                                {"targetId": self.target_id}, timeout=5)
+        except Exception:
+            pass
+
+
+class TabStats:
+    def __init__(self):
+        self.leads = 0
+        self.errors = 0
+        self.loads = 0
+        self.samples = []  # (live tabs, Chrome RSS MB)
+        self.peak_tabs = 0
+        self.started = time.monotonic()
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        print(f"    ┌── Tab orchestrator: {self.leads} lead(s), "
+              f"{self.loads} page load(s), {self.errors} error(s) "
+              f"in {elapsed:.0f}s, up to {self.peak_tabs} tab(s)")
+        by_tabs = {}
+        for n, rss in self.samples:
+            if n:
+                by_tabs.setdefault(n, []).append(rss)
+        base = by_tabs.get(1)
+        base_mb = sum(base) / len(base) if base else None
+        for n in sorted(by_tabs):
+            avg = sum(by_tabs[n]) / len(by_tabs[n])
+            line = (f"    │ {n} tab(s): {avg:6.0f} MB RSS, "
+                    f"{avg / n:5.0f} MB/page")
+            if base_mb and n > 1:
+                line += (f" vs {base_mb:.0f} MB/page one browser per lead "
+                         f"({1 - avg / (n * base_mb):.0%} saved)")
+            print(line)
+        print("    └──")
+
+
+class TabOrchestrator:
+    """Runs the listing → reviews → profile pipeline of many leads over
+    the tabs of one Chrome.
+
+    on_pages(lead, pages) is called (in a worker thread) with
+    {"listing": (url, html), "reviews": (url, html) | None,
+     "profile": (url, html) | None} once a lead's pages are in; it does
+    the parsing and the DB write. profile_cached(host_id) → True skips
+    the profile visit. host_id_of(html) finds the host id on a page.
+    on_failed(lead, error) is called (in a worker thread) for a lead whose
+    pages could not be loaded or parsed, so it is written back instead of
+    staying claimed."""
+
+    def __init__(self, driver, limiter, max_tabs=4, memory_budget_mb=1200,
+                 parse_threads=1, blocked_urls=None):
+        self.driver = driver
+        self.limiter = limiter
+        self.blocked_urls = blocked_urls
+        self.max_tabs = max_tabs
+        self.memory_budget_mb = memory_budget_mb
+        self.parse_threads = max(1, parse_threads)
+        self.stats = TabStats()
+        self._live = 0
+        self._rss = None
+
+    async def _admit(self):
+        """Waits for a tab slot that also fits the memory budget (the
+        first tab always fits)."""
+        while True:
+            over = (self._rss is not None and self.memory_budget_mb
+                    and self._rss > self.memory_budget_mb)
+            if self._live == 0 or (self._live < self.max_tabs and not over):
+                self._live += 1
+                self.stats.peak_tabs = max(self.stats.peak_tabs, self._live)
+                return
+            await asyncio.sleep(0.25)
+
+    async def _sample(self):
+        while True:
+            self._rss = await asyncio.to_thread(driver_rss_mb, self.driver)
+            if self._rss is not None:
+                self.stats.samples.append((self._live, self._rss))
+            await asyncio.sleep(SAMPLE_EVERY)
+
+    async def _load(self, tab, url, label, groups, timeout):
+        await asyncio.to_thread(self.limiter.wait, url)
+        t0 = time.monotonic()
+        await tab.goto(url)
+        await tab.wait_for_all(label, groups, timeout)
+        METRICS.observe("tab_load", time.monotonic() - t0)
+        self.stats.loads += 1
+        return await tab.snapshot()
+
+    async def _failed(self, lead, error, on_failed):
+        self.stats.errors += 1
+        print(f"    ❌ [tab] {lead.get('link_imovel', '')[:50]}: {error}")
+        if on_failed is None:
+            return
+        try:
+            await asyncio.to_thread(on_failed, lead, error)
+        except Exception as e:
+            print(f"    ⚠ [tab] Could not record the failure: {e}")
+
+    async def _lead(self, cdp, lead, on_pages, profile_cached, host_id_of,
+                    parse_slots, on_failed):
+        await self._admit()
+        tab, tab_error = None, None
+        try:
+            tab = await Tab.open(cdp, self.blocked_urls)
+            url = lead['link_imovel']
+            pages = {"listing": await self._load(
+                tab, url, "listing", page_ready.LISTING_MARKERS, 20),
+                "reviews": None, "profile": None}
+            if await tab.click(REVIEWS_BUTTON):
+                await tab.wait_for_any("reviews", page_ready.REVIEW_MARKERS, 8)
+                pages["reviews"] = await tab.snapshot()
+            html = (pages["reviews"] or pages["listing"])[1]
+            host_id = host_id_of(html)
+            if host_id and not await asyncio.to_thread(profile_cached, host_id):
+                pages["profile"] = await self._load(
+                    tab, PROFILE_URL.format(host_id=host_id), "profile",
+                    [page_ready.PROFILE_MARKERS], 15)
+        except Exception as e:
+            tab_error = e  # written back once the tab is closed
+        finally:
+            if tab is not None:
+                await tab.close()
+            self._live -= 1
+        if tab_error is not None:
+            await self._failed(lead, tab_error, on_failed)
+            return
+        # The tab is already free; parsing waits for a CPU slot
+        async with parse_slots:
+            try:
+                await asyncio.to_thread(on_pages, lead, pages)
+                self.stats.leads += 1
+            except Exception as e:
+                await self._failed(lead, e, on_failed)
+
+    async def run(self, leads, on_pages, profile_cached, host_id_of,
+                  on_failed=None):
+        parse_slots = asyncio.Semaphore(self.parse_threads)
+        ws_url = await asyncio.to_thread(browser_ws_url, self.driver)
+        async with CDPConnection(ws_url) as cdp:
+            sampler = asyncio.create_task(self._sample())
+            try:
+                await asyncio.gather(*(
+                    self._lead(cdp, lead, on_pages, profile_cached,
+                               host_id_of, parse_slots, on_failed)
+                    for lead in leads))
+            finally:
+                sampler.cancel()
+        return self.stats
+
+
+def run_tabs(browsers, leads, on_pages, limiter, profile_cached, host_id_of,
+             max_tabs=4, memory_budget_mb=1200, parse_threads=1,
+             on_failed=None, blocked_urls=None):
+    """Sync entry point: borrows one browser from the BrowserPool, runs
+    every lead through its tabs, reports memory per page. Returns TabStats."""
+    if not leads:
+        return TabStats()
+    browser = browsers.acquire()
+    orch = TabOrchestrator(browser.driver, limiter, max_tabs,
+                           memory_budget_mb, parse_threads, blocked_urls)
+    print(f"    ⚙ Tab orchestrator: up to {max_tabs} tab(s) for "
+          f"{len(leads)} lead(s), budget {memory_budget_mb} MB")
+    try:
+        asyncio.run(orch.run(leads, on_pages, profile_cached, host_id_of,
+                             on_failed))
+    finally:
+        browser.pages += orch.stats.loads
+        browser.last_used = time.monotonic()
+        browsers.release(browser)
+    orch.stats.report()
+    return orch.stats
@@ -0,0 +1,171 @@
+import time
+import random
+import queue
+import threading
+from urllib.parse import urlparse
+
+# ──────────────────────────────────────────────
+# HOST POLITENESS — shared across all workers
+# ──────────────────────────────────────────────
+class HostLimiter:
+    """Keeps a minimum gap between two page loads on the same host,
+    no matter which worker issues them."""
+
+    def __init__(self, min_interval=2.0, jitter=1.0):
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_key(url):
+        """Politeness slot of a URL: discovery stores listings as
+        airbnb.com.br while profiles/search use www.airbnb.com.br — one
+        site, one slot."""
+        host = (urlparse(url).hostname or url).lower()
+        return host[4:] if host.startswith("www.") else host
+
+    def wait(self, url):
+        host = self.host_key(url)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = (slot + self.min_interval
+                                     + random.uniform(0, self.jitter))
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class PoliteDriver:
+    """Wraps a pooled Selenium driver so every driver.get() goes through
+    the shared HostLimiter. Everything else is passed straight through.
+    The browser is only borrowed from the BrowserPool on first use, so
+    jobs served without one (HTTP engine) never pay for it."""
+
+    def __init__(self, browsers, limiter):
+        self._browsers = browsers
+        self._lease = None
+        self._limiter = limiter
+
+    @property
+    def started(self):
+        return self._lease is not None
+
+    def _ensure(self):
+        if self._lease is None:
+            self._lease = self._browsers.acquire()
+        return self._lease.driver
+
+    def get(self, url):
+        self._limiter.wait(url)
+        driver = self._ensure()
+        self._lease.pages += 1
+        self._lease.last_used = time.monotonic()
+        return driver.get(url)
+
+    def release(self):
+        """Hands the browser back to the pool (kept warm)."""
+        if self._lease is not None:
+            self._browsers.release(self._lease)
+            self._lease = None
+
+    def __getattr__(self, name):
+        return getattr(self._ensure(), name)
+
+
+# ──────────────────────────────────────────────
+# WORKER STATS
+# ──────────────────────────────────────────────
+class WorkerStats:
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.leads = 0
+        self.errors = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def leads_per_minute(self):
+        return self.leads / (self.elapsed / 60.0) if self.elapsed > 0 else 0.0
+
+
+# ──────────────────────────────────────────────
+# WORKER POOL
+# ──────────────────────────────────────────────
+class WorkerPool:
+    """Runs jobs across N browser workers. Each worker borrows one driver
+    from the BrowserPool (lazily, on first page load) and pulls jobs from
+    a shared queue, so a slow lead never blocks the others. Drivers go
+    back to the BrowserPool after every run and stay warm there."""
+
+    def __init__(self, num_workers, browsers, limiter=None):
+        self.num_workers = max(1, int(num_workers))
+        self.browsers = browsers
+        self.limiter = limiter or HostLimiter()
+        self.stats = []
+
+    def run(self, jobs, handler):
+        """Calls handler(driver, job) for every job. Returns per-worker stats."""
+        jobs = list(jobs)
+        if not jobs:
+            return []
+
+        job_queue = queue.Queue()
+        for job in jobs:
+            job_queue.put(job)
+
+        workers = min(self.num_workers, len(jobs))
+        self.stats = [WorkerStats(i + 1) for i in range(workers)]
+        threads = [threading.Thread(target=self._worker_loop,
+                                    args=(job_queue, handler, st),
+                                    name=f"scrape-worker-{st.worker_id}",
+                                    daemon=True)
+                   for st in self.stats]
+
+        print(f"    ⚙ Worker pool: {workers} worker(s) for {len(jobs)} lead(s)")
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.report()
+        return self.stats
+
+    def _worker_loop(self, job_queue, handler, stats):
+        driver = PoliteDriver(self.browsers, self.limiter)
+        try:
+            while True:
+                try:
+                    job = job_queue.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    handler(driver, job)
+                    stats.leads += 1
+                except Exception as e:
+                    stats.errors += 1
+                    print(f"    ❌ [worker {stats.worker_id}] {e}")
+                finally:
+                    # Back to the pool between leads: recycling and the
+                    # health check happen there before the next lead
+                    driver.release()
+                    job_queue.task_done()
+        finally:
+            stats.finished = time.monotonic()
+            driver.release()
+
+    def report(self):
+        total = sum(s.leads for s in self.stats)
+        wall = max((s.elapsed for s in self.stats), default=0)
+        print("    ┌── Worker pool report")
+        for s in self.stats:
+            print(f"    │ Worker {s.worker_id}: {s.leads} lead(s), "
+                  f"{s.errors} error(s), {s.leads_per_minute:.2f} leads/min")
+        if wall > 0:
+            print(f"    └── Total: {total} lead(s) in {wall:.0f}s "
+                  f"({total / (wall / 60.0):.2f} leads/min)")